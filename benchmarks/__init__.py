@@ -0,0 +1,4 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmarks of REVAnalyzer: deterministic synthetic porous media and scripted runs of the analysis pipeline.
+"""
@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+"""
+End-to-end benchmark of REVAnalyzer pipeline (generate, vectorize, analyze) on synthetic media.
+
+Each configuration (medium, image size, metric family, n_steps, sREV_max_step, n_threads) runs in a separate Python process,
+so the peak memory is measured for this configuration only. Results are written as JSON, for example:
+
+    python -m benchmarks.e2e --sizes 64 128 --threads 1 2 4 --families porosity pnm --output results.json
+
+Families requiring external tools (Julia for 'euler' and 'cf', pyfdmss for 'permeability', pyperspairdiamorse for 'pd')
+are reported with the error message if the tool is not available.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+from .media import make_medium, media
+
+families = ['porosity', 'euler', 'cf', 'pd', 'pnm', 'permeability']
+
+
+def make_metric(family, n_threads):
+    """
+    Metric representing a metric family in the benchmark.
+
+    **Input:**
+
+    	family (str): one of 'porosity', 'euler', 'cf', 'pd', 'pnm', 'permeability';
+
+    	n_threads (int): number of threads used for data generation.
+
+    **Output:**
+
+    	metric (subclass of BasicMetric).
+    """
+    from revanalyzer import metrics, vectorizers
+    if family == 'porosity':
+        return metrics.Porosity(n_threads=n_threads)
+    if family == 'euler':
+        return metrics.EulerDensityI(n_threads=n_threads)
+    if family == 'cf':
+        return metrics.S2(vectorizers.CFVectorizer(), n_threads=n_threads)
+    if family == 'pd':
+        return metrics.PD0(vectorizers.SimpleBinningVectorizer(bins=100), n_threads=n_threads)
+    if family == 'pnm':
+        return metrics.PoreRadius(vectorizers.HistVectorizer(), n_threads=n_threads)
+    if family == 'permeability':
+        return metrics.Permeability(n_threads=n_threads)
+    raise ValueError("Family should be one of " + ', '.join(families) + ".")
+
+
+def run_config(config, imagefile, workdir):
+    """
+    Run the pipeline for one configuration in the current process.
+
+    **Input:**
+
+    	config (dict): configuration with keys 'medium', 'size', 'family', 'n_steps', 'sREV_max_step', 'n_threads';
+
+    	imagefile (str): path to .npy file with the image;
+
+    	workdir (str): folder for generated data.
+
+    **Output:**
+
+    	dict with stage times in seconds, throughput and peak memory.
+    """
+    from revanalyzer import REVAnalyzer
+    image = np.load(imagefile)
+    size = tuple(config['size'])
+    metric = make_metric(config['family'], config['n_threads'])
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    times = {}
+    with REVAnalyzer(metric, image, size, config['n_steps'], config['sREV_max_step'], outputdir=workdir, resume=False) as analyzer:
+        start_time = time.perf_counter()
+        analyzer.generate()
+        times['generate'] = time.perf_counter() - start_time
+        if metric.metric_type == 'v':
+            start_time = time.perf_counter()
+            analyzer.vectorize()
+            times['vectorize'] = time.perf_counter() - start_time
+        start_time = time.perf_counter()
+        analyzer.analyze(0.2, 0.2)
+        times['analyze'] = time.perf_counter() - start_time
+        voxels = sum(analyzer._cut_voxels(l) for l, idx in analyzer.cut_ids)
+        n_cuts = len(analyzer.cut_ids)
+    return {'times': times,
+            'total_time': sum(times.values()),
+            'n_cuts': n_cuts,
+            'cuts_per_second': n_cuts/times['generate'],
+            'voxels_per_second': voxels/times['generate'],
+            'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss/1024,
+            'peak_rss_before_run_mb': rss_before/1024,
+            'peak_rss_workers_mb': resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss/1024}
+
+
+def parallel_efficiency(runs):
+    """
+    Parallel efficiency of generation T_1/(n T_n) for all configurations which have a run with one thread.
+
+    **Input:**
+
+    	runs (list(dict)): benchmark runs.
+
+    **Output:**
+
+    	list(dict) with keys 'medium', 'size', 'family', 'n_steps', 'sREV_max_step', 'n_threads', 'speedup', 'efficiency'.
+    """
+    def key(run):
+        return (run['medium'], tuple(run['size']), run['family'], run['n_steps'], run['sREV_max_step'])
+    serial = {key(run): run['times']['generate'] for run in runs if 'times' in run and run['n_threads'] == 1}
+    table = []
+    for run in runs:
+        if 'times' not in run or key(run) not in serial:
+            continue
+        speedup = serial[key(run)]/run['times']['generate']
+        table.append({'medium': run['medium'], 'size': run['size'], 'family': run['family'], 'n_steps': run['n_steps'],
+                      'sREV_max_step': run['sREV_max_step'], 'n_threads': run['n_threads'], 'speedup': speedup,
+                      'efficiency': speedup/run['n_threads']})
+    return table
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='End-to-end benchmark of REVAnalyzer pipeline.')
+    parser.add_argument('--media', nargs='+', default=list(media.keys()), choices=list(media.keys()))
+    parser.add_argument('--sizes', nargs='+', type=int, default=[64, 128])
+    parser.add_argument('--families', nargs='+', default=['porosity'], choices=families)
+    parser.add_argument('--n-steps', nargs='+', type=int, default=[4])
+    parser.add_argument('--sREV-max-step', nargs='+', type=int, default=[2])
+    parser.add_argument('--threads', nargs='+', type=int, default=[1, 2, 4])
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument('--timeout', type=float, default=None)
+    parser.add_argument('--workdir', default=None)
+    parser.add_argument('--output', default='benchmark_e2e.json')
+    parser.add_argument('--run', default=None, help=argparse.SUPPRESS)
+    parser.add_argument('--result', default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.run is not None:
+        config = json.loads(args.run)
+        result = run_config(config, config['imagefile'], config['workdir'])
+        with open(args.result, 'w') as f:
+            json.dump(result, f)
+        return
+    workdir = args.workdir if args.workdir is not None else tempfile.mkdtemp(prefix='revanalyzer_bench_')
+    os.makedirs(workdir, exist_ok=True)
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    runs = []
+    for medium in args.media:
+        for L in args.sizes:
+            size = [L, L, L]
+            imagefile = os.path.join(workdir, medium + '_' + str(L) + '.npy')
+            np.save(imagefile, make_medium(medium, size, args.seed))
+            for family in args.families:
+                for n_steps in args.n_steps:
+                    for sREV_max_step in args.sREV_max_step:
+                        for n_threads in args.threads:
+                            for i in range(args.repeat):
+                                config = {'medium': medium, 'size': size, 'family': family, 'n_steps': n_steps,
+                                          'sREV_max_step': sREV_max_step, 'n_threads': n_threads, 'seed': args.seed, 'repeat': i}
+                                runs.append(_run_in_subprocess(config, imagefile, workdir, root, args.timeout))
+                                _print_run(runs[-1])
+    report = {'meta': _meta(), 'runs': runs, 'parallel_efficiency': parallel_efficiency(runs)}
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=4)
+    if args.workdir is None:
+        shutil.rmtree(workdir, ignore_errors=True)
+    print('results are written to', args.output)
+
+
+def _run_in_subprocess(config, imagefile, workdir, root, timeout):
+    run_workdir = os.path.join(workdir, 'run')
+    shutil.rmtree(run_workdir, ignore_errors=True)
+    result_file = os.path.join(workdir, 'result.json')
+    if os.path.isfile(result_file):
+        os.remove(result_file)
+    child_config = dict(config, imagefile=imagefile, workdir=run_workdir)
+    cmd = [sys.executable, '-m', 'benchmarks.e2e', '--run', json.dumps(child_config), '--result', result_file]
+    run = dict(config)
+    try:
+        proc = subprocess.run(cmd, cwd=root, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        run['error'] = 'timeout'
+        return run
+    if proc.returncode != 0 or not os.path.isfile(result_file):
+        lines = proc.stderr.decode(errors='replace').strip().splitlines()
+        run['error'] = lines[-1] if lines else 'exit code ' + str(proc.returncode)
+        return run
+    with open(result_file) as f:
+        run.update(json.load(f))
+    shutil.rmtree(run_workdir, ignore_errors=True)
+    return run
+
+
+def _print_run(run):
+    head = '%-8s %4d %-12s n_steps=%d sREV_max_step=%d n_threads=%d' % (run['medium'], run['size'][0], run['family'],
+                                                                       run['n_steps'], run['sREV_max_step'], run['n_threads'])
+    if 'error' in run:
+        print(head, ' error:', run['error'])
+    else:
+        print(head, ' generate %.2f s, %.3g voxels/s, peak RSS %.0f MB (workers %.0f MB)' % (run['times']['generate'],
+              run['voxels_per_second'], run['peak_rss_mb'], run['peak_rss_workers_mb']))
+
+
+def _meta():
+    try:
+        from importlib.metadata import version
+        revanalyzer_version = version('revanalyzer')
+    except Exception:
+        revanalyzer_version = None
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {'revanalyzer_version': revanalyzer_version, 'commit': commit, 'python': platform.python_version(),
+            'platform': platform.platform(), 'processor': platform.processor(), 'cpu_count': os.cpu_count(),
+            'numpy': np.__version__, 'date': time.strftime('%Y-%m-%dT%H:%M:%S')}
+
+
+if __name__ == '__main__':
+    main()
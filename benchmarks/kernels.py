@@ -0,0 +1,308 @@
+# -*- coding: utf-8 -*-
+"""
+Microbenchmarks of the hot inner calls of the library: vectorizers and REV formulas, with realistic input sizes
+(persistence diagrams with 10^5-10^6 points, correlation functions of length 1000).
+
+Timings are compared with the recorded baseline; cases slower than the baseline by more than the tolerance are reported
+as regressions and the script exits with code 1. Baselines depend on hardware, so they should be recorded on the machine
+used for comparison:
+
+    python -m benchmarks.kernels --save-baseline
+    python -m benchmarks.kernels --tolerance 0.2
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import numpy as np
+
+_baseline_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines', 'kernels.json')
+_cases = []
+
+
+def case(name, sizes):
+    """
+    Decorator registering a benchmark case. The decorated function takes the input size and returns a function without
+    arguments performing the measured call; preparation of inputs is not measured.
+
+    **Input:**
+
+    	name (str): name of the case;
+
+    	sizes (list(int)): input sizes for which the case is measured.
+    """
+    def decorator(setup):
+        for n in sizes:
+            _cases.append((name + '[n=' + str(n) + ']', setup, n))
+        return setup
+    return decorator
+
+
+def synthetic_pd(n, seed=0):
+    """
+    Synthetic persistence diagram.
+
+    **Input:**
+
+    	n (int): number of points;
+
+    	seed (int): seed of random number generator, default: 0.
+
+    **Output:**
+
+    	numpy.ndarray of shape (n, 2) with birth and death values.
+    """
+    rng = np.random.default_rng(seed)
+    birth = rng.normal(-3., 2., n)
+    death = birth + rng.exponential(2., n)
+    return np.stack([birth, death], axis=1)
+
+
+def synthetic_cf(n, seed=0):
+    """
+    Synthetic correlation function in 'x', 'y' and 'z' directions.
+
+    **Input:**
+
+    	n (int): length of correlation function;
+
+    	seed (int): seed of random number generator, default: 0.
+
+    **Output:**
+
+    	list of 3 numpy.ndarray of length n.
+    """
+    rng = np.random.default_rng(seed)
+    r = np.arange(n)
+    return [0.3**2 + 0.3*0.7*np.exp(-r/rng.uniform(5., 20.)) + 1e-3*rng.standard_normal(n) for i in range(3)]
+
+
+def _steps_values(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return {step: float(v) for step, v in zip(range(1, n+1), 0.3 + 0.05*np.exp(-np.arange(n)/5.)*rng.standard_normal(n))}
+
+
+@case('BasicVectorizer._compare_vectors', [10**4, 10**6])
+def _compare_vectors(n):
+    from revanalyzer.vectorizers import BasicVectorizer
+    rng = np.random.default_rng(0)
+    v1 = rng.random(n).tolist()
+    v2 = rng.random(n).tolist()
+    vectorizer = BasicVectorizer(2)
+    return lambda: vectorizer._compare_vectors(v1, v2)
+
+
+@case('simple_binning_vectorizer._range_pd', [10**5, 10**6])
+def _range_pd(n):
+    from revanalyzer.vectorizers.simple_binning_vectorizer import _range_pd
+    pd = synthetic_pd(n)
+    return lambda: _range_pd(pd)
+
+
+@case('simple_binning_vectorizer._hist_pd', [10**5, 10**6])
+def _hist_pd(n):
+    from revanalyzer.vectorizers.simple_binning_vectorizer import _hist_pd, _range_pd
+    pd = synthetic_pd(n)
+    r = _range_pd(pd)
+    return lambda: _hist_pd(pd, 100, r)
+
+
+@case('simple_binning_vectorizer._skip_zeros12', [10**4, 10**5])
+def _skip_zeros12(n):
+    from revanalyzer.vectorizers.simple_binning_vectorizer import _skip_zeros12
+    rng = np.random.default_rng(0)
+    v1 = np.where(rng.random(n) > 0.5, rng.random(n), 0.)
+    v2 = np.where(rng.random(n) > 0.5, rng.random(n), 0.)
+    return lambda: _skip_zeros12(v1, v2)
+
+
+@case('SimpleBinningVectorizer.vectorize', [10**5, 10**6])
+def _simple_binning(n):
+    from revanalyzer.vectorizers import SimpleBinningVectorizer
+    pd1 = synthetic_pd(n, 0)
+    pd2 = synthetic_pd(n, 1)
+    vectorizer = SimpleBinningVectorizer(bins=100)
+    return lambda: vectorizer.vectorize(pd1, pd2)
+
+
+@case('PersistenceImageVectorizer.vectorize', [10**4, 10**5])
+def _persistence_image(n):
+    from revanalyzer.vectorizers import PersistenceImageVectorizer
+    pd1 = synthetic_pd(n, 0)
+    pd2 = synthetic_pd(n, 1)
+    vectorizer = PersistenceImageVectorizer(resolution=[20, 20])
+    return lambda: vectorizer.vectorize(pd1, pd2)
+
+
+@case('LandscapeVectorizer.vectorize', [10**4, 10**5])
+def _landscape(n):
+    from revanalyzer.vectorizers import LandscapeVectorizer
+    pd1 = synthetic_pd(n, 0)
+    pd2 = synthetic_pd(n, 1)
+    vectorizer = LandscapeVectorizer(resolution=100, num_landcapes=3)
+    return lambda: vectorizer.vectorize(pd1, pd2)
+
+
+@case('SilhouetteVectorizer.vectorize', [10**4, 10**5])
+def _silhouette(n):
+    from revanalyzer.vectorizers import SilhouetteVectorizer
+    pd1 = synthetic_pd(n, 0)
+    pd2 = synthetic_pd(n, 1)
+    vectorizer = SilhouetteVectorizer(resolution=100)
+    return lambda: vectorizer.vectorize(pd1, pd2)
+
+
+@case('CFVectorizer.vectorize(max)', [1000])
+def _cf_max(n):
+    from revanalyzer.vectorizers import CFVectorizer
+    vectorizer = CFVectorizer(mode='max')
+    cf1 = synthetic_cf(n, 0)
+    cf2 = synthetic_cf(n, 1)
+    return lambda: vectorizer.vectorize(cf1, cf2)
+
+
+@case('CFVectorizer.vectorize(all)', [1000])
+def _cf_all(n):
+    from revanalyzer.vectorizers import CFVectorizer
+    vectorizer = CFVectorizer(mode='all')
+    cf1 = synthetic_cf(n, 0)
+    cf2 = synthetic_cf(n, 1)
+    return lambda: vectorizer.vectorize(cf1, cf2)
+
+
+@case('HistVectorizer.vectorize', [10**5, 10**6])
+def _hist(n):
+    from revanalyzer.vectorizers import HistVectorizer
+    rng = np.random.default_rng(0)
+    r1 = rng.gamma(2., 2., n)
+    r2 = rng.gamma(2., 2., n)
+    vectorizer = HistVectorizer()
+    return lambda: vectorizer.vectorize(r1, r2)
+
+
+@case('REV_formulas', [50])
+def _formulas(n):
+    from revanalyzer import REV_formulas as f
+    values = _steps_values(n)
+    values_3 = {step: [v, v, v] for step, v in values.items()}
+
+    def run():
+        f.get_sREV_size(values, 0.2)
+        f.get_dREV_size_1_scalar(values, 0.2)
+        f.get_dREV_size_2_scalar(values, 0.2)
+        f.get_dREV_size_2_scalar_dimensional(values_3, 0.2)
+        f.get_dREV_size_1_vector(values, 0.2)
+    return run
+
+
+def measure(func, repeat=5, min_time=0.2):
+    """
+    Time of one call of a function. The number of calls in one measurement is chosen so that the measurement lasts
+    at least min_time; the median and minimum over the measurements are returned.
+
+    **Input:**
+
+    	func (function): measured function without arguments;
+
+    	repeat (int): number of measurements, default: 5;
+
+    	min_time (float): minimal duration of one measurement in seconds, default: 0.2.
+
+    **Output:**
+
+    	dict with median and minimal time of one call in seconds and the number of calls in one measurement.
+    """
+    start_time = time.perf_counter()
+    func()
+    t = time.perf_counter() - start_time
+    number = max(1, int(min_time/t)) if t > 0 else 1000
+    times = []
+    for i in range(repeat):
+        start_time = time.perf_counter()
+        for j in range(number):
+            func()
+        times.append((time.perf_counter() - start_time)/number)
+    return {'median': float(np.median(times)), 'min': float(min(times)), 'number': number}
+
+
+def compare(results, baseline, tolerance):
+    """
+    Comparison of the results with the baseline.
+
+    **Input:**
+
+    	results (dict): measured cases;
+
+    	baseline (dict): baseline cases;
+
+    	tolerance (float): allowed relative slowdown.
+
+    **Output:**
+
+    	dict, in which a key is a case name and a value is the ratio of median times (current/baseline) and the regression flag.
+    """
+    table = {}
+    for name, result in results.items():
+        if 'median' not in result or name not in baseline or 'median' not in baseline[name]:
+            continue
+        ratio = result['median']/baseline[name]['median']
+        table[name] = {'ratio': ratio, 'regression': ratio > 1 + tolerance}
+    return table
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Microbenchmarks of vectorizers and REV formulas.')
+    parser.add_argument('--filter', default=None, help='run only cases which names contain this substring')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--min-time', type=float, default=0.2)
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    parser.add_argument('--baseline', default=_baseline_path)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--output', default=None)
+    args = parser.parse_args(argv)
+    results = {}
+    for name, setup, n in _cases:
+        if args.filter is not None and args.filter not in name:
+            continue
+        try:
+            results[name] = measure(setup(n), args.repeat, args.min_time)
+            print('%-55s %12.3e s' % (name, results[name]['median']), flush=True)
+        except Exception as e:
+            results[name] = {'error': type(e).__name__ + ': ' + str(e)}
+            print('%-55s error: %s' % (name, results[name]['error']), flush=True)
+    report = {'meta': {'python': platform.python_version(), 'platform': platform.platform(), 'numpy': np.__version__,
+                       'date': time.strftime('%Y-%m-%dT%H:%M:%S')},
+              'cases': results}
+    regressions = []
+    if os.path.isfile(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['cases']
+        report['comparison'] = compare(results, baseline, args.tolerance)
+        print()
+        for name, elem in report['comparison'].items():
+            flag = '  SLOWER' if elem['regression'] else ''
+            print('%-55s %6.2fx%s' % (name, elem['ratio'], flag))
+            if elem['regression']:
+                regressions.append(name)
+    if args.output is not None:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=4)
+    if args.save_baseline:
+        baseline = {'meta': report['meta'], 'cases': {}}
+        if os.path.isfile(args.baseline):
+            with open(args.baseline) as f:
+                baseline['cases'] = json.load(f)['cases']
+        baseline['cases'].update({name: result for name, result in results.items() if 'median' in result})
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=4)
+        print('baseline is written to', args.baseline)
+    if regressions:
+        print(len(regressions), 'case(s) slower than baseline by more than', '%d%%' % round(100*args.tolerance))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""
+Deterministic generators of synthetic porous media. All the generators return 'uint8' arrays in the convention of the
+library: 0 is pore, 1 is solid. The same seed always gives the same image.
+"""
+import numpy as np
+from scipy import ndimage
+
+
+def overlapping_spheres(size, radius, porosity, seed=0):
+    """
+    Boolean model of overlapping solid spheres with centers distributed uniformly (Poisson process). The number of spheres
+    is chosen so that the expected porosity equals to the given one.
+
+    **Input:**
+
+    	size (tuple (int, int, int)): linear image sizes in x, y and z directions;
+
+    	radius (float): radius of spheres in voxels;
+
+    	porosity (float, <1): expected porosity;
+
+    	seed (int): seed of random number generator, default: 0.
+
+    **Output:**
+
+    	image (numpy.ndarray).
+    """
+    rng = np.random.default_rng(seed)
+    volume = 4./3.*np.pi*radius**3
+    # spheres may be cut by the boundaries, so the centers are placed in the image extended by radius
+    extended = [s + 2*int(np.ceil(radius)) for s in size]
+    n_spheres = int(round(-np.log(porosity)/volume*np.prod(extended)))
+    centers = np.zeros(extended, dtype=bool)
+    idx = [rng.integers(0, s, n_spheres) for s in extended]
+    centers[idx[0], idx[1], idx[2]] = True
+    distance = ndimage.distance_transform_edt(~centers)
+    r = int(np.ceil(radius))
+    solid = distance[r:r+size[0], r:r+size[1], r:r+size[2]] <= radius
+    return solid.astype('uint8')
+
+
+def gaussian_random_field(size, correlation_length, porosity, seed=0):
+    """
+    Thresholded Gaussian random field. The field is a white noise smoothed with Gaussian kernel; the threshold is the
+    quantile of the field corresponding to the given porosity.
+
+    **Input:**
+
+    	size (tuple (int, int, int)): linear image sizes in x, y and z directions;
+
+    	correlation_length (float or tuple (float, float, float)): width of smoothing kernel in voxels, may be different for x, y and z directions;
+
+    	porosity (float, <1): porosity of the image;
+
+    	seed (int): seed of random number generator, default: 0.
+
+    **Output:**
+
+    	image (numpy.ndarray).
+    """
+    field = _smoothed_noise(size, correlation_length, seed)
+    return (field > np.quantile(field, porosity)).astype('uint8')
+
+
+def layered_medium(size, n_layers, porosity_range=(0.1, 0.4), correlation_length=(6., 6., 1.5), seed=0):
+    """
+    Layered anisotropic medium: thresholded Gaussian random field stretched in x and y directions with porosity changing
+    from layer to layer along z direction. Such an image is not stationary in z direction.
+
+    **Input:**
+
+    	size (tuple (int, int, int)): linear image sizes in x, y and z directions;
+
+    	n_layers (int): number of layers;
+
+    	porosity_range (tuple (float, float)): minimal and maximal porosities of layers, default: (0.1, 0.4);
+
+    	correlation_length (tuple (float, float, float)): width of smoothing kernel in voxels in x, y and z directions, default: (6., 6., 1.5);
+
+    	seed (int): seed of random number generator, default: 0.
+
+    **Output:**
+
+    	image (numpy.ndarray).
+    """
+    rng = np.random.default_rng(seed)
+    field = _smoothed_noise(size, correlation_length, seed + 1)
+    porosities = rng.uniform(porosity_range[0], porosity_range[1], n_layers)
+    bounds = np.linspace(0, size[2], n_layers + 1).astype(int)
+    image = np.empty(size, dtype='uint8')
+    for i in range(n_layers):
+        layer = field[:, :, bounds[i]:bounds[i+1]]
+        image[:, :, bounds[i]:bounds[i+1]] = layer > np.quantile(layer, porosities[i])
+    return image
+
+
+media = {'spheres': lambda size, seed: overlapping_spheres(size, max(size)/16, 0.3, seed),
+         'grf': lambda size, seed: gaussian_random_field(size, max(size)/32, 0.3, seed),
+         'layered': lambda size, seed: layered_medium(size, 4, seed=seed)}
+
+
+def make_medium(name, size, seed=0):
+    """
+    Synthetic medium with default parameters scaled with the image size.
+
+    **Input:**
+
+    	name (str): 'spheres', 'grf' or 'layered';
+
+    	size (tuple (int, int, int)): linear image sizes in x, y and z directions;
+
+    	seed (int): seed of random number generator, default: 0.
+
+    **Output:**
+
+    	image (numpy.ndarray).
+    """
+    if name not in media:
+        raise ValueError("Medium should be one of " + ', '.join(media.keys()) + ".")
+    return media[name](tuple(size), seed)
+
+
+def _smoothed_noise(size, correlation_length, seed):
+    rng = np.random.default_rng(seed)
+    noise = rng.standard_normal(size)
+    return ndimage.gaussian_filter(noise, correlation_length, mode='wrap')
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""
+Startup benchmark: time of 'import revanalyzer' in a fresh interpreter, heavy dependencies loaded by the import and by
+construction of metrics, and time until a spawned worker process is ready to run the first task.
+
+    python -m benchmarks.startup --repeat 5 --output startup.json
+
+The scenario 'all_dependencies' imports every heavy dependency of the library, which is the cost paid by each interpreter
+when all of them are imported eagerly.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+
+heavy_modules = ['matplotlib', 'pandas', 'gudhi', 'porespy', 'openpnm', 'pyfdmss', 'pyperspairdiamorse', 'h5py']
+
+scenarios = {
+    'import': "import revanalyzer",
+    'porosity': "import revanalyzer\nfrom revanalyzer.metrics import Porosity\nPorosity()",
+    'pnm': "import revanalyzer\nfrom revanalyzer.metrics import PoreRadius\nfrom revanalyzer.vectorizers import HistVectorizer\nPoreRadius(HistVectorizer())",
+    'pd': "import revanalyzer\nfrom revanalyzer.metrics import PD0\nfrom revanalyzer.vectorizers import PersistenceImageVectorizer\nPD0(PersistenceImageVectorizer([20, 20]))",
+    'all_dependencies': '\n'.join("try:\n    import " + module + "\nexcept ImportError:\n    pass"
+                                  for module in ['matplotlib.pyplot', 'pandas', 'gudhi.representations', 'porespy', 'openpnm',
+                                                 'pyfdmss', 'pyperspairdiamorse']),
+}
+
+_probe = """
+import sys, time
+start_time = time.perf_counter()
+{code}
+elapsed = time.perf_counter() - start_time
+print(repr((elapsed, [m for m in {modules!r} if m in sys.modules])))
+"""
+
+
+def measure_scenario(code, repeat=5):
+    """
+    Time of the code run in a fresh interpreter, without the start of interpreter itself.
+
+    **Input:**
+
+    	code (str): measured code;
+
+    	repeat (int): number of runs, default: 5.
+
+    **Output:**
+
+    	dict with median and minimal time in seconds, wall time of the whole interpreter run and loaded heavy modules.
+    """
+    times = []
+    walls = []
+    loaded = []
+    for i in range(repeat):
+        start_time = time.perf_counter()
+        out = subprocess.run([sys.executable, '-c', _probe.format(code=code, modules=heavy_modules)], capture_output=True,
+                             text=True, check=True).stdout
+        walls.append(time.perf_counter() - start_time)
+        elapsed, loaded = eval(out.strip().splitlines()[-1])
+        times.append(elapsed)
+    return {'median': float(np.median(times)), 'min': float(min(times)), 'wall_median': float(np.median(walls)), 'heavy_modules': loaded}
+
+
+def _ready():
+    return os.getpid()
+
+
+def measure_spawn(modules, repeat=3):
+    """
+    Time until a worker process started by the 'spawn' method, which preloads the given modules, returns the first result.
+
+    **Input:**
+
+    	modules (list(str)): modules imported by the worker at start;
+
+    	repeat (int): number of runs, default: 3.
+
+    **Output:**
+
+    	dict with median and minimal time in seconds.
+    """
+    from revanalyzer.executors.process_executor import _preload_modules
+    context = multiprocessing.get_context('spawn')
+    times = []
+    for i in range(repeat):
+        start_time = time.perf_counter()
+        with context.Pool(1, initializer=_preload_modules, initargs=(modules,)) as pool:
+            pool.apply(_ready)
+        times.append(time.perf_counter() - start_time)
+    return {'median': float(np.median(times)), 'min': float(min(times))}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Startup time of revanalyzer and its worker processes.')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', default=None)
+    args = parser.parse_args(argv)
+    from revanalyzer import REVAnalyzer
+    from revanalyzer.metrics import Porosity, PoreRadius
+    from revanalyzer.vectorizers import HistVectorizer
+    results = {'scenarios': {}, 'spawn': {}}
+    for name, code in scenarios.items():
+        results['scenarios'][name] = measure_scenario(code, args.repeat)
+        r = results['scenarios'][name]
+        print('%-20s %8.3f s   heavy modules: %s' % (name, r['median'], ', '.join(r['heavy_modules']) or '-'), flush=True)
+    image = np.zeros((8, 8, 8), dtype='uint8')
+    outputdir = tempfile.mkdtemp(prefix='revanalyzer_startup_')
+    workers = {'porosity': REVAnalyzer(Porosity(), image, (8, 8, 8), 2, 1, outputdir=outputdir)._worker_modules(),
+               'pnm': REVAnalyzer(PoreRadius(HistVectorizer()), image, (8, 8, 8), 2, 1, outputdir=outputdir)._worker_modules()}
+    for name, modules in workers.items():
+        results['spawn'][name] = dict(measure_spawn(modules, args.repeat), modules=modules)
+        print('%-20s %8.3f s   spawn worker, preloaded: %s' % (name, results['spawn'][name]['median'], ', '.join(modules)), flush=True)
+    shutil.rmtree(outputdir, ignore_errors=True)
+    results['meta'] = {'python': platform.python_version(), 'platform': platform.platform(), 'date': time.strftime('%Y-%m-%dT%H:%M:%S')}
+    if args.output is not None:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=4)
+
+
+if __name__ == '__main__':
+    main()
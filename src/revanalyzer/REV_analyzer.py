@@ -5,21 +5,47 @@ import numpy as np
 import os
 import json
 import shutil
-import matplotlib.pyplot as plt
 import itertools
-import multiprocessing
-from functools import partial
+import uuid
+import threading
+import glob
+from collections import OrderedDict
+from functools import partial, wraps
 from statistics import geometric_mean
-from .generators import run_fdmss, _read_array, _write_array, _subcube_ids, make_cut, generate_PNM
+from .generators import run_fdmss, _read_array, _write_array, _subcube_ids, make_cut, generate_PNM, _share_array, _share_file, _attach_array, _array_hash, _cut_bounds, _slice
 from .metrics import BasicMetric, BasicPNMMetric, BasicPDMetric, Permeability
+from .executors import BasicExecutor, ProcessExecutor, make_executor
+from .stores import BasicStore, ValueCache, Manifest, ContentCache, _output_checksum, _find_store, _remove_stores
+from .tracing import span
+from .cancellation import CancelToken, cancel_scope
+from .threads import get_budget
+from .scheduler import Progress, run_tasks, map_tasks, _default_cost_model
+from .memory import _default_memory_model
 from .REV_formulas import _delta, get_sREV_size, get_dREV_size_1_scalar, get_dREV_size_2_scalar, get_dREV_size_1_vector, get_dREV_size_1_scalar_dimensional, get_dREV_size_2_scalar_dimensional
 
+# caches of the copies of analyzers received by a worker process, so the tasks of a stage sent to the worker share the values read;
+# the key is the id of analyzer and the generation of its cache, the least recently used caches are dropped
+_value_caches = OrderedDict()
+_max_value_caches = 2
+_value_caches_lock = threading.Lock()
+
+
+def _stage(name):
+    # records the call of an analyzer method as a span of the active tracer
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with span(name, metric=self.metric.__class__.__name__):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorator
+
 
 class REVAnalyzer:
     """
     analysis of representativity of a given image for a given scalar or vector metric.
     """
-    def __init__(self, metric, image, size, n_steps, sREV_max_step, datadir=None, outputdir='output'):
+    def __init__(self, metric, image, size, n_steps, sREV_max_step, datadir=None, outputdir='output', shared_memory=False, mmap=False, store=None, cache_size=2**28, pool=None, executor='process', resume=False, content_cache=None, cost_model=None, progress=False, memory_model=None):
         """
         **Input:**
 
@@ -35,10 +61,36 @@ class REVAnalyzer:
         
         	datadir (str): path to the folder containing image, default: None;
         
-        	outputdir (str): path to the output folder containing generated data, default: 'output'.
+        	outputdir (str): path to the output folder containing generated data, default: 'output';
+        	
+        	shared_memory (bool): if True, the image is placed once in shared memory during generation and worker processes build subsample views from it instead of receiving pickled copies of the subsamples, default: False;
+        	
+        	mmap (bool): if True, an image given by file name is opened as a read-only memory map, so only the parts of the file read by the metric are loaded into memory. Worker processes map the same file instead of receiving subsamples, default: False;
+        	
+        	store (subclass of BasicStore): result store used to keep the generated metric values of all subsamples in one container file instead of separate text files, default: None;
+        	
+        	cache_size (int): maximal size in bytes of the in-memory LRU cache of metric values read by analysis methods. If 0, values are not cached, default: 2**28;
+        	
+        	pool (multiprocessing.pool.Pool or subclass of BasicExecutor): worker pool used by all the parallel stages. If None, the analyzer creates its own executor at the first parallel stage and keeps it until close() is called, default: None;
+        	
+        	executor (str or subclass of BasicExecutor): execution backend of parallel stages: 'serial' (all the tasks in the calling process, for debugging), 'thread' (threads of the calling process, no pickling), 'process' (persistent pool of worker processes) or 'distributed' (worker processes, possibly on other hosts, pulling subsample tasks with the bounds of subsample and a reference to the image file from a broker, see DistributedExecutor). An executor object given here is used as is and is not shut down by close(), default: 'process';
+        	
+        	resume (bool): if True, generation skips subsamples recorded in the generation manifest as completed with the same parameters and unchanged output, default: False;
+        	
+        	content_cache (ContentCache): cross-run cache addressed by image content, subsample bounds and metric parameters. Metric values of subsamples found in the cache are restored instead of being computed, default: None;
+        	
+        	cost_model (CostModel): model estimating the cost of subsample tasks. Tasks are dispatched to the workers in order of decreasing cost, and the model is refined with the observed timings. If None, the model shared by all analyzers in the process is used, default: None;
+        	
+        	progress (bool): if True, the number of completed tasks, the estimated remaining time and the peak memory of tasks are printed during generation, default: False;
+        	
+        	memory_model (MemoryModel): model estimating the peak memory of subsample tasks, used for admission of tasks while a MemoryBudget is active and refined with the observed peaks. If None, the model shared by all analyzers in the process is used, default: None.
         """
         if not issubclass(metric.__class__, BasicMetric):
             raise TypeError("Metric should be an object of a class derived from BasicMetric.")
+        if not (store is None or isinstance(store, BasicStore)):
+            raise TypeError("Store should be None or an object of a class derived from BasicStore.")
+        if not (content_cache is None or isinstance(content_cache, ContentCache)):
+            raise TypeError("Content cache should be None or an object of ContentCache class.")
         self.metric = metric
         self.size = size
         self._outputdirs_cut_values = []            
@@ -65,6 +117,33 @@ class REVAnalyzer:
         self.datadir = datadir
         self.outputdir = outputdir
         self.gendatadir = None
+        self.shared_memory = shared_memory
+        self.mmap = mmap
+        self.store = store
+        self._uid = uuid.uuid4().hex
+        self._cache = ValueCache(cache_size)
+        self._in_worker = False
+        self._worker_hits = 0
+        self._worker_misses = 0
+        if pool is not None and not isinstance(pool, BasicExecutor):
+            pool = ProcessExecutor(metric.n_threads, pool=pool)
+        if pool is None and isinstance(executor, BasicExecutor):
+            pool = executor
+        self.executor = executor
+        self._pool = pool
+        self._own_pool = pool is None
+        self.resume = resume
+        self._manifest_path = os.path.join(os.path.dirname(self._outputdir_cut_values), 'manifest.json')
+        self._manifest = None
+        self._image_key = None
+        self._image_ref = None
+        self.content_cache = content_cache
+        self._content_hash = None
+        self.cost_model = cost_model if cost_model is not None else _default_cost_model
+        self.progress = progress
+        self.memory_model = memory_model if memory_model is not None else _default_memory_model
+        self._cancel_token = None
+        self._cancelled_tokens = []
         if isinstance(self.image, str):
             self._outputdir_vectorized_cut_values = os.path.join(self.outputdir, self.image, self.metric.__class__.__name__, 'vectorized_cuts_values')
         else:
@@ -122,53 +201,46 @@ class REVAnalyzer:
                     self.is_pnm_data = True
                     
 
+    @_stage('generate')
     def generate(self):
         """
         Generator of metric values for all selected subsamples.
         """
-        if isinstance(self.metric, Permeability) and not self.is_fdmss_data:
-            os.makedirs(self.gendatadir, exist_ok=True)
-            if isinstance(self.image, str):
-                run_fdmss(self.image, self.metric.direction, self.datadir, self.gendatadir, self.metric.n_threads, self.metric.resolution, self.metric.show_time)
-            else:
-                fileout = os.path.join(self.gendatadir, 'image.raw') 
-                _write_array(self.image, fileout)
-                run_fdmss('image.raw', self.metric.direction, self.gendatadir, self.gendatadir, self.metric.n_threads, self.metric.resolution, self.metric.show_time)
-                os.remove(fileout)
-            fdmss_input = os.path.join(self.gendatadir, 'fdmss_input.txt')            
-            with open(fdmss_input, 'w') as f:
-                lines = [self.metric.direction, str(self.metric.resolution), str(self.size[0])]
-                f.write('\n'.join(lines))
-        if isinstance(self.image, str):
-            if self.datadir is not None:
-                filein = os.path.join(self.datadir, self.image)
-            else:
-                filein = self.image
-            image = _read_array(filein, self.size[0], self.size[1], self.size[2], 'uint8')
-        else:
-            image = self.image
-        if issubclass(self.metric.__class__, BasicPNMMetric) and not self.is_pnm_data:
-            os.makedirs(self.gendatadir, exist_ok=True)
-            generate_PNM(image, self.size, self.n_steps, self.sREV_max_step, self.gendatadir, self.metric.n_threads, self.metric.resolution, self.metric.show_time)     
-            pn_input = os.path.join(self.gendatadir, 'pn_input.txt')            
-            with open(pn_input, 'w') as f:
-                lines = [str(self.n_steps), str(self.sREV_max_step), str(self.metric.resolution)]
-                f.write('\n'.join(lines))
-        ids = _subcube_ids(self.n_steps, self.sREV_max_step)
-        cuts = []
-        for elem in ids:
-            l = elem[0]
-            idx = elem[1]
-            if l  == self.n_steps:
-                cuts.append(image)
-            else:
-                cut_size = self.cut_sizes[l-1]
-                cuts.append(make_cut(image, self.size, cut_size, idx))
-        data = zip(ids, cuts)
-        pool = multiprocessing.Pool(processes=self.metric.n_threads) 
-        results = pool.map(self._metric_for_subsample, data)
-        pool.close()
-        pool.join()           
+        for elem in self._generate_cuts():
+            pass
+
+    def _generate_cuts(self):
+        # yields the subsamples in order of completion, closing the iterator stops recording and releases the shared image
+        self._cache.invalidate()
+        image = self._load_image()
+        ids = self._pending_ids(image)
+        if len(ids) == 0:
+            self._finish()
+            return
+        self._prepare(image)
+        if self.metric._batch_generation:
+            # all the subsamples are computed in one pass over the image, without tasks
+            yield from self._generate_batch(image, ids)
+            self._finish()
+            return
+        shm, self._image_ref = self._share_image(image)
+        data = [(elem, self._task_cut(image, elem[0], elem[1])) for elem in ids]
+        costs = [self.cost_model.estimate(self.metric, self._cut_voxels(elem[0])) for elem in ids]
+        memory = [self.memory_model.estimate(self.metric, self._cut_voxels(elem[0])) for elem in ids]
+        progress = Progress(self.metric.__class__.__name__, costs, self.progress)
+        try:
+            for elem, elapsed, peak in run_tasks(self._get_pool(), partial(self._metric_for_subsample, cancel_token=self._cancel_token), data, costs, self._n_workers(), progress, memory):
+                self._record_cut(elem[0], elem[1])
+                self.cost_model.update(self.metric, self._cut_voxels(elem[0]), elapsed)
+                if peak is not None:
+                    self.memory_model.update(self.metric, self._cut_voxels(elem[0]), peak)
+                yield elem
+        finally:
+            self._image_ref = None
+            if shm is not None:
+                shm.close()
+                shm.unlink()
+        self._finish()
 
     def read(self, step, cut_id=0): 
         """
@@ -184,8 +256,44 @@ class REVAnalyzer:
         
         	metric value (float or np.array(dtype='float')).       
         """
-        return self.metric.read(
-            self._outputdir_cut_values, step, cut_id)
+        key = (self.metric.__class__.__name__, step, cut_id, self._outputdir_cut_values)
+        found, value = self._cache.get(key)
+        if not found:
+            value = self.metric.read(self._outputdir_cut_values, step, cut_id, self._read_store(step, cut_id))
+            self._cache.put(key, value)
+        return value
+
+    def close(self):
+        """
+        Shut down the executor created by the analyzer. A pool or an executor given by the user is left running.
+        """
+        if self._own_pool and self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+        self._pool = None
+        for token in self._cancelled_tokens:
+            token.clear()
+        self._cancelled_tokens = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def cache_info(self):
+        """
+        Statistics of the cache of metric values used by analysis methods.
+        
+        **Output:**
+        
+        	dict with numbers of hits and misses, number of cached values and their total size in bytes. The hits and misses of the caches 
+        	of worker processes in vectorize() and analyze_stationarity() are given as 'worker_hits' and 'worker_misses'.
+        """
+        info = self._cache.info()
+        info['worker_hits'] = self._worker_hits
+        info['worker_misses'] = self._worker_misses
+        return info
     
     def show(self, step, cut_id = 0, nbins = None):
         """
@@ -209,6 +317,7 @@ class REVAnalyzer:
             self.metric.show(self._outputdir_cut_values, step, cut_id)
         
 
+    @_stage('vectorize')
     def vectorize(self):
         """
         Vectorization of generated metric data using vetorizer. For vector metric only.
@@ -230,10 +339,8 @@ class REVAnalyzer:
             else:
                 data3 = data3 + [tup for tup in itertools.product([step], x, x)]
         data = data1 + data2 + data3
-        pool = multiprocessing.Pool(processes=self.metric.n_threads) 
-        results = pool.map(self._vectorize_subsample, data)
-        pool.close()
-        pool.join() 
+        self._warm_cache()
+        results = self._map_reads(partial(self._vectorize_subsample, cancel_token=self._cancel_token), data)
         ds = [{} for i in range(1, self.n_steps)]
         for elem in results:
             ds[elem[0]-1][elem[1]] = elem[2]      
@@ -243,6 +350,7 @@ class REVAnalyzer:
                 json.dump(ds[step-1], f, indent=4)     
             
 
+    @_stage('analyze')
     def analyze(self, dREV_threshold, sREV_threshold):
         """
         Perform the analysis of representativity.
@@ -323,6 +431,7 @@ class REVAnalyzer:
             self.sREV_size_2 = self._sizes_dict[get_sREV_size(
                 self.metric_normed_std_2, self.sREV_threshold)]
 
+    @_stage('stationarity')
     def analyze_stationarity(self, stationarity_threshold):
         """
         Perform the analysis of stationarity.
@@ -339,12 +448,10 @@ class REVAnalyzer:
             raise TypeError("Metric type should be vector")
         self.stationarity_threshold = stationarity_threshold
         x = np.arange(9)
+        self._warm_cache()
         for step in range(1, self.sREV_max_step):
             ids = itertools.combinations_with_replacement(x, 2)
-            pool = multiprocessing.Pool(processes=self.metric.n_threads) 
-            results = pool.map(partial(self._distance_for_subsamples, step=step), ids)
-            pool.close()
-            pool.join()
+            results = self._map_reads(partial(self._distance_for_subsamples, step=step, cancel_token=self._cancel_token), list(ids))
             dmax = max(results)
             print("at step ", step, " maximal distance between subsamples is ", dmax)
             if dmax > self.stationarity_threshold:
@@ -352,12 +459,80 @@ class REVAnalyzer:
                 return False
         print("Image is stationary.")
         return True
+
+    async def agenerate(self, limiter=None):
+        """
+        Asynchronous version of generate(). The stage runs in a helper thread and its tasks run in the executor of analyzer, so the
+        event loop is not blocked. If the awaiting task is cancelled, the tasks not started yet are skipped, running Julia scripts
+        are killed, and cancellation completes when the executor has no tasks of the stage in progress.
+        
+        **Input:**
+        
+        	limiter (CoreLimiter): limit of CPU cores shared by the analyses running concurrently. The stage waits until the cores
+        	of the workers of analyzer are available. If None, the limiter of all the cores of the host is used, default: None.
+        """
+        from .aio import _call
+        async with self._reserve_cores(limiter):
+            await _call(self, self.generate)
+
+    async def agenerate_cuts(self, limiter=None):
+        """
+        Asynchronous iterator over the subsamples in order of completion of their metric values. Closing the iterator by aclose()
+        or cancelling the awaiting task cancels the remaining tasks as in agenerate().
+        
+        **Input:**
+        
+        	limiter (CoreLimiter): limit of CPU cores shared by the analyses running concurrently, default: None.
+        	
+        **Output:**
+        
+        	asynchronous iterator over tuples (step, cut_id).
+        """
+        from .aio import _iterate
+        async with self._reserve_cores(limiter):
+            iterator = _iterate(self, self._generate_cuts())
+            try:
+                async for elem in iterator:
+                    yield elem
+            finally:
+                await iterator.aclose()
+
+    async def avectorize(self, limiter=None):
+        """
+        Asynchronous version of vectorize(), cancelled as agenerate().
+        
+        **Input:**
+        
+        	limiter (CoreLimiter): limit of CPU cores shared by the analyses running concurrently, default: None.
+        """
+        from .aio import _call
+        async with self._reserve_cores(limiter):
+            await _call(self, self.vectorize)
+
+    async def aanalyze_stationarity(self, stationarity_threshold, limiter=None):
+        """
+        Asynchronous version of analyze_stationarity(), cancelled as agenerate().
+        
+        **Input:**
+        
+        	stationarity_threshold (float, <1): threshold to analyze stationarity;
+        	
+        	limiter (CoreLimiter): limit of CPU cores shared by the analyses running concurrently, default: None.
+        	
+        **Output**
+        
+        	 True or False: is image stationary.
+        """
+        from .aio import _call
+        async with self._reserve_cores(limiter):
+            return await _call(self, self.analyze_stationarity, stationarity_threshold)
             
     
     def show_results(self):
         """
         Visualization of REV analysis results.
         """
+        import matplotlib.pyplot as plt
         plt.rcParams.update({'font.size': 16})
         plt.rcParams['figure.dpi'] = 300
         x = list(self.metric_mean.keys())
@@ -438,18 +613,315 @@ class REVAnalyzer:
         plt.legend()
         plt.show()
     
-    def _metric_for_subsample(self, data):
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_pool'] = None
+        state['_manifest'] = None
+        state['executor'] = None
+        # tasks receive subsamples or a reference to the image, so the image itself is never sent to workers
+        if isinstance(self.image, np.ndarray):
+            state['image'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._in_worker = True
+        key = (self._uid, self._cache.generation)
+        with _value_caches_lock:
+            if key in _value_caches:
+                _value_caches.move_to_end(key)
+                self._cache = _value_caches[key]
+            else:
+                _value_caches[key] = self._cache
+                while len(_value_caches) > _max_value_caches:
+                    _value_caches.popitem(last=False)
+
+    def _get_pool(self):
+        if self._pool is None:
+            self._pool = make_executor(self.executor, self.metric.n_threads, self._worker_modules())
+            self._own_pool = True
+        return self._pool
+
+    def _reserve_cores(self, limiter):
+        # workers of an executor given by the user or running on other hosts are not counted
+        from .aio import _default_limiter
+        if limiter is None:
+            limiter = _default_limiter
+        pool = self._get_pool()
+        n_cores = pool.n_workers if self._own_pool and pool.scope != 'cluster' else 0
+        return limiter.reserve(n_cores)
+
+    def _start_cancellable(self):
+        if self._cancel_token is not None:
+            raise RuntimeError("Another stage of the analyzer is running.")
+        self._cancel_token = CancelToken(self.outputdir)
+        return self._cancel_token
+
+    def _end_cancellable(self):
+        token = self._cancel_token
+        self._cancel_token = None
+        if token.is_cancelled():
+            # tasks of the stage left in the executor check the flag file, so it is removed by close()
+            self._cancelled_tokens.append(token)
+
+    def _n_workers(self):
+        return self._get_pool().n_workers
+
+    def _cut_voxels(self, l):
+        cut_size = self.size if l == self.n_steps else self.cut_sizes[l-1]
+        return int(np.prod(cut_size))
+
+    def _worker_modules(self):
+        modules = [self.metric.__class__.__module__] + list(self.metric._worker_imports)
+        if self.metric.vectorizer is not None:
+            modules += [self.metric.vectorizer.__class__.__module__] + list(self.metric.vectorizer._worker_imports)
+        if issubclass(self.metric.__class__, BasicPNMMetric) and not self.is_pnm_data:
+            modules += ['revanalyzer.generators.pnm_generator', 'porespy', 'openpnm']
+        return modules
+
+    def _warm_cache(self):
+        # only the tasks running in the calling process use the cache of analyzer, workers read the values into their own caches
+        if self._get_pool().scope != 'thread':
+            return
+        for l, idx in self.cut_ids:
+            self.read(l, idx)
+
+    def _map_reads(self, func, tasks):
+        # map_tasks() for tasks reading metric values, the hits and misses of the caches of workers are added to the statistics
+        results = []
+        for result, hits, misses in map_tasks(self._get_pool(), partial(self._counted_reads, func), tasks):
+            self._worker_hits += hits
+            self._worker_misses += misses
+            results.append(result)
+        return results
+
+    def _counted_reads(self, func, task):
+        if not self._in_worker:
+            return func(task), 0, 0
+        before = self._cache.info()
+        result = func(task)
+        after = self._cache.info()
+        return result, after['hits'] - before['hits'], after['misses'] - before['misses']
+
+    def _image_path(self):
+        if self.datadir is not None:
+            return os.path.join(self.datadir, self.image)
+        return self.image
+
+    def _load_image(self):
+        if isinstance(self.image, str):
+            with span('image_load', image=self.image, mmap=self.mmap):
+                return _read_array(self._image_path(), self.size[0], self.size[1], self.size[2], 'uint8', self.mmap)
+        return self.image
+
+    def _share_image(self, image):
+        scope = self._get_pool().scope
+        if scope == 'thread':
+            return None, ('array', image, image.shape, image.dtype.str)
+        if isinstance(image, np.memmap) or (scope == 'cluster' and isinstance(self.image, str)):
+            return None, ('file', os.path.abspath(self._image_path()), tuple(self.size), 'uint8')
+        if scope == 'cluster':
+            return _share_file(image, os.path.abspath(os.path.join(self.outputdir, '.image_' + self._image_key + '.raw')))
+        if self.shared_memory and scope == 'host':
+            return _share_array(image)
+        return None, None
+
+    def _prepare(self, image):
+        if isinstance(self.metric, Permeability) and not self.is_fdmss_data:
+            os.makedirs(self.gendatadir, exist_ok=True)
+            # FDMSS runs alone, so it may use all the cores of the budget
+            n_threads = min(self.metric.n_threads, get_budget().n_cores)
+            if isinstance(self.image, str):
+                run_fdmss(self.image, self.metric.direction, self.datadir, self.gendatadir, n_threads, self.metric.resolution, self.metric.show_time, self.resume)
+            else:
+                fileout = os.path.join(self.gendatadir, 'image.raw') 
+                _write_array(self.image, fileout)
+                run_fdmss('image.raw', self.metric.direction, self.gendatadir, self.gendatadir, n_threads, self.metric.resolution, self.metric.show_time)
+                os.remove(fileout)
+            fdmss_input = os.path.join(self.gendatadir, 'fdmss_input.txt')            
+            with open(fdmss_input, 'w') as f:
+                lines = [self.metric.direction, str(self.metric.resolution), str(self.size[0])]
+                f.write('\n'.join(lines))
+        if issubclass(self.metric.__class__, BasicPNMMetric) and not self.is_pnm_data:
+            os.makedirs(self.gendatadir, exist_ok=True)
+            generate_PNM(image, self.size, self.n_steps, self.sREV_max_step, self.gendatadir, self.metric.n_threads, self.metric.resolution, self.metric.show_time, self._get_pool(), self.resume, self._cancel_token, self.memory_model, self._image_key)
+            pn_input = os.path.join(self.gendatadir, 'pn_input.txt')            
+            with open(pn_input, 'w') as f:
+                lines = [str(self.n_steps), str(self.sREV_max_step), str(self.metric.resolution)]
+                f.write('\n'.join(lines))
+
+    def _finish(self):
+        if self.store is not None:
+            # text files left by an interrupted generation
+            for outputdir in self._metric_outputdirs():
+                self.store.pack(outputdir)
+            for cut_name in list(self._manifest.entries.keys()):
+                checksum = _output_checksum(self._metric_outputdirs(), cut_name)
+                if checksum is None:
+                    self._manifest.discard(cut_name)
+                else:
+                    self._manifest.entries[cut_name]['checksum'] = checksum
+            self._manifest.save()
+        self._manifest = None
+        self._cache.invalidate()
+
+    def _image_id(self, image):
+        if isinstance(self.image, str):
+            st = os.stat(self._image_path())
+            return [os.path.abspath(self._image_path()), st.st_size, st.st_mtime_ns]
+        return _array_hash(image)
+
+    def _cut_params(self, l, idx):
+        params = self.metric._params()
+        params['size'] = list(self.size)
+        params['cut_size'] = list(self.size) if l == self.n_steps else self.cut_sizes[l-1]
+        params['cut_id'] = idx
+        params['image'] = self._image_key
+        return params
+
+    def _read_store(self, l, idx):
+        # a container left in the folder without the store of analyzer is read only if the manifest records its values as the last output
+        if self.store is not None:
+            return self.store
+        store = _find_store(self._outputdir_cut_values)
+        if store is None:
+            return None
+        cut_name = 'cut'+str(l)+'_'+str(idx)
+        entry = Manifest(self._manifest_path).entries.get(cut_name)
+        if entry is not None and entry['checksum'] == _output_checksum(self._metric_outputdirs(), cut_name):
+            return store
+        return None
+
+    def _pending_ids(self, image, image_key=None, content_hash=None):
+        pending = self._find_pending_ids(image, image_key, content_hash)
+        # the generation writes text files, so the old values of regenerated subsamples are removed from the containers not to hide them
+        if len(pending) > 0 and self.store is not None:
+            for outputdir in self._metric_outputdirs():
+                self.store.remove(outputdir, ['cut'+str(l)+'_'+str(idx) for l, idx in pending])
+        return pending
+
+    def _find_pending_ids(self, image, image_key=None, content_hash=None):
+        # containers not written by the store of analyzer are not updated by the generation, so their subsamples are regenerated
+        for outputdir in self._metric_outputdirs():
+            _remove_stores(outputdir, self.store)
+        self._manifest = Manifest(self._manifest_path)
+        if image_key is None:
+            image_key = self._image_id(image)
+        self._image_key = image_key
+        if content_hash is None and not isinstance(self.image, str):
+            content_hash = image_key
+        ids = _subcube_ids(self.n_steps, self.sREV_max_step)
+        if not self.resume:
+            return self._restore_cached(image, ids, content_hash)
+        pending = []
+        for l, idx in ids:
+            cut_name = 'cut'+str(l)+'_'+str(idx)
+            checksum = _output_checksum(self._metric_outputdirs(), cut_name)
+            if not self._manifest.is_done(cut_name, self._cut_params(l, idx), checksum):
+                pending.append((l, idx))
+        return self._restore_cached(image, pending, content_hash)
+
+    def _restore_cached(self, image, ids, content_hash=None):
+        if self.content_cache is None or len(ids) == 0:
+            return ids
+        if content_hash is None:
+            content_hash = _array_hash(image)
+        self._content_hash = content_hash
+        pending = []
+        for l, idx in ids:
+            values = self.content_cache.get(self._content_key(l, idx))
+            if values is None:
+                pending.append((l, idx))
+                continue
+            cut_name = 'cut'+str(l)+'_'+str(idx)
+            outputdirs = self._metric_outputdirs()
+            for name, value in values.items():
+                i, suffix = name.split(':')
+                with open(os.path.join(outputdirs[int(i)], cut_name + suffix + '.txt'), 'wb') as f:
+                    f.write(value.tobytes())
+            self._record_cut(l, idx, False)
+        return pending
+
+    def _record_cut(self, l, idx, to_cache=True):
+        cut_name = 'cut'+str(l)+'_'+str(idx)
+        if to_cache and self.content_cache is not None:
+            values = {}
+            for i, outputdir in enumerate(self._metric_outputdirs()):
+                paths = glob.glob(os.path.join(outputdir, cut_name + '.txt')) + glob.glob(os.path.join(outputdir, cut_name + '_?.txt'))
+                for path in paths:
+                    suffix = os.path.basename(path)[len(cut_name):-len('.txt')]
+                    with open(path, 'rb') as f:
+                        values[str(i) + ':' + suffix] = np.frombuffer(f.read(), dtype='uint8')
+            if values:
+                self.content_cache.put(self._content_key(l, idx), values)
+        if self.store is not None:
+            # the text files of a completed subsample are moved into the container at once, so they do not pile up during generation
+            for outputdir in self._metric_outputdirs():
+                self.store.pack(outputdir, cut_name)
+        checksum = _output_checksum(self._metric_outputdirs(), cut_name)
+        if checksum is not None:
+            self._manifest.record(cut_name, self._cut_params(l, idx), checksum)
+
+    def _content_key(self, l, idx):
+        return self.content_cache.key(self._content_hash, self._cut_bounds(l, idx), self.metric._params())
+
+    def _cut_bounds(self, l, idx):
+        cut_size = list(self.size) if l == self.n_steps else self.cut_sizes[l-1]
+        return _cut_bounds(self.size, cut_size, idx)
+
+    def _metric_outputdirs(self):
+        if issubclass(self.metric.__class__, BasicPDMetric):
+            return self._outputdirs_cut_values
+        return [self._outputdir_cut_values]
+
+    def _make_cut(self, image, l, idx):
+        if l == self.n_steps:
+            return image
+        with span('cut', cut='cut'+str(l)+'_'+str(idx), cut_size=self._cut_voxels(l)):
+            return make_cut(image, self.size, self.cut_sizes[l-1], idx)
+
+    def _task_cut(self, image, l, idx):
+        # tasks carry the bounds of subsample if workers have access to the image, and the subsample itself otherwise
+        if self._image_ref is not None:
+            return self._cut_bounds(l, idx)
+        return self._make_cut(image, l, idx)
+
+    def _resolve_cut(self, cut, l, idx):
+        if not isinstance(cut, tuple):
+            return cut
+        with span('cut', cut='cut'+str(l)+'_'+str(idx), cut_size=self._cut_voxels(l)):
+            return _slice(_attach_array(self._image_ref), cut)
+
+    def _metric_for_subsample(self, data, cancel_token=None):
+        l = data[0][0]
+        idx = data[0][1]
+        self._generate_cut(self._resolve_cut(data[1], l, idx), l, idx, cancel_token)
+        return data[0]
+
+    def _generate_cut(self, cut, l, idx, cancel_token=None):
         if issubclass(self.metric.__class__, BasicPDMetric):
             outputdir = self._outputdirs_cut_values
         else:
             outputdir = self._outputdir_cut_values
-        l = data[0][0]
-        idx = data[0][1]
-        cut = data[1]
         cut_name = 'cut'+str(l)+'_'+str(idx)
-        result = self.metric.generate(cut, cut_name, outputdir, self.gendatadir)
+        with cancel_scope(cancel_token), span('compute', metric=self.metric.__class__.__name__, cut=cut_name, cut_size=self._cut_voxels(l)):
+            result = self.metric.generate(cut, cut_name, outputdir, self.gendatadir)
     
-    def _vectorize_subsample(self, data):
+    def _generate_batch(self, image, ids):
+        cuts = [('cut'+str(l)+'_'+str(idx), self._cut_bounds(l, idx)) for l, idx in ids]
+        with cancel_scope(self._cancel_token), span('compute_batch', metric=self.metric.__class__.__name__, n_cuts=len(cuts)):
+            self.metric.generate_batch(image, cuts, self._metric_outputdirs()[0], self.gendatadir)
+        for l, idx in ids:
+            self._record_cut(l, idx)
+            yield (l, idx)
+
+    def _vectorize_subsample(self, data, cancel_token=None):
+        if cancel_token is not None:
+            cancel_token.check()
+        with span('vectorize_cut', metric=self.metric.__class__.__name__, cut='cut'+str(data[0])+'_'+str(data[1]), cut_size=self._cut_voxels(data[0])):
+            return self._vectorize_subsample_values(data)
+
+    def _vectorize_subsample_values(self, data):
         step = data[0]
         v1 = self.read(step, data[1])
         if self.metric.directional:
@@ -465,7 +937,9 @@ class REVAnalyzer:
             return np.nan
         return (step, str_elem, result[2])
      
-    def _distance_for_subsamples(self, ids, step):
+    def _distance_for_subsamples(self, ids, step, cancel_token=None):
+        if cancel_token is not None:
+            cancel_token.check()
         v1 = self.read(step, ids[0])
         if ids[0] == ids[1]:
             v2 = self.read(step + 1, ids[0])
@@ -477,4 +951,3 @@ class REVAnalyzer:
             return max(delta)
         else:
             return delta
-
@@ -4,4 +4,5 @@ Main source folder.
 """
 
 from .REV_analyzer import REVAnalyzer
+from .multi_REV_analyzer import MultiREVAnalyzer
 
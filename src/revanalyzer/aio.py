@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+Support of asyncio API of analyzers: blocking stages run in helper threads, their tasks run in the executor of analyzer,
+and the number of CPU cores used by analyses running concurrently in one event loop is limited by CoreLimiter.
+"""
+import asyncio
+import os
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+_threads = None
+_done = object()
+
+
+class CoreLimiter:
+    """
+    Limit of CPU cores used by the analyses running concurrently. An analysis reserves the cores of its workers before a stage
+    and waits if they are not available.
+    """
+    def __init__(self, n_cores=None):
+        """
+        **Input:**
+
+        	n_cores (int): number of available cores. If None, the number of CPUs is used, default: None.
+        """
+        self.n_cores = n_cores if n_cores is not None else os.cpu_count()
+        self._states = weakref.WeakKeyDictionary()
+
+    def used(self):
+        """
+        Number of cores reserved in the running event loop.
+        """
+        state = self._states.get(asyncio.get_running_loop())
+        return 0 if state is None else state[1]
+
+    @asynccontextmanager
+    async def reserve(self, n):
+        """
+        Asynchronous context manager reserving cores for its body.
+
+        **Input:**
+
+        	n (int): number of cores. Requests exceeding n_cores reserve all the cores.
+        """
+        n = min(n, self.n_cores)
+        if n <= 0:
+            yield
+            return
+        loop = asyncio.get_running_loop()
+        if loop not in self._states:
+            self._states[loop] = [asyncio.Condition(), 0]
+        state = self._states[loop]
+        async with state[0]:
+            await state[0].wait_for(lambda: state[1] + n <= self.n_cores)
+            state[1] += n
+        try:
+            yield
+        finally:
+            async with state[0]:
+                state[1] -= n
+                state[0].notify_all()
+
+
+_default_limiter = CoreLimiter()
+
+
+def _submit(func, *args):
+    global _threads
+    if _threads is None:
+        _threads = ThreadPoolExecutor(thread_name_prefix='revanalyzer-aio')
+    return _threads.submit(func, *args)
+
+
+async def _call(analyzer, func, *args):
+    # runs a blocking stage, on cancellation the tasks of the stage are cancelled and the stage is awaited
+    token = analyzer._start_cancellable()
+    future = _submit(func, *args)
+    try:
+        return await asyncio.wrap_future(future)
+    except asyncio.CancelledError:
+        token.cancel()
+        await asyncio.gather(asyncio.wrap_future(future), return_exceptions=True)
+        raise
+    finally:
+        analyzer._end_cancellable()
+
+
+async def _iterate(analyzer, iterator):
+    # iterates over a blocking generator of completions, on cancellation the tasks are cancelled and the generator is closed
+    token = analyzer._start_cancellable()
+    future = None
+    try:
+        while True:
+            future = _submit(next, iterator, _done)
+            elem = await asyncio.wrap_future(future)
+            if elem is _done:
+                return
+            yield elem
+    except BaseException:
+        token.cancel()
+        raise
+    finally:
+        if future is not None and not future.done():
+            await asyncio.gather(asyncio.wrap_future(future), return_exceptions=True)
+        await asyncio.wrap_future(_submit(iterator.close))
+        analyzer._end_cancellable()
@@ -0,0 +1,6 @@
+# -*- coding: utf-8 -*-
+"""Work queues between distributed executor and worker processes on other hosts."""
+
+from .basic_broker import BasicBroker
+from .filesystem_broker import FileSystemBroker
+from .tcp_broker import TCPBroker
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""Definition of basic broker"""
+
+from abc import ABC, abstractmethod
+
+
+class BasicBroker(ABC):
+    """
+    Base class for brokers. (Don't use it directly but derive from it).
+
+    Broker is a work queue between DistributedExecutor, which publishes the tasks, and worker processes, which can run on other
+    hosts and pull the tasks. Tasks and results are passed as bytes with string identifiers. The executor side calls start()
+    before publishing, the worker side calls connect() before pulling. Broker objects can be pickled and sent to local worker processes.
+    
+    The attribute 'lease' is the time in seconds after which a task taken by a worker that stopped renewing it is published 
+    again, None if the broker does not re-publish the tasks of lost workers.
+    """
+    lease = None
+
+    def start(self):
+        """
+        Prepare the broker for a new session on the executor side.
+        """
+        pass
+
+    def connect(self):
+        """
+        Connect to the broker on the worker side.
+        """
+        pass
+
+    @abstractmethod
+    def put_task(self, task_id, payload):
+        """
+        Publish a task.
+
+        **Input:**
+
+        	task_id (str): identifier of the task;
+
+        	payload (bytes): pickled task.
+        """
+        pass
+
+    @abstractmethod
+    def get_task(self, timeout=None):
+        """
+        Pull a task. Each task is received by one worker only.
+
+        **Input:**
+
+        	timeout (float): maximal waiting time in seconds. If None, wait until a task is published or the broker is stopped, default: None.
+
+        **Output:**
+
+        	tuple (task_id, payload) or None if the broker is stopped or the time is out.
+        """
+        pass
+
+    @abstractmethod
+    def put_result(self, task_id, payload):
+        """
+        Publish the result of a task.
+
+        **Input:**
+
+        	task_id (str): identifier of the task;
+
+        	payload (bytes): pickled result.
+        """
+        pass
+
+    @abstractmethod
+    def get_result(self, timeout=None):
+        """
+        Receive a result of any completed task.
+
+        **Input:**
+
+        	timeout (float): maximal waiting time in seconds. If None, wait until a result is published, default: None.
+
+        **Output:**
+
+        	tuple (task_id, payload) or None if the time is out.
+        """
+        pass
+
+    def renew(self, task_id):
+        """
+        Extend the lease of a task taken by the worker. Called periodically by the worker while the task is running.
+
+        **Input:**
+
+        	task_id (str): identifier of the task.
+        """
+        pass
+
+    @abstractmethod
+    def stop(self):
+        """
+        Signal the workers to exit when all the published tasks are taken.
+        """
+        pass
+
+    def shutdown(self):
+        """
+        Release the resources of the broker on the executor side.
+        """
+        pass
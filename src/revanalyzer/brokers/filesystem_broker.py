@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""Definition of file system broker. Tasks and results are files in a folder on a file system shared by all the hosts;
+a worker takes a task by renaming its file, which is atomic, so each task is received by one worker only. The worker renews
+the modification time of the taken file while the task is running; a taken file that is not renewed for the lease time 
+(the worker is killed or its host is lost) is renamed back, and the task is received by another worker."""
+
+import os
+import time
+from .basic_broker import BasicBroker
+
+
+class FileSystemBroker(BasicBroker):
+    """
+    Class describing file system broker.
+    """
+    def __init__(self, root, poll_interval=0.1, lease=60.):
+        """
+        **Input:**
+
+        	root (str): folder of the broker, should be accessible by all the hosts;
+
+        	poll_interval (float): time in seconds between checks of the folder for new tasks and results, default: 0.1;
+
+        	lease (float): time in seconds after which a taken task that is not renewed by its worker is published again. 
+        	It should exceed the difference of the clocks of the hosts. If None, the tasks of lost workers are not published again, default: 60.
+        """
+        self.root = os.path.abspath(root)
+        self.poll_interval = poll_interval
+        self.lease = lease
+        self._tasksdir = os.path.join(self.root, 'tasks')
+        self._claimeddir = os.path.join(self.root, 'claimed')
+        self._resultsdir = os.path.join(self.root, 'results')
+        self._stopfile = os.path.join(self.root, 'stopped')
+
+    def start(self):
+        """
+        Create the folders of the broker and remove the stop signal and the taken tasks left by the previous session.
+        """
+        for path in [self._tasksdir, self._claimeddir, self._resultsdir]:
+            os.makedirs(path, exist_ok=True)
+        for name in _list(self._claimeddir, '.task'):
+            _remove(os.path.join(self._claimeddir, name))
+        if os.path.isfile(self._stopfile):
+            os.remove(self._stopfile)
+
+    def put_task(self, task_id, payload):
+        _write_file(os.path.join(self._tasksdir, task_id + '.task'), payload)
+
+    def get_task(self, timeout=None):
+        start_time = time.time()
+        while True:
+            if self.lease is not None:
+                self._release_expired()
+            for name in _list(self._tasksdir, '.task'):
+                path = os.path.join(self._claimeddir, name)
+                try:
+                    os.rename(os.path.join(self._tasksdir, name), path)
+                    # the lease starts when the task is taken, not when it is published
+                    os.utime(path)
+                    with open(path, 'rb') as f:
+                        return name[:-len('.task')], f.read()
+                except FileNotFoundError:
+                    # the task is taken by another worker
+                    continue
+            if os.path.isfile(self._stopfile):
+                return None
+            if timeout is not None and time.time() - start_time >= timeout:
+                return None
+            time.sleep(self.poll_interval)
+
+    def put_result(self, task_id, payload):
+        _write_file(os.path.join(self._resultsdir, task_id + '.result'), payload)
+        _remove(os.path.join(self._claimeddir, task_id + '.task'))
+
+    def get_result(self, timeout=None):
+        start_time = time.time()
+        while True:
+            for name in _list(self._resultsdir, '.result'):
+                path = os.path.join(self._resultsdir, name)
+                try:
+                    with open(path, 'rb') as f:
+                        payload = f.read()
+                    os.remove(path)
+                except FileNotFoundError:
+                    continue
+                return name[:-len('.result')], payload
+            if timeout is not None and time.time() - start_time >= timeout:
+                return None
+            time.sleep(self.poll_interval)
+
+    def renew(self, task_id):
+        try:
+            os.utime(os.path.join(self._claimeddir, task_id + '.task'))
+        except FileNotFoundError:
+            # the task is published again and taken by another worker, the first result is used
+            pass
+
+    def stop(self):
+        with open(self._stopfile, 'w'):
+            pass
+
+    def _release_expired(self):
+        now = time.time()
+        for name in _list(self._claimeddir, '.task'):
+            path = os.path.join(self._claimeddir, name)
+            try:
+                if now - os.path.getmtime(path) > self.lease:
+                    os.rename(path, os.path.join(self._tasksdir, name))
+            except FileNotFoundError:
+                # the task is completed or released by another worker
+                continue
+
+
+def _list(path, ext):
+    # files are listed in order of names, so the tasks are taken in order of publishing
+    try:
+        return sorted(name for name in os.listdir(path) if name.endswith(ext))
+    except FileNotFoundError:
+        return []
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _write_file(path, payload):
+    tmp_path = path + '.' + str(os.getpid()) + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(payload)
+    os.replace(tmp_path, path)
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""Definition of TCP broker. Task and result queues are served by multiprocessing manager; by default the broker listens
+on localhost, so that it can be used on a single machine, and it can listen on a public address for workers on other hosts."""
+
+import os
+import queue
+import threading
+from multiprocessing.managers import BaseManager, EventProxy
+from .basic_broker import BasicBroker
+
+_tasks = None
+_results = None
+_stopped = None
+
+
+def _task_queue():
+    global _tasks
+    if _tasks is None:
+        _tasks = queue.Queue()
+    return _tasks
+
+
+def _result_queue():
+    global _results
+    if _results is None:
+        _results = queue.Queue()
+    return _results
+
+
+def _stop_event():
+    global _stopped
+    if _stopped is None:
+        _stopped = threading.Event()
+    return _stopped
+
+
+class _QueueManager(BaseManager):
+    pass
+
+
+_QueueManager.register('tasks', callable=_task_queue)
+_QueueManager.register('results', callable=_result_queue)
+_QueueManager.register('stopped', callable=_stop_event, proxytype=EventProxy)
+
+
+class TCPBroker(BasicBroker):
+    """
+    Class describing TCP broker.
+    """
+    def __init__(self, address=None, authkey=None, poll_interval=0.5):
+        """
+        **Input:**
+
+        	address (tuple (str, int)): address served by the broker. If None, the broker serves on localhost with a free port, default: None;
+
+        	authkey (bytes): authentication key of workers. If None, a random key is generated, default: None;
+
+        	poll_interval (float): time in seconds between checks of the stop signal by waiting workers, default: 0.5.
+        """
+        self.address = tuple(address) if address is not None else ('127.0.0.1', 0)
+        self.authkey = authkey if authkey is not None else os.urandom(16)
+        self.poll_interval = poll_interval
+        self._manager = None
+        self._queues = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_manager'] = None
+        state['_queues'] = None
+        return state
+
+    def start(self):
+        """
+        Start the server of the queues. The actual address is available as the attribute 'address'.
+        """
+        self._manager = _QueueManager(address=self.address, authkey=self.authkey)
+        self._manager.start()
+        self.address = self._manager.address
+        self._queues = (self._manager.tasks(), self._manager.results(), self._manager.stopped())
+
+    def connect(self):
+        manager = _QueueManager(address=self.address, authkey=self.authkey)
+        manager.connect()
+        self._queues = (manager.tasks(), manager.results(), manager.stopped())
+
+    def put_task(self, task_id, payload):
+        self._queues[0].put((task_id, payload))
+
+    def get_task(self, timeout=None):
+        tasks, results, stopped = self._queues
+        waited = 0.
+        while timeout is None or waited < timeout:
+            wait = self.poll_interval if timeout is None else min(self.poll_interval, timeout - waited)
+            try:
+                return tasks.get(timeout=wait)
+            except queue.Empty:
+                if stopped.is_set():
+                    return None
+            except (EOFError, OSError):
+                # the broker is shut down
+                return None
+            waited += wait
+        return None
+
+    def put_result(self, task_id, payload):
+        self._queues[1].put((task_id, payload))
+
+    def get_result(self, timeout=None):
+        try:
+            return self._queues[1].get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def stop(self):
+        self._queues[2].set()
+
+    def shutdown(self):
+        if self._manager is not None:
+            self._manager.shutdown()
+            self._manager = None
+        self._queues = None
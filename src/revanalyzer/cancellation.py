@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""
+Cooperative cancellation of the tasks of an analysis. A cancellation token is a flag file in the output folder, so it is
+visible to worker threads, worker processes and workers on other hosts sharing the file system. Tasks check the token before
+they start, external programs (Julia scripts) are polled while they run and are killed when the token is set.
+"""
+import os
+import subprocess
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from . import memory
+from .threads import _subprocess_env
+
+_current = threading.local()
+
+
+class Cancelled(Exception):
+    """
+    Exception raised by the tasks of a cancelled analysis.
+    """
+    pass
+
+
+class CancelToken:
+    """
+    Cancellation flag shared by the main process and the workers.
+    """
+    def __init__(self, folder):
+        """
+        **Input:**
+
+        	folder (str): folder of the flag file, should be accessible by all the workers.
+        """
+        self.path = os.path.join(os.path.abspath(folder), '.cancel_' + uuid.uuid4().hex)
+        self._cancelled = False
+
+    def cancel(self):
+        """
+        Set the flag.
+        """
+        self._cancelled = True
+        with open(self.path, 'w'):
+            pass
+
+    def is_cancelled(self):
+        """
+        Check the flag.
+        """
+        return self._cancelled or os.path.isfile(self.path)
+
+    def check(self):
+        """
+        Raise Cancelled if the flag is set.
+        """
+        if self.is_cancelled():
+            raise Cancelled("Analysis is cancelled.")
+
+    def clear(self):
+        """
+        Remove the flag file.
+        """
+        if os.path.isfile(self.path):
+            os.remove(self.path)
+
+
+@contextmanager
+def cancel_scope(token):
+    """
+    Context manager making the token current in the calling thread, so that external programs started in its body are killed
+    when the token is set.
+
+    **Input:**
+
+    	token (CancelToken or None): cancellation token. If None, the body cannot be cancelled.
+    """
+    previous = getattr(_current, 'token', None)
+    _current.token = token
+    try:
+        if token is not None:
+            token.check()
+        yield
+    finally:
+        _current.token = previous
+
+
+def call(args, poll_interval=0.2):
+    """
+    Version of subprocess.call which kills the process if the current cancellation token is set. The process gets the thread
+    limit of the calling worker in its environment (JULIA_NUM_THREADS, OMP_NUM_THREADS and others), its peak memory is added 
+    to the peak of the task observed by the memory model.
+
+    **Input:**
+
+    	args (list(str)): command line;
+
+    	poll_interval (float): time in seconds between checks of the token, default: 0.2.
+
+    **Output:**
+
+    	return code of the process.
+    """
+    token = getattr(_current, 'token', None)
+    proc = subprocess.Popen(args, env=_subprocess_env())
+    delay = 0.0005
+    try:
+        while True:
+            # the process is waited by wait4 to get its own peak memory for the memory model
+            pid, status, usage = os.wait4(proc.pid, 0 if token is None else os.WNOHANG)
+            if pid:
+                proc.returncode = os.waitstatus_to_exitcode(status)
+                memory._record_child(usage.ru_maxrss*1024)
+                return proc.returncode
+            time.sleep(delay)
+            delay = min(2*delay, poll_interval)
+            token.check()
+    finally:
+        if proc.returncode is None:
+            proc.kill()
+            proc.wait()
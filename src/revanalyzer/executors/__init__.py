@@ -0,0 +1,8 @@
+# -*- coding: utf-8 -*-
+"""Execution backends used by all the parallel stages of REV analysis."""
+
+from .basic_executor import BasicExecutor, make_executor
+from .serial_executor import SerialExecutor
+from .thread_executor import ThreadExecutor
+from .process_executor import ProcessExecutor
+from .distributed_executor import DistributedExecutor, run_worker
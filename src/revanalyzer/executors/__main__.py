@@ -0,0 +1,6 @@
+# -*- coding: utf-8 -*-
+"""Worker processes of distributed executor, see revanalyzer.executors.distributed_executor."""
+
+from .distributed_executor import _main
+
+_main()
@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""Definition of basic executor"""
+
+from abc import ABC, abstractmethod
+from concurrent.futures import Future, as_completed
+
+
+class BasicExecutor(ABC):
+    """
+    Base class for executors. (Don't use it directly but derive from it).
+    
+    Executor runs the tasks of parallel stages. Derived classes implement submit(); map() and imap_unordered() have the 
+    same meaning as for multiprocessing.Pool, so an executor can be used everywhere a pool is accepted.
+    
+    The attribute 'scope' shows where the tasks are executed: 'thread' - in the calling process (no pickling of tasks, 
+    the image is accessed directly), 'host' - in other processes on the same host (the image can be passed through shared 
+    memory), 'cluster' - on other hosts (the image is passed as a file on a shared file system or as pickled subsamples).
+    """
+    scope = None
+
+    def __init__(self, n_workers):
+        """
+        **Input:**
+        
+        	n_workers (int): number of workers.
+        """
+        self.n_workers = n_workers
+
+    @abstractmethod
+    def submit(self, func, *args, **kwargs):
+        """
+        Schedule the call func(*args, **kwargs).
+        
+        **Input:**
+        
+        	func (function): function to be called;
+        	
+        	args, kwargs: arguments of the call.
+        
+        **Output:**
+        
+        	concurrent.futures.Future representing the result of the call.
+        """
+        pass
+
+    def map(self, func, iterable, chunksize=None):
+        """
+        Apply a function to each element of iterable.
+        
+        **Input:**
+        
+        	func (function): function to be applied;
+        	
+        	iterable: arguments of func;
+        	
+        	chunksize (int): number of elements sent to a worker at once, default: None.
+        
+        **Output:**
+        
+        	list of results in order of arguments.
+        """
+        futures = [self.submit(_run_chunk, func, chunk) for chunk in _chunks(iterable, chunksize)]
+        return [result for future in futures for result in future.result()]
+
+    def imap_unordered(self, func, iterable, chunksize=1):
+        """
+        Apply a function to each element of iterable and return the results in order of completion.
+        
+        **Input:**
+        
+        	func (function): function to be applied;
+        	
+        	iterable: arguments of func;
+        	
+        	chunksize (int): number of elements sent to a worker at once, default: 1.
+        
+        **Output:**
+        
+        	iterator over results.
+        """
+        futures = [self.submit(_run_chunk, func, chunk) for chunk in _chunks(iterable, chunksize)]
+        for future in as_completed(futures):
+            for result in future.result():
+                yield result
+
+    def close(self):
+        """
+        Prevent submission of new tasks.
+        """
+        pass
+
+    def join(self):
+        """
+        Wait for the workers to exit. close() should be called before.
+        """
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        self.join()
+
+
+def make_executor(executor, n_workers, modules=(), budget=None):
+    """
+    Create an executor by name.
+    
+    **Input:**
+    
+    	executor (str or subclass of BasicExecutor): 'serial', 'thread', 'process' or 'distributed'. An executor object is returned as is;
+    	
+    	n_workers (int): number of workers;
+    	
+    	modules (list(str)): modules imported by worker processes at start, default: ();
+    	
+    	budget (ThreadBudget): split of the cores between the workers and their library threads. If None, the active budget is used, default: None.
+    
+    **Output:**
+    
+    	executor (subclass of BasicExecutor).
+    """
+    if isinstance(executor, BasicExecutor):
+        return executor
+    from .serial_executor import SerialExecutor
+    from .thread_executor import ThreadExecutor
+    from .process_executor import ProcessExecutor
+    from .distributed_executor import DistributedExecutor
+    if executor == 'serial':
+        return SerialExecutor()
+    if executor == 'thread':
+        return ThreadExecutor(n_workers, budget)
+    if executor == 'process':
+        return ProcessExecutor(n_workers, modules, budget=budget)
+    if executor == 'distributed':
+        return DistributedExecutor(n_workers, budget=budget)
+    raise ValueError("Executor should be 'serial', 'thread', 'process', 'distributed' or an object of a class derived from BasicExecutor.")
+
+
+def _chunks(iterable, chunksize):
+    chunksize = max(chunksize or 1, 1)
+    chunk = []
+    for elem in iterable:
+        chunk.append(elem)
+        if len(chunk) == chunksize:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _run_chunk(func, chunk):
+    return [func(elem) for elem in chunk]
+
+
+def _completed(func, *args, **kwargs):
+    future = Future()
+    try:
+        future.set_result(func(*args, **kwargs))
+    except BaseException as e:
+        future.set_exception(e)
+    return future
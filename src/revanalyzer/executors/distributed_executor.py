@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+"""Definition of distributed executor. Tasks are published to a broker (a work queue served over TCP or a folder on
+a shared file system) and are pulled by worker processes, which can be started on other hosts by
+
+    python -m revanalyzer.executors --address host:port --authkey key --processes n [--cores m] [--pin]
+
+for TCPBroker or
+
+    python -m revanalyzer.executors --root folder --processes n
+
+for FileSystemBroker. Output folders and image files should be located on a file system shared by all the hosts. By default 
+the executor serves TCPBroker on localhost and starts local worker processes as a stand-in for remote hosts."""
+
+import argparse
+import itertools
+import multiprocessing
+import pickle
+import threading
+import uuid
+from concurrent.futures import Future
+from .basic_executor import BasicExecutor
+from ..brokers import FileSystemBroker, TCPBroker
+from ..threads import ThreadBudget, get_budget, _init_worker
+
+
+class DistributedExecutor(BasicExecutor):
+    """
+    Class describing distributed executor.
+    """
+    scope = 'cluster'
+
+    def __init__(self, n_workers, broker=None, local_workers=None, budget=None):
+        """
+        **Input:**
+
+        	n_workers (int): total number of worker processes on all the hosts;
+
+        	broker (subclass of BasicBroker): work queue between the executor and the workers. If None, TCPBroker on localhost is used, default: None;
+
+        	local_workers (int): number of worker processes started by the executor on the local host. If None, n_workers processes
+        	are started when no broker is given and no processes otherwise, default: None;
+
+        	budget (ThreadBudget): split of the cores of the local host between the local worker processes and their library threads.
+        	If None, the active budget is used, default: None.
+        """
+        super().__init__(n_workers)
+        if local_workers is None:
+            local_workers = n_workers if broker is None else 0
+        self.broker = broker if broker is not None else TCPBroker()
+        self.broker.start()
+        self._futures = {}
+        self._lock = threading.Lock()
+        self._session = uuid.uuid4().hex[:8]
+        self._ids = itertools.count()
+        self._closed = False
+        self._joined = False
+        self._broken = None
+        self._all_local = local_workers >= n_workers
+        self._workers = _worker_processes(self.broker, local_workers, budget)
+        self._collector = threading.Thread(target=self._collect, daemon=True)
+        self._collector.start()
+
+    def submit(self, func, *args, **kwargs):
+        """
+        Publish the call func(*args, **kwargs) to the task queue.
+
+        **Input:**
+
+        	func (function): function to be called;
+
+        	args, kwargs: arguments of the call.
+
+        **Output:**
+
+        	concurrent.futures.Future representing the result of the call.
+        """
+        if self._closed:
+            raise RuntimeError("Executor is closed.")
+        if self._broken is not None:
+            raise RuntimeError(self._broken)
+        future = Future()
+        future.set_running_or_notify_cancel()
+        # identifiers are ordered as the tasks are published, so the workers take them in this order
+        task_id = self._session + '-' + '%09d' % next(self._ids)
+        with self._lock:
+            self._futures[task_id] = future
+        self.broker.put_task(task_id, pickle.dumps((func, args, kwargs)))
+        return future
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self.broker.stop()
+
+    def join(self):
+        for worker in self._workers:
+            worker.join()
+        self._joined = True
+        self._collector.join()
+        self.broker.shutdown()
+
+    def _collect(self):
+        while not self._joined:
+            try:
+                item = self.broker.get_result(timeout=0.5)
+            except (EOFError, OSError):
+                return
+            if item is None:
+                self._check_workers()
+                continue
+            task_id, data = item
+            with self._lock:
+                # results of other sessions left in the broker are skipped
+                future = self._futures.pop(task_id, None)
+            if future is None:
+                continue
+            ok, value = pickle.loads(data)
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+
+
+    def _check_workers(self):
+        # the task taken by a lost worker is published again only by a broker with lease and only if some worker is left to take it
+        failed = [worker for worker in self._workers if worker.exitcode not in (None, 0)]
+        if not failed:
+            return
+        left = not self._all_local or any(worker.exitcode is None for worker in self._workers)
+        if self.broker.lease is not None and left:
+            return
+        with self._lock:
+            self._broken = "Local worker process exited with code " + str(failed[0].exitcode) + "."
+            futures = list(self._futures.values())
+            self._futures.clear()
+        for future in futures:
+            future.set_exception(RuntimeError(self._broken))
+
+
+def run_worker(broker, n_processes=1, budget=None):
+    """
+    Run worker processes pulling the tasks of distributed executor until the broker is stopped.
+
+    **Input:**
+
+    	broker (subclass of BasicBroker): broker of distributed executor;
+
+    	n_processes (int): number of worker processes, default: 1;
+
+    	budget (ThreadBudget): split of the cores of the host between the worker processes and their library threads. If None,
+    	the active budget is used, default: None.
+    """
+    workers = _worker_processes(broker, n_processes, budget)
+    for worker in workers:
+        worker.join()
+
+
+def _worker_processes(broker, n_processes, budget):
+    if budget is None:
+        budget = get_budget()
+    cpu_sets = budget.cpu_sets(n_processes) if budget.pin else [None]*n_processes
+    workers = [multiprocessing.Process(target=_run_worker, args=(broker, budget.inner_threads(n_processes), cpus)) for cpus in cpu_sets]
+    for worker in workers:
+        worker.start()
+    return workers
+
+
+def _run_worker(broker, n_threads, cpus):
+    _init_worker(n_threads, cpus)
+    broker.connect()
+    while True:
+        item = broker.get_task()
+        if item is None:
+            return
+        task_id, payload = item
+        done = threading.Event()
+        if broker.lease is not None:
+            threading.Thread(target=_renew_lease, args=(broker, task_id, done), daemon=True).start()
+        try:
+            func, args, kwargs = pickle.loads(payload)
+            result = (True, func(*args, **kwargs))
+        except Exception as e:
+            result = (False, e)
+        finally:
+            done.set()
+        try:
+            data = pickle.dumps(result)
+        except Exception as e:
+            data = pickle.dumps((False, RuntimeError(repr(e))))
+        broker.put_result(task_id, data)
+
+
+def _renew_lease(broker, task_id, done):
+    while not done.wait(broker.lease/4):
+        broker.renew(task_id)
+
+
+def _main(argv=None):
+    parser = argparse.ArgumentParser(description='Worker processes of REVAnalyzer distributed executor.')
+    parser.add_argument('--address', default=None, help='host:port of TCP broker')
+    parser.add_argument('--authkey', default=None, help='authentication key of TCP broker as hex string')
+    parser.add_argument('--root', default=None, help='folder of file system broker')
+    parser.add_argument('--processes', type=int, default=1)
+    parser.add_argument('--cores', type=int, default=None, help='number of cores split between the processes and their library threads')
+    parser.add_argument('--pin', action='store_true', help='pin the processes to disjoint sets of cores')
+    args = parser.parse_args(argv)
+    if args.root is not None:
+        broker = FileSystemBroker(args.root)
+    elif args.address is not None and args.authkey is not None:
+        host, port = args.address.rsplit(':', 1)
+        broker = TCPBroker((host, int(port)), bytes.fromhex(args.authkey))
+    else:
+        parser.error('either --root or --address and --authkey should be given')
+    run_worker(broker, args.processes, ThreadBudget(args.cores, args.pin))
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""Definition of process executor, keeping a persistent pool of worker processes on the local host."""
+
+import multiprocessing
+import importlib
+from concurrent.futures import Future
+from multiprocessing import resource_tracker
+from .basic_executor import BasicExecutor
+from ..threads import get_budget, _init_worker
+
+
+class ProcessExecutor(BasicExecutor):
+    """
+    Class describing process executor.
+    """
+    scope = 'host'
+
+    def __init__(self, n_workers, modules=(), pool=None, budget=None):
+        """
+        **Input:**
+        
+        	n_workers (int): number of worker processes;
+        	
+        	modules (list(str)): modules imported by worker processes at start, so that the first tasks do not pay for imports, default: ();
+        	
+        	pool (multiprocessing.pool.Pool): existing pool to be used instead of creating a new one. Such a pool is not closed by the executor, default: None;
+        	
+        	budget (ThreadBudget): split of the cores between the workers and their library threads. If None, the active budget is used, default: None.
+        """
+        super().__init__(n_workers)
+        if pool is None:
+            # workers attaching shared memory must report to the tracker of the parent process
+            resource_tracker.ensure_running()
+            if budget is None:
+                budget = get_budget()
+            cpu_sets = budget.cpu_sets(n_workers) if budget.pin else None
+            pool = multiprocessing.Pool(processes=n_workers, initializer=_start_worker,
+                                        initargs=(list(modules), budget.inner_threads(n_workers), multiprocessing.Value('i', 0), cpu_sets))
+            self._own_pool = True
+        else:
+            self.n_workers = getattr(pool, '_processes', n_workers)
+            self._own_pool = False
+        self._pool = pool
+
+    def submit(self, func, *args, **kwargs):
+        """
+        Schedule the call func(*args, **kwargs) in a worker process.
+        
+        **Input:**
+        
+        	func (function): function to be called;
+        	
+        	args, kwargs: arguments of the call.
+        
+        **Output:**
+        
+        	concurrent.futures.Future representing the result of the call.
+        """
+        future = Future()
+        future.set_running_or_notify_cancel()
+        self._pool.apply_async(func, args, kwargs, callback=future.set_result, error_callback=future.set_exception)
+        return future
+
+    def map(self, func, iterable, chunksize=None):
+        return self._pool.map(func, iterable, chunksize)
+
+    def imap_unordered(self, func, iterable, chunksize=1):
+        return self._pool.imap_unordered(func, iterable, chunksize)
+
+    def close(self):
+        if self._own_pool:
+            self._pool.close()
+
+    def join(self):
+        if self._own_pool:
+            self._pool.join()
+
+
+def _start_worker(modules, n_threads, counter, cpu_sets):
+    # workers take the CPU sets in order of their start
+    cpus = None
+    if cpu_sets is not None:
+        with counter.get_lock():
+            cpus = cpu_sets[counter.value % len(cpu_sets)]
+            counter.value += 1
+    _init_worker(n_threads, cpus)
+    _preload_modules(modules)
+
+
+def _preload_modules(modules):
+    for module in modules:
+        try:
+            importlib.import_module(module)
+        except ImportError:
+            # the error is raised again by the first task needing the module
+            pass
@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+"""Definition of serial executor, running all the tasks in the calling process one by one. Useful for debugging."""
+
+from .basic_executor import BasicExecutor, _completed
+
+
+class SerialExecutor(BasicExecutor):
+    """
+    Class describing serial executor.
+    """
+    scope = 'thread'
+
+    def __init__(self):
+        super().__init__(1)
+
+    def submit(self, func, *args, **kwargs):
+        """
+        Call func(*args, **kwargs) immediately.
+        
+        **Input:**
+        
+        	func (function): function to be called;
+        	
+        	args, kwargs: arguments of the call.
+        
+        **Output:**
+        
+        	concurrent.futures.Future with the result of the call.
+        """
+        return _completed(func, *args, **kwargs)
+
+    def map(self, func, iterable, chunksize=None):
+        return [func(elem) for elem in iterable]
+
+    def imap_unordered(self, func, iterable, chunksize=1):
+        for elem in iterable:
+            yield func(elem)
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""Definition of thread executor. Tasks are run by threads of the calling process without pickling, which is efficient for 
+metrics spending their time in code releasing GIL (numpy, gudhi, external solvers and Julia subprocesses)."""
+
+from concurrent.futures import ThreadPoolExecutor
+from .basic_executor import BasicExecutor
+from ..threads import get_budget, _thread_limit
+
+
+class ThreadExecutor(BasicExecutor):
+    """
+    Class describing thread executor.
+    """
+    scope = 'thread'
+
+    def __init__(self, n_workers, budget=None):
+        """
+        **Input:**
+        
+        	n_workers (int): number of threads;
+        	
+        	budget (ThreadBudget): split of the cores between the workers and the threads of external programs started by tasks.
+        	If None, the active budget is used, default: None.
+        """
+        super().__init__(n_workers)
+        if budget is None:
+            budget = get_budget()
+        self._n_threads = budget.inner_threads(n_workers)
+        self._executor = ThreadPoolExecutor(max_workers=n_workers, thread_name_prefix='revanalyzer')
+
+    def submit(self, func, *args, **kwargs):
+        """
+        Schedule the call func(*args, **kwargs) in a worker thread.
+        
+        **Input:**
+        
+        	func (function): function to be called;
+        	
+        	args, kwargs: arguments of the call.
+        
+        **Output:**
+        
+        	concurrent.futures.Future representing the result of the call.
+        """
+        return self._executor.submit(_limited_call, self._n_threads, func, *args, **kwargs)
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+
+    def join(self):
+        self._executor.shutdown(wait=True)
+
+
+def _limited_call(n_threads, func, *args, **kwargs):
+    with _thread_limit(n_threads):
+        return func(*args, **kwargs)
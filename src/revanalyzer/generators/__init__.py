@@ -5,4 +5,7 @@ Metric generators based on external software.
 
 from .pnm_generator import generate_PNM
 from .fdmss_generator import run_fdmss
-from .utils import make_cut, _read_array, _write_array, _subcube_ids
+from .summed_area_table import SummedAreaTable
+from .correlation_functions import correlation_functions, _batch_size
+from .minkowski_functionals import MinkowskiFunctionals, EulerCharacteristic, _shared_functionals, _functionals_of
+from .utils import make_cut, _read_array, _write_array, _subcube_ids, _share_array, _share_file, _attach_array, _array_hash, _cut_bounds, _slice
@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+"""
+Directional correlation functions of the pore space (zero voxels) computed in the process: S2, C2, surface-surface (SS) and
+surface-void (SV) functions of a batch of subsamples of the same size, without periodic boundary conditions.
+"""
+
+import numpy as np
+
+_methods = ('s2', 'c2', 'ss', 'sv')
+
+
+def correlation_functions(cuts, method, normalize=True, length=None, n_threads=1):
+    """
+    Directional correlation functions of a batch of subsamples with the normalization of corfunction_xyz.jl.
+
+    **Input:**
+
+    	cuts (numpy.ndarray): 4D array of shape (n_cuts, nx, ny, nz), a batch of subsamples of the same size;
+
+    	method (str): correlation function, one of 's2', 'c2', 'ss' and 'sv';
+
+    	normalize (bool): flag to normalize the functions as in corfunction_xyz.jl, default: True;
+
+    	length (int): number of computed values, the function is computed for distances 0,..length-1. If None, the half of
+    	the smallest subsample dimension is used, default: None;
+
+    	n_threads (int): number of threads used by FFT, default: 1.
+
+    **Output:**
+
+    	numpy.ndarray of shape (n_cuts, 3, length), the functions in 'x', 'y' and 'z' directions. As in corfunction_xyz.jl,
+    	which reads arrays in column-major order, 'x' is the last axis of the subsample and 'z' is the first one.
+    """
+    if method not in _methods:
+        raise ValueError("Method should be one of " + ", ".join(_methods) + ".")
+    cuts = np.asarray(cuts)
+    if length is None:
+        length = min(cuts.shape[1:]) // 2
+    pores = (cuts == 0).astype(np.float32)
+    porosity = pores.mean(axis=(1, 2, 3), dtype=np.float64)
+    axes = (3, 2, 1)
+    if method == 's2':
+        result = np.stack([_correlation(pores, pores, axis, length, n_threads) for axis in axes], axis=1)
+    elif method == 'c2':
+        labels = _labels(cuts == 0)
+        result = np.stack([_cluster_correlation(labels, axis, length) for axis in axes], axis=1)
+    else:
+        surface = _surface(cuts == 0).astype(np.float32)
+        other = surface if method == 'ss' else pores
+        result = np.stack([_correlation(surface, other, axis, length, n_threads) for axis in axes], axis=1)
+    if method == 'c2':
+        # subsamples without pores have undefined C2
+        result[porosity == 0] = np.nan
+    if normalize:
+        if method in ('s2', 'c2'):
+            # the functions of subsamples without pores or without solid cannot be normalized
+            defined = (porosity > 0) & (porosity < 1)
+            p = porosity[defined, None, None]
+            result[defined] = (result[defined] - p*p)/p/(1 - p)
+            result[~defined] = np.nan
+        else:
+            # and the functions of subsamples without interface
+            norm = result[:, :, :1]
+            result = np.divide(result, norm, out=np.full_like(result, np.nan), where=norm > 0)
+    return result
+
+
+def _batch_size(shape, method, max_bytes, length=None):
+    """
+    Number of subsamples of a given shape processed in one call of correlation_functions() within a memory limit.
+
+    **Input:**
+
+    	shape (tuple (int, int, int)): shape of subsamples;
+
+    	method (str): correlation function, one of 's2', 'c2', 'ss' and 'sv';
+
+    	max_bytes (float): memory limit in bytes;
+
+    	length (int): number of computed values, see correlation_functions(), default: None.
+
+    **Output:**
+
+    	number of subsamples (int), at least 1.
+    """
+    import scipy.fft
+    if length is None:
+        length = min(shape) // 2
+    n_voxels = int(np.prod(shape))
+    if method == 'c2':
+        # subsample, pore mask, labels and the masks of compared labels
+        per_cut = 16*n_voxels
+    else:
+        # subsample and masks, float32 indicator functions, and for the largest axis the complex64 spectra of zero padded lines and their product
+        n_spectrum = max(n_voxels//n*(scipy.fft.next_fast_len(n + length)//2 + 1) for n in shape)
+        n_spectra = 2 if method == 's2' else 3
+        per_cut = 11*n_voxels + 8*n_spectra*n_spectrum
+    return max(1, int(max_bytes // per_cut))
+
+
+def _correlation(f, g, axis, length, n_threads):
+    # mean of f(x)*g(x + r) over the pairs of voxels of each subsample at the distance r along the axis, for r = 0,..length-1;
+    # FFTs of zero padded lines give all the distances at once, and the lines are summed in the frequency domain
+    import scipy.fft
+    n = f.shape[axis]
+    size = scipy.fft.next_fast_len(n + length)
+    other_axes = tuple(a for a in range(1, 4) if a != axis)
+    # float32 input gives complex64 spectra, the sums over lines are accumulated in double precision
+    spectrum_f = scipy.fft.rfft(f, n=size, axis=axis, workers=n_threads)
+    if g is f:
+        product = (spectrum_f.real**2 + spectrum_f.imag**2).sum(axis=other_axes, dtype=np.float64)
+    else:
+        spectrum_g = scipy.fft.rfft(g, n=size, axis=axis, workers=n_threads)
+        spectrum_f = np.conj(spectrum_f, out=spectrum_f)
+        spectrum_f *= spectrum_g
+        del spectrum_g
+        product = spectrum_f.sum(axis=other_axes, dtype=np.complex128)
+    sums = scipy.fft.irfft(product, n=size, axis=1, workers=n_threads)[:, :length]
+    r = np.arange(length)
+    n_pairs = (n - r)*np.prod([f.shape[a] for a in other_axes])
+    # distances exceeding the subsample have no pairs of voxels
+    return np.divide(sums, n_pairs, out=np.full_like(sums, np.nan), where=n_pairs > 0)
+
+
+def _labels(pores):
+    # connected components of the pores of each subsample, with face connectivity
+    from scipy import ndimage
+    structure = np.zeros((3, 3, 3, 3), dtype=bool)
+    structure[1] = ndimage.generate_binary_structure(3, 1)
+    return ndimage.label(pores, structure)[0]
+
+
+def _cluster_correlation(labels, axis, length):
+    # probability that the voxels at the distance r along the axis belong to the same pore cluster, which is not a product
+    # of indicator functions, so it is counted directly for each distance
+    n = labels.shape[axis]
+    n_lines = np.prod([labels.shape[a] for a in range(1, 4) if a != axis])
+    result = np.full((labels.shape[0], length), np.nan)
+    for r in range(min(length, n)):
+        a = labels[(slice(None),)*axis + (slice(0, n - r),)]
+        b = labels[(slice(None),)*axis + (slice(r, n),)]
+        result[:, r] = ((a == b) & (a > 0)).sum(axis=(1, 2, 3))/((n - r)*n_lines)
+    return result
+
+
+def _surface(pores):
+    # pore voxels having a solid neighbour across a face inside the subsample
+    from scipy import ndimage
+    structure = np.zeros((3, 3, 3, 3), dtype=bool)
+    structure[1] = ndimage.generate_binary_structure(3, 1)
+    return pores & ~ndimage.binary_erosion(pores, structure, border_value=1)
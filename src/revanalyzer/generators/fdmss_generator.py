@@ -7,12 +7,13 @@ import time
 import xml.etree.ElementTree as ET
 from xml.etree.ElementTree import ElementTree
 from .utils import _read_array, make_cut
-from pyfdmss import run
+from ..stores import Manifest, _files_stamp
+from ..tracing import span
 
 fdmss_data = "fdmss_data"
 
 
-def run_fdmss(image, direction, datadir, outputdir, n_threads=1, resolution=1., show_time=False):
+def run_fdmss(image, direction, datadir, outputdir, n_threads=1, resolution=1., show_time=False, resume=False):
     """
     Running FDMSS solver for an initial image.
     
@@ -30,20 +31,30 @@ def run_fdmss(image, direction, datadir, outputdir, n_threads=1, resolution=1.,
      	
      	resolution (float): resolution of studied sample (micrometers), default: 1;
      	
-     	show_time (bool): Added to monitor time cost for large images,  default: False. 
+     	show_time (bool): Added to monitor time cost for large images,  default: False;
+     	
+     	resume (bool): if True, flow directions recorded in the manifest of the output folder as completed for the same image and parameters are skipped, default: False.
     """
+    from pyfdmss import run
     if not (direction == 'x' or direction == 'y' or direction == 'z' or direction == 'all'):
         raise ValueError("Direction should be 'x', 'y', 'z' or 'all'")
     if direction == 'all':
         directions_list = ['x', 'y', 'z']
     else:
         directions_list = [direction]
+    if datadir is not None:
+        image_path = os.path.join(datadir, image)
+    else:
+        image_path = image
+    st = os.stat(image_path)
+    manifest = Manifest(os.path.join(outputdir, 'manifest.json'))
     for d in directions_list:
         start_time = time.time()
-        if datadir is not None:
-            image_path = os.path.join(datadir, image)
-        else:
-            image_path = image
+        params = {'direction': d, 'resolution': resolution, 'image': [st.st_size, st.st_mtime_ns]}
+        output_paths = [os.path.join(outputdir, d + '_pressure'), os.path.join(outputdir, d + '_vel' + d)]
+        # the fields have the size of the image, so their sizes and modification times are recorded instead of checksums
+        if resume and manifest.is_done(d, params, _files_stamp(output_paths)):
+            continue
         config_path = os.path.join(outputdir, d + '_config.xml')
         _make_fdmss_config(config_path, d, resolution, n_threads)
         summary_path = os.path.join(outputdir, d + '_summary.xml')
@@ -54,7 +65,9 @@ def run_fdmss(image, direction, datadir, outputdir, n_threads=1, resolution=1.,
         full_vel_path =  os.path.join(outputdir, d + '_full_vel')
         comp_vel_path =  os.path.join(outputdir, d + '_comp_vel')
         log_path = 'log.txt'
-        run(config_path, image_path, summary_path, velx_path, vely_path, velz_path, pressure_path, full_vel_path, comp_vel_path, log_path)
+        with span('fdmss', direction=d, image=image):
+            run(config_path, image_path, summary_path, velx_path, vely_path, velz_path, pressure_path, full_vel_path, comp_vel_path, log_path)
+        manifest.record(d, params, _files_stamp(output_paths))
         if show_time:
             print("---fdmss run time is %s seconds ---" % (time.time() - start_time))
 
@@ -0,0 +1,271 @@
+# -*- coding: utf-8 -*-
+"""Minkowski functionals of the pore space (zero voxels) in any axis-aligned window from one pass over the image."""
+
+import numpy as np
+from contextlib import contextmanager
+from itertools import product
+from .summed_area_table import _accumulate
+
+# coefficients of the numbers of vertices, edges, faces and cubes of the cubical complex in the functionals (Vogel et al., 2010):
+# volume V = n3, surface area S = 2*(n2 - 3*n3), integral of mean curvature M = pi*(n1 - 2*n2 + 3*n3), Euler characteristic
+# chi = n0 - n1 + n2 - n3, in voxel units
+_coefficients = {'volume': (0, 0, 0, 1),
+                 'surface': (0, 0, 2, -6),
+                 'curvature': (0, 1, -2, 3),
+                 'euler': (1, -1, 1, -1)}
+_factors = {'volume': 1., 'surface': 1., 'curvature': np.pi, 'euler': 1.}
+_shared = None
+
+
+def _cell_weights():
+    # eight times the numbers of vertices, edges, faces and cubes incident to a lattice vertex, each cell shared equally by its
+    # 2**dim vertices, for each configuration of the 2x2x2 voxels around the vertex; bit 4*dx + 2*dy + dz is the voxel (dx, dy, dz)
+    weights = np.zeros((256, 4), dtype=np.int64)
+    for config in range(256):
+        voxels = np.array([(config >> (4*dx + 2*dy + dz)) & 1 for dx, dy, dz in product(range(2), repeat=3)]).reshape(2, 2, 2)
+        weights[config, 0] = 8*int(voxels.any())
+        for axis in range(3):
+            for side in range(2):
+                weights[config, 1] += 4*int(np.take(voxels, side, axis=axis).any())
+        for a, b in ((0, 1), (0, 2), (1, 2)):
+            for sa, sb in product(range(2), repeat=2):
+                weights[config, 2] += 2*int(np.take(np.take(voxels, sb, axis=b), sa, axis=a).any())
+        weights[config, 3] = int(voxels.sum())
+    return weights
+
+
+_weights = {name: _cell_weights() @ np.array(coefficients) for name, coefficients in _coefficients.items()}
+
+
+def _configurations(pores):
+    # configurations of the 2x2x2 voxels around each vertex between the voxels of a boolean array
+    nx, ny, nz = pores.shape
+    config = np.zeros((nx - 1, ny - 1, nz - 1), dtype=np.uint8)
+    for dx, dy, dz in product(range(2), repeat=3):
+        config += pores[dx:dx+nx-1, dy:dy+ny-1, dz:dz+nz-1].astype(np.uint8) << np.uint8(4*dx + 2*dy + dz)
+    return config
+
+
+class MinkowskiFunctionals:
+    """
+    Class describing Minkowski functionals of the pore space in windows of an image. The pore space is the union of closed voxel
+    cubes with zero values, its functionals are linear combinations of the numbers of cells of the cubical complex (Vogel et al., 2010).
+    Every cell is shared equally by its vertices, so a functional is the sum of contributions of vertices depending on the
+    configurations of 2x2x2 voxels around them. The contributions of the vertices inside the image are accumulated into prefix sums
+    in one pass over the image, for all the requested functionals at once. The prefix sums of all the vertices take 4 or 8 bytes
+    per voxel for each functional; if the windows are known in advance, the sums are kept only on the planes of their corners.
+    """
+    def __init__(self, image, functionals=('volume', 'surface', 'curvature', 'euler'), block_size=64, windows=None):
+        """
+        **Input:**
+
+        	image (numpy.ndarray): 3D array (can be a memory map), zero values are pores;
+
+        	functionals (list of str): functionals computed, from 'volume', 'surface', 'curvature' and 'euler', default: all of them;
+
+        	block_size (int): number of x-slices processed at once, which limits the temporary memory, default: 64;
+
+        	windows (list of tuples ((int, int), (int, int), (int, int))): bounds of the windows queried later. If given, other windows
+        	cannot be queried, and the memory of the prefix sums depends on the number of distinct bounds instead of the image size. 
+        	If None, any window can be queried, default: None.
+        """
+        if not len(image.shape) == 3:
+            raise ValueError("Image should have 3 dimensions.")
+        for name in functionals:
+            if name not in _coefficients:
+                raise ValueError("Unknown functional " + str(name) + ".")
+        nx, ny, nz = image.shape
+        self.image = image
+        self.shape = image.shape
+        self.functionals = tuple(functionals)
+        self.tables = {}
+        self._planes = None
+        if windows is not None:
+            self._build_on_planes(image, windows, block_size)
+            return
+        for name in self.functionals:
+            dtype = np.int32 if np.abs(_weights[name]).max()*nx*ny*nz < 2**31 else np.int64
+            self.tables[name] = np.zeros((nx, ny, nz), dtype=dtype)
+        for start in range(0, nx - 1, block_size):
+            stop = min(start + block_size, nx - 1)
+            config = _configurations(image[start:stop+1] == 0)
+            for name, table in self.tables.items():
+                table[start+1:stop+1, 1:, 1:] = _weights[name].astype(table.dtype)[config]
+                _accumulate(table, start, stop)
+
+    def value(self, name, bounds=None):
+        """
+        Functional of the pore space in a window, the voxels outside the window are solid.
+
+        **Input:**
+
+        	name (str): functional, one of computed functionals;
+
+        	bounds (tuple ((int, int), (int, int), (int, int))): window bounds in x, y and z directions, the upper bounds are excluded.
+        	If None, the whole image is used, default: None.
+
+        **Output:**
+
+        	functional value (float, int for Euler characteristic).
+        """
+        if bounds is None:
+            bounds = tuple((0, n) for n in self.shape)
+        (x0, x1), (y0, y1), (z0, z1) = bounds
+        pores = self.image[x0:x1, y0:y1, z0:z1] == 0
+        weights = _weights[name]
+        total = self._interior(name, x0 + 1, x1, y0 + 1, y1, z0 + 1, z1)
+        # vertices on the boundary of window see the voxels outside as solid
+        total += weights[_configurations(np.pad(pores[:1], 1))[0]].sum()
+        total += weights[_configurations(np.pad(pores[-1:], 1))[1]].sum()
+        total += weights[_configurations(np.pad(pores[:, :1], 1))[1:-1, 0]].sum()
+        total += weights[_configurations(np.pad(pores[:, -1:], 1))[1:-1, 1]].sum()
+        total += weights[_configurations(np.pad(pores[:, :, :1], 1))[1:-1, 1:-1, 0]].sum()
+        total += weights[_configurations(np.pad(pores[:, :, -1:], 1))[1:-1, 1:-1, 1]].sum()
+        if name == 'euler':
+            return int(total) // 8
+        return _factors[name]*int(total)/8
+
+    def density(self, name, bounds=None, boundary=True):
+        """
+        Functional of the pore space in a window per voxel.
+
+        **Input:**
+
+        	name (str): functional, one of computed functionals;
+
+        	bounds (tuple ((int, int), (int, int), (int, int))): window bounds, see value(), default: None;
+
+        	boundary (bool): if True, the functional of the pore space cut by the window is divided by the number of voxels, so the
+        	faces of pores on the boundary of window are included. If False, the mean contribution of the vertices inside
+        	the window is used, which estimates the density of the functional in the unbounded medium, default: True.
+
+        **Output:**
+
+        	density (float).
+        """
+        if bounds is None:
+            bounds = tuple((0, n) for n in self.shape)
+        if boundary:
+            # the base method, since subclasses may fix the functional in value()
+            return MinkowskiFunctionals.value(self, name, bounds)/np.prod([b[1] - b[0] for b in bounds])
+        n_vertices = np.prod([b[1] - b[0] - 1 for b in bounds])
+        if n_vertices <= 0:
+            return np.nan
+        (x0, x1), (y0, y1), (z0, z1) = bounds
+        return _factors[name]*self._interior(name, x0 + 1, x1, y0 + 1, y1, z0 + 1, z1)/(8*n_vertices)
+
+    def _interior(self, name, x0, x1, y0, y1, z0, z1):
+        # sum of contributions of the vertices with coordinates in [x0, x1) x [y0, y1) x [z0, z1), vertex i lies between
+        # voxels i-1 and i and the prefix sums at index i include the vertices up to i
+        if x1 <= x0 or y1 <= y0 or z1 <= z0:
+            return 0
+        t = self.tables[name]
+        x0, x1, y0, y1, z0, z1 = x0 - 1, x1 - 1, y0 - 1, y1 - 1, z0 - 1, z1 - 1
+        if self._planes is not None:
+            try:
+                (x0, x1), (y0, y1), (z0, z1) = [(planes[a], planes[b]) for planes, a, b in zip(self._planes, (x0, y0, z0), (x1, y1, z1))]
+            except KeyError:
+                raise ValueError("Window is not among the windows given at construction.")
+        return (int(t[x1, y1, z1]) - int(t[x0, y1, z1]) - int(t[x1, y0, z1]) - int(t[x1, y1, z0])
+                + int(t[x0, y0, z1]) + int(t[x0, y1, z0]) + int(t[x1, y0, z0]) - int(t[x0, y0, z0]))
+
+    def _build_on_planes(self, image, windows, block_size):
+        # the prefix sums up to vertex i are needed only for the planes i = lower bound and i = upper bound - 1 of the windows: the
+        # contributions of the vertices are summed in the bins between consecutive planes, and the bins are accumulated
+        coords = [np.unique([w[axis][k] - k for w in windows for k in range(2)]) for axis in range(3)]
+        coords = [c[(c >= 0) & (c < n)] for c, n in zip(coords, self.shape)]
+        self._planes = [{int(c): i for i, c in enumerate(axis_coords)} for axis_coords in coords]
+        cx, cy, cz = coords
+        sums = {name: np.zeros((len(cx), len(cy), len(cz)), dtype=np.int64) for name in self.functionals}
+        if min(len(cx), len(cy), len(cz)) == 0:
+            self.tables = sums
+            return
+        nx, ny, nz = self.shape
+        # vertex i of a bin is at index i of the padded contributions, vertex 0 has no contribution
+        y_bins = np.concatenate(([0], cy[:-1] + 1))
+        z_bins = np.concatenate(([0], cz[:-1] + 1))
+        for start in range(0, min(nx - 1, cx[-1]), block_size):
+            stop = min(start + block_size, nx - 1, cx[-1])
+            config = _configurations(image[start:stop+1, :cy[-1]+1, :cz[-1]+1] == 0)
+            x_bins = np.searchsorted(cx, np.arange(start + 1, stop + 1))
+            for name, table in sums.items():
+                contributions = np.zeros((stop - start, cy[-1] + 1, cz[-1] + 1), dtype=np.int8)
+                contributions[:, 1:, 1:] = _weights[name].astype(np.int8)[config]
+                binned = np.add.reduceat(np.add.reduceat(contributions, y_bins, axis=1, dtype=np.int64), z_bins, axis=2)
+                np.add.at(table, x_bins, binned)
+        for table in sums.values():
+            for axis in range(3):
+                np.cumsum(table, axis=axis, out=table)
+        self.tables = sums
+
+
+class EulerCharacteristic(MinkowskiFunctionals):
+    """
+    Class describing Euler characteristic of the pore space in windows of an image, #vertices - #edges + #faces - #volumes of
+    the cubical complex as in EulerCharacteristic.jl.
+    """
+    def __init__(self, image, block_size=64, windows=None):
+        """
+        **Input:**
+
+        	image (numpy.ndarray): 3D array (can be a memory map), zero values are pores;
+
+        	block_size (int): number of x-slices processed at once, which limits the temporary memory, default: 64;
+
+        	windows (list of tuples ((int, int), (int, int), (int, int))): bounds of the windows queried later, see MinkowskiFunctionals, default: None.
+        """
+        super().__init__(image, ('euler',), block_size, windows)
+
+    def value(self, bounds=None):
+        """
+        Euler characteristic of the pore space in a window, the voxels outside the window are solid.
+
+        **Input:**
+
+        	bounds (tuple ((int, int), (int, int), (int, int))): window bounds in x, y and z directions, the upper bounds are excluded.
+        	If None, the whole image is used, default: None.
+
+        **Output:**
+
+        	Euler characteristic (int).
+        """
+        return super().value('euler', bounds)
+
+    def density(self, bounds=None):
+        """
+        Euler density of the pore space in a window, the Euler characteristic divided by the number of voxels.
+
+        **Input:**
+
+        	bounds (tuple ((int, int), (int, int), (int, int))): window bounds, see value(), default: None.
+
+        **Output:**
+
+        	Euler density (float).
+        """
+        return super().density('euler', bounds)
+
+
+@contextmanager
+def _shared_functionals(functionals, windows=None):
+    # functionals of an image requested in the context are computed in one pass and shared by all the metrics; if the windows
+    # of all the metrics are given, the shared prefix sums are kept only on the planes of their corners
+    global _shared
+    previous = _shared
+    _shared = (tuple(functionals), None if windows is None else set(windows), {})
+    try:
+        yield
+    finally:
+        _shared = previous
+
+
+def _functionals_of(image, functionals, windows=None):
+    shared_windows = None if _shared is None else _shared[1]
+    if (_shared is None or not set(functionals) <= set(_shared[0])
+            or (shared_windows is not None and (windows is None or not set(windows) <= shared_windows))):
+        return MinkowskiFunctionals(image, functionals, windows=windows)
+    # the image is alive during the context, so its id identifies it
+    engines = _shared[2]
+    if id(image) not in engines:
+        engines[id(image)] = MinkowskiFunctionals(image, _shared[0], windows=None if shared_windows is None else sorted(shared_windows))
+    return engines[id(image)]
@@ -3,14 +3,16 @@
 import numpy as np
 import time
 import os
-import porespy as ps
-import openpnm as op
-import multiprocessing
 from functools import partial
-from .utils import _subcube_ids, make_cut
+from .utils import _subcube_ids, make_cut, _array_hash
+from ..stores import Manifest, _files_checksum
+from ..tracing import span
+from ..scheduler import run_tasks, _default_cost_model
+from ..memory import _default_memory_model
+from ..executors import ProcessExecutor
 
 
-def generate_PNM(image, size, n_steps, sREV_max_step, outputdir, n_threads = 1, resolution=1., show_time=False):
+def generate_PNM(image, size, n_steps, sREV_max_step, outputdir, n_threads = 1, resolution=1., show_time=False, pool=None, resume=False, cancel_token=None, memory_model=None, image_id=None):
     """
     Running PNM extractor for all the selected subsamples.
     
@@ -30,13 +32,31 @@ def generate_PNM(image, size, n_steps, sREV_max_step, outputdir, n_threads = 1,
         
      	resolution (float): resolution of studied sample, default: 1; 
         
-     	show_time (bool): Added to monitor time cost for large images,  default: False. 
+     	show_time (bool): Added to monitor time cost for large images,  default: False;
+     	
+     	pool (multiprocessing.pool.Pool or subclass of BasicExecutor): worker pool to be used. If None, a pool of n_threads processes is created for this call, default: None;
+     	
+     	resume (bool): if True, subsamples recorded in the manifest of the output folder as completed with the same parameters and unchanged csv file are skipped, default: False;
+     	
+     	cancel_token (CancelToken): cancellation token checked by each task before it starts. If None, the generation cannot be cancelled, default: None;
+     	
+     	memory_model (MemoryModel): model estimating the peak memory of extraction tasks, used while a MemoryBudget is active. If None, the model shared by all analyzers in the process is used, default: None;
+     	
+     	image_id: identity of the image recorded in the manifest, so the subsamples of another image are not skipped. If None, the hash of the image content is used, default: None.
     """
     start_time = time.time()
     cut_step = (np.array(size)/n_steps).astype(int)
     cut_sizes = [(cut_step*(i+1)).tolist() for i in range(n_steps-1)]
     cut_sizes.append(size)
-    ids = _subcube_ids(n_steps, sREV_max_step)
+    manifest = Manifest(os.path.join(outputdir, 'manifest.json'))
+    if image_id is None:
+        image_id = _array_hash(image)
+    ids = []
+    for elem in _subcube_ids(n_steps, sREV_max_step):
+        cut_name = 'cut'+str(elem[0])+'_'+str(elem[1])
+        checksum = _files_checksum([os.path.join(outputdir, cut_name + '.csv')])
+        if not (resume and manifest.is_done(cut_name, _pn_params(elem, cut_sizes, resolution, image_id), checksum)):
+            ids.append(elem)
     cuts = []
     for elem in ids:
         l = elem[0]
@@ -46,11 +66,17 @@ def generate_PNM(image, size, n_steps, sREV_max_step, outputdir, n_threads = 1,
         else:
             cut_size = cut_sizes[l-1]
             cuts.append(make_cut(image, size, cut_size, idx))
-    data = zip(ids, cuts)
-    pool = multiprocessing.Pool(processes=n_threads)
-    results = pool.map(partial(_pnm_for_subsample, outputdir = outputdir, resolution = resolution, show_time = show_time), data)
-    pool.close()
-    pool.join()
+    data = list(zip(ids, cuts))
+    costs = [_default_cost_model.estimate('PNMExtractor', cut.size) for cut in cuts]
+    if memory_model is None:
+        memory_model = _default_memory_model
+    memory = [memory_model.estimate('PNMExtractor', cut.size) for cut in cuts]
+    func = partial(_pnm_for_subsample, outputdir = outputdir, resolution = resolution, show_time = show_time, cancel_token = cancel_token)
+    if pool is None:
+        with ProcessExecutor(n_threads) as own_pool:
+            _record_pn(run_tasks(own_pool, func, data, costs, n_threads, memory_estimates=memory), manifest, outputdir, cut_sizes, resolution, image_id, memory_model)
+    else:
+        _record_pn(run_tasks(pool, func, data, costs, getattr(pool, 'n_workers', getattr(pool, '_processes', n_threads)), memory_estimates=memory), manifest, outputdir, cut_sizes, resolution, image_id, memory_model)
     if show_time:
         print("---total PN data generation time is %s seconds ---" % (time.time() - start_time))
 
@@ -72,21 +98,43 @@ def get_pn_csv(cut, cut_name, outputdir, resolution, show_time):
         
         show_time (bool): Added to monitor time cost for large images.
     """
+    import porespy as ps
+    import openpnm as op
     start_time = time.time()
     cut = cut.astype(bool)
     cut = ~cut
     parallelization = {'cores':1}
-    snow_output = ps.networks.snow2(cut, voxel_size = resolution, parallelization = parallelization)
-    pn = op.io.network_from_porespy(snow_output.network)
+    with span('pnm_extract', cut=cut_name, cut_size=cut.size):
+        snow_output = ps.networks.snow2(cut, voxel_size = resolution, parallelization = parallelization)
+        pn = op.io.network_from_porespy(snow_output.network)
     cut_name1 = os.path.join(outputdir, cut_name)
-    op.io.network_to_csv(pn, filename = cut_name1)
+    with span('write', cut=cut_name):
+        op.io.network_to_csv(pn, filename = cut_name1)
     if show_time:
         print(cut_name)
         print("---PNM extractor run time is %s seconds ---" % (time.time() - start_time))
 
-def _pnm_for_subsample(data, outputdir, resolution, show_time):
+def _pnm_for_subsample(data, outputdir, resolution, show_time, cancel_token=None):
+    if cancel_token is not None:
+        cancel_token.check()
     l = data[0][0]
     idx = data[0][1]
     cut = data[1]
     cut_name = 'cut'+str(l)+'_'+str(idx)
-    get_pn_csv(cut, cut_name, outputdir, resolution, show_time)
\ No newline at end of file
+    get_pn_csv(cut, cut_name, outputdir, resolution, show_time)
+    return data[0]
+
+
+def _pn_params(elem, cut_sizes, resolution, image_id):
+    return {'cut_size': list(cut_sizes[elem[0]-1]), 'cut_id': elem[1], 'resolution': resolution, 'image': image_id}
+
+
+def _record_pn(results, manifest, outputdir, cut_sizes, resolution, image_id, memory_model):
+    for elem, elapsed, peak in results:
+        _default_cost_model.update('PNMExtractor', np.prod(cut_sizes[elem[0]-1]), elapsed)
+        if peak is not None:
+            memory_model.update('PNMExtractor', np.prod(cut_sizes[elem[0]-1]), peak)
+        cut_name = 'cut'+str(elem[0])+'_'+str(elem[1])
+        checksum = _files_checksum([os.path.join(outputdir, cut_name + '.csv')])
+        if checksum is not None:
+            manifest.record(cut_name, _pn_params(elem, cut_sizes, resolution, image_id), checksum)
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""Summed-area table (3D prefix sums) of nonzero voxels, answering the number of nonzero voxels in any axis-aligned window in constant time."""
+
+import numpy as np
+
+
+class SummedAreaTable:
+    """
+    Class describing 3D summed-area table. The table has the shape of the image increased by one in each direction, its element
+    (i, j, k) is the number of nonzero voxels in the window [0, i) x [0, j) x [0, k). The table is built slab by slab and stored
+    in the smallest unsigned integer type holding the total count, so its size is 4 bytes per voxel for images up to 2^32 voxels.
+    """
+    def __init__(self, image, block_size=64):
+        """
+        **Input:**
+
+        	image (numpy.ndarray): 3D array (can be a memory map), nonzero values are counted;
+
+        	block_size (int): number of x-slices processed at once, which limits the temporary memory, default: 64.
+        """
+        if not len(image.shape) == 3:
+            raise ValueError("Image should have 3 dimensions.")
+        nx, ny, nz = image.shape
+        self.shape = image.shape
+        self.dtype = np.uint32 if nx*ny*nz < 2**32 else np.uint64
+        self.table = np.zeros((nx + 1, ny + 1, nz + 1), dtype=self.dtype)
+        for start in range(0, nx, block_size):
+            stop = min(start + block_size, nx)
+            block = self.table[start+1:stop+1, 1:, 1:]
+            np.not_equal(image[start:stop], 0, out=block, casting='unsafe')
+            _accumulate(self.table, start, stop)
+
+    def count(self, bounds):
+        """
+        Number of nonzero voxels in a window.
+
+        **Input:**
+
+        	bounds (tuple ((int, int), (int, int), (int, int))): window bounds in x, y and z directions, the upper bounds are excluded.
+
+        **Output:**
+
+        	count (int).
+        """
+        return int(self.counts(np.array([bounds]))[0])
+
+    def counts(self, bounds):
+        """
+        Numbers of nonzero voxels in many windows at once.
+
+        **Input:**
+
+        	bounds (numpy.ndarray): array of shape (n, 3, 2) of window bounds, see count().
+
+        **Output:**
+
+        	numpy.ndarray of n counts (int64).
+        """
+        bounds = np.asarray(bounds, dtype=np.intp)
+        x0, x1 = bounds[:, 0, 0], bounds[:, 0, 1]
+        y0, y1 = bounds[:, 1, 0], bounds[:, 1, 1]
+        z0, z1 = bounds[:, 2, 0], bounds[:, 2, 1]
+        t = self.table
+        # inclusion-exclusion over the corners of the window, in signed integers to avoid wrap-around of unsigned differences
+        return (t[x1, y1, z1].astype(np.int64) - t[x0, y1, z1] - t[x1, y0, z1] - t[x1, y1, z0]
+                + t[x0, y0, z1] + t[x0, y1, z0] + t[x1, y0, z0] - t[x0, y0, z0])
+
+    def fractions(self, bounds):
+        """
+        Fractions of nonzero voxels in many windows at once.
+
+        **Input:**
+
+        	bounds (numpy.ndarray): array of shape (n, 3, 2) of window bounds, see count().
+
+        **Output:**
+
+        	numpy.ndarray of n fractions (float64).
+        """
+        bounds = np.asarray(bounds, dtype=np.intp)
+        volumes = np.prod(bounds[:, :, 1] - bounds[:, :, 0], axis=1)
+        return self.counts(bounds)/volumes
+
+    def sample(self, cut_size, n_windows, seed=None):
+        """
+        Fractions of nonzero voxels in randomly placed windows of a given size, for statistics denser than the nine subsamples of a step.
+
+        **Input:**
+
+        	cut_size (list [int, int, int]): linear sizes of windows;
+
+        	n_windows (int): number of windows;
+
+        	seed (int): seed of random generator, default: None.
+
+        **Output:**
+
+        	tuple (numpy.ndarray of n_windows fractions, numpy.ndarray of shape (n_windows, 3, 2) of window bounds).
+        """
+        rng = np.random.default_rng(seed)
+        cut_size = np.asarray(cut_size, dtype=np.intp)
+        if np.any(cut_size > np.array(self.shape)) or np.any(cut_size <= 0):
+            raise ValueError("Window size should be positive and not larger than the image.")
+        starts = rng.integers(0, np.array(self.shape) - cut_size + 1, size=(n_windows, 3))
+        bounds = np.stack([starts, starts + cut_size], axis=2)
+        return self.fractions(bounds), bounds
+
+
+def _accumulate(table, start, stop):
+    # turns the values in x-slices [start+1, stop+1) of a table into prefix sums, the slices up to start+1 already hold prefix sums
+    block = table[start+1:stop+1, 1:, 1:]
+    np.cumsum(block, axis=2, dtype=table.dtype, out=block)
+    # sums along the outer axes are accumulated plane by plane, which is faster than strided cumsum
+    for j in range(1, block.shape[1]):
+        block[:, j] += block[:, j-1]
+    for i in range(stop - start):
+        block[i] += table[start+i, 1:, 1:]
@@ -3,14 +3,86 @@
 
 import numpy as np
 import os
+import hashlib
+from multiprocessing import shared_memory
+from ..tracing import span
 
-def _read_array(image, dimx, dimy, dimz, dtype):
+_attached_array = {}
+
+
+def _read_array(image, dimx, dimy, dimz, dtype, mmap=False):
+    if mmap:
+        return np.memmap(image, dtype=dtype, mode='r', shape=(dimx, dimy, dimz))
     v = np.fromfile(image, dtype=dtype, sep="")
     return v.reshape([dimx, dimy, dimz])
 
 
 def _write_array(A, fileout):
-    A.astype('uint8').tofile(fileout)
+    with span('write', path=fileout, nbytes=A.size):
+        A.astype('uint8').tofile(fileout)
+
+
+def _share_array(A):
+    shm = shared_memory.SharedMemory(create=True, size=max(A.nbytes, 1))
+    B = np.ndarray(A.shape, dtype=A.dtype, buffer=shm.buf)
+    B[...] = A
+    return shm, ('shm', shm.name, A.shape, A.dtype.str)
+
+
+def _share_file(A, path):
+    # image written once to a file on a shared file system, so that workers on other hosts can map it
+    with span('write', path=path, nbytes=A.nbytes):
+        np.ascontiguousarray(A).tofile(path)
+    return _SharedFile(path), ('file', path, A.shape, A.dtype.str)
+
+
+class _SharedFile:
+    # counterpart of SharedMemory for images shared as files
+    def __init__(self, path):
+        self.path = path
+
+    def close(self):
+        pass
+
+    def unlink(self):
+        if os.path.isfile(self.path):
+            os.remove(self.path)
+
+
+def _attach_array(image_ref):
+    kind, name, shape, dtype = image_ref
+    if kind == 'array':
+        # executors running tasks in the calling process get the image itself
+        return name
+    if name not in _attached_array:
+        _release_attached()
+        if kind == 'file':
+            _attached_array[name] = (None, _read_array(name, *shape, dtype, mmap=True))
+        else:
+            shm = shared_memory.SharedMemory(name=name)
+            A = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+            _attached_array[name] = (shm, A)
+    return _attached_array[name][1]
+
+
+def _release_attached():
+    for name in list(_attached_array.keys()):
+        shm = _attached_array.pop(name)[0]
+        if shm is None:
+            continue
+        try:
+            shm.close()
+        except BufferError:
+            pass
+
+
+def _array_hash(A, chunk_size=2**26):
+    h = hashlib.blake2b(digest_size=16)
+    h.update(str((A.shape, A.dtype.str)).encode())
+    flat = A.reshape(-1)
+    for i in range(0, flat.size, chunk_size):
+        h.update(np.ascontiguousarray(flat[i:i+chunk_size]).tobytes())
+    return h.hexdigest()
 
 
 def _subcube_ids(n_steps, sREV_max_step):
@@ -40,25 +112,19 @@ def make_cut(A, L, cut_size, idx):
     """
     if not len(A.shape) == 3:
         raise ValueError("Initial array should have 3 dimensions.")
+    return _slice(A, _cut_bounds(L, cut_size, idx))
+
+
+def _slice(A, bounds):
+    return A[bounds[0][0]:bounds[0][1], bounds[1][0]:bounds[1][1], bounds[2][0]:bounds[2][1]]
+
+
+_corner_sides = {1: (0, 0, 0), 2: (0, 0, 1), 3: (0, 1, 0), 4: (1, 0, 0), 5: (1, 1, 1), 6: (0, 1, 1), 7: (1, 0, 1), 8: (1, 1, 0)}
+
+
+def _cut_bounds(L, cut_size, idx):
     if idx < 0 or idx > 8:
         raise ValueError("Index value should be from the set (0,1,..8).")
     if idx == 0:
-        return A[int((L[0]-cut_size[0])/2):int((L[0]+cut_size[0])/2), 
-                 int((L[1]-cut_size[1])/2):int((L[1]+cut_size[1])/2), 
-                 int((L[2]-cut_size[2])/2):int((L[2]+cut_size[2])/2)]
-    if idx == 1:
-        return A[:cut_size[0], :cut_size[1], :cut_size[2]]
-    if idx == 2:
-        return A[:cut_size[0], :cut_size[1], L[2]-cut_size[2]:]
-    if idx == 3:
-        return A[:cut_size[0], L[1]-cut_size[1]:, :cut_size[2]]
-    if idx == 4:
-        return A[L[0]-cut_size[0]:, :cut_size[1], :cut_size[2]]
-    if idx == 5:
-        return A[L[0]-cut_size[0]:, L[1]-cut_size[1]:, L[2]-cut_size[2]:]
-    if idx == 6:
-        return A[:cut_size[0], L[1]-cut_size[1]:, L[2]-cut_size[2]:]
-    if idx == 7:
-        return A[L[0]-cut_size[0]:, :cut_size[1], L[2]-cut_size[2]:]
-    if idx == 8:
-        return A[L[0]-cut_size[0]:, L[1]-cut_size[1]:, :cut_size[2]]
+        return tuple((int((L[i]-cut_size[i])/2), int((L[i]+cut_size[i])/2)) for i in range(3))
+    return tuple((L[i]-cut_size[i], L[i]) if side else (0, cut_size[i]) for i, side in enumerate(_corner_sides[idx]))
@@ -0,0 +1,84 @@
+using CorrelationFunctions.Directional
+using CorrelationFunctions.Utilities
+using StatsBase, LinearAlgebra
+
+# correlation function of the pore phase (zero voxels) of an image, a vector for "cl" and "ps" and vectors in x, y and z directions otherwise
+function corfunction(data, method, normalize_)
+    volume = length(data)
+    if (method == "c2")
+        n = count(i->(i== 0), data)
+        if (n == 0)
+            return [[NaN], [NaN], [NaN]]
+        end
+        v = c2(data, 0)
+        if (normalize_ == 1)            
+            p = n/volume
+            vx1 = [(elem - p*p)/p/(1-p) for elem in v[DirX()]]
+            vy1 = [(elem - p*p)/p/(1-p) for elem in v[DirY()]]
+            vz1 = [(elem - p*p)/p/(1-p) for elem in v[DirZ()]]
+            res = [vx1, vy1, vz1]
+        else
+            res = [v[DirX()], v[DirY()], v[DirZ()]]
+        end        
+    elseif (method == "s2")
+        v = s2(data, 0)
+        if (normalize_ == 1)
+            n = count(i->(i== 0), data)
+            p = n/volume
+            vx1 = [(elem - p*p)/p/(1-p) for elem in v[DirX()]]
+            vy1 = [(elem - p*p)/p/(1-p) for elem in v[DirY()]]
+            vz1 = [(elem - p*p)/p/(1-p) for elem in v[DirZ()]]
+            res = [vx1, vy1, vz1]
+        else
+            res = [v[DirX()], v[DirY()], v[DirZ()]]
+        end
+    elseif (method == "l2")
+        v = l2(data, 0)
+        if (normalize_ == 1)
+            res = [v[DirX()]/v[DirX()][1], v[DirY()]/v[DirY()][1], v[DirZ()]/v[DirZ()][1]]
+        else
+            res = [v[DirX()], v[DirY()], v[DirZ()]]
+        end
+    elseif (method == "ss")
+        v = surf2(data, 0)
+        if (normalize_ == 1)
+            res = [v[DirX()]/v[DirX()][1], v[DirY()]/v[DirY()][1], v[DirZ()]/v[DirZ()][1]]
+        else
+            res = [v[DirX()], v[DirY()], v[DirZ()]]
+        end
+    elseif (method == "sv")
+        v = surfvoid(data, 0)
+        if (normalize_ == 1)
+            res = [v[DirX()]/v[DirX()][1], v[DirY()]/v[DirY()][1], v[DirZ()]/v[DirZ()][1]]
+        else
+            res = [v[DirX()], v[DirY()], v[DirZ()]]
+        end
+    elseif (method == "cl")
+        res0 = chord_length(data, 0)
+        n = maximum(res0)
+        h = fit(Histogram, res0, nbins=n)
+        h1 = normalize(h, mode=:probability)
+        res = h1.weights
+    elseif (method == "ps")
+        res0 = pore_size(data, 0)
+        n = Int.(ceil(maximum(res0)))
+        h = fit(Histogram, res0, nbins=n)
+        h1 = normalize(h, mode=:probability)
+        res = h1.weights
+    elseif (method == "cc")
+        v = cross_correlation(data, 0, 1)
+        if (normalize_ == 1)
+            n = count(i->(i== 0), data)
+            p = n/volume
+            vx1 = [elem/p/(1-p) for elem in v[DirX()]]
+            vy1 = [elem/p/(1-p) for elem in v[DirY()]]
+            vz1 = [elem/p/(1-p) for elem in v[DirZ()]]
+            res = [vx1, vy1, vz1]
+        else
+            res = [v[DirX()], v[DirY()], v[DirZ()]]
+        end
+    else
+        throw(DomainError(method, "unknown method"))
+    end
+    return res
+end
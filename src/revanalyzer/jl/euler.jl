@@ -0,0 +1,6 @@
+using EulerCharacteristic
+
+# Euler density of the pore phase (zero voxels) of an image
+function euler_density(data)
+    return euler_characteristic(.!Bool.(data))/length(data)
+end
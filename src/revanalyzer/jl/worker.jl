@@ -0,0 +1,47 @@
+# Long-lived worker serving the requests of revanalyzer.julia_pool: the libraries are loaded and compiled once.
+# Request: text line "method dim0 dim1 dim2 normalize" (dimensions of C-ordered array) followed by dim0*dim1*dim2 bytes of image.
+# Response: Int64 status 0, Int64 number of arrays, and for each array Int64 length and Float64 values;
+# or Int64 status 1, Int64 length and text of error message.
+include(joinpath(@__DIR__, "corfunctions.jl"))
+include(joinpath(@__DIR__, "euler.jl"))
+
+function respond(io, arrays)
+    write(io, Int64(0))
+    write(io, Int64(length(arrays)))
+    for a in arrays
+        v = Float64.(collect(a))
+        write(io, Int64(length(v)))
+        write(io, v)
+    end
+end
+
+while true
+    line = readline(stdin)
+    if isempty(line)
+        break
+    end
+    fields = split(line)
+    method = fields[1]
+    dimz = parse(Int64, fields[2])
+    dimy = parse(Int64, fields[3])
+    dimx = parse(Int64, fields[4])
+    normalize_ = parse(Int64, fields[5])
+    data = Array{UInt8, 3}(undef, dimx, dimy, dimz)
+    read!(stdin, data)
+    try
+        if (method == "euler")
+            arrays = [[euler_density(data)]]
+        elseif (method == "cl" || method == "ps")
+            arrays = [corfunction(data, method, normalize_)]
+        else
+            arrays = corfunction(data, method, normalize_)
+        end
+        respond(stdout, arrays)
+    catch e
+        message = Vector{UInt8}(sprint(showerror, e))
+        write(stdout, Int64(1))
+        write(stdout, Int64(length(message)))
+        write(stdout, message)
+    end
+    flush(stdout)
+end
@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+"""
+Pool of long-lived Julia workers computing correlation functions and Euler densities of subsamples. A worker loads the Julia
+libraries once and receives subsamples over a pipe, so the start of Julia and the compilation of libraries are paid once per worker
+instead of once per subsample. Workers are started on demand up to the size given by the thread budget, a crashed worker is
+replaced by a new one.
+"""
+import atexit
+import os
+import select
+import struct
+import subprocess
+import threading
+import numpy as np
+from .cancellation import _current
+from .threads import get_budget, current_threads, _thread_vars
+
+_pool = None
+_lock = threading.Lock()
+
+
+class JuliaError(RuntimeError):
+    """
+    Error reported by Julia code for a request, the worker stays alive.
+    """
+
+
+class _WorkerCrashed(Exception):
+    pass
+
+
+class _JuliaWorker:
+    # Julia process running jl/worker.jl
+    def __init__(self, n_threads):
+        env = dict(os.environ)
+        for var in _thread_vars:
+            env[var] = str(n_threads)
+        path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'jl', 'worker.jl')
+        self.process = subprocess.Popen(['julia', path], stdin=subprocess.PIPE, stdout=subprocess.PIPE, bufsize=0, env=env)
+
+    def call(self, method, cut, normalize, token, poll_interval):
+        cut = np.ascontiguousarray(cut, dtype=np.uint8)
+        header = ' '.join([method] + [str(n) for n in cut.shape] + [str(normalize)]) + '\n'
+        try:
+            self._write(header.encode())
+            self._write(memoryview(cut).cast('B'))
+        except (BrokenPipeError, OSError):
+            raise _WorkerCrashed()
+        status = self._read_int(token, poll_interval)
+        if status != 0:
+            message = self._read(self._read_int(token, poll_interval), token, poll_interval)
+            raise JuliaError("Error in julia run occured!\n" + message.decode(errors='replace'))
+        arrays = []
+        for i in range(self._read_int(token, poll_interval)):
+            n = self._read_int(token, poll_interval)
+            arrays.append(np.frombuffer(self._read(8*n, token, poll_interval), dtype='<f8'))
+        return arrays
+
+    def kill(self):
+        if self.process.poll() is None:
+            self.process.kill()
+        self.process.wait()
+
+    def close(self):
+        # end of input stops the loop of worker
+        try:
+            self.process.stdin.close()
+            self.process.wait(timeout=5)
+        except (OSError, subprocess.TimeoutExpired):
+            self.kill()
+
+    def _write(self, data):
+        view = memoryview(data)
+        while len(view) > 0:
+            n = self.process.stdin.write(view)
+            view = view[n:]
+
+    def _read_int(self, token, poll_interval):
+        return struct.unpack('<q', self._read(8, token, poll_interval))[0]
+
+    def _read(self, n, token, poll_interval):
+        # reads n bytes of response, checking the cancellation token while the worker computes
+        fd = self.process.stdout.fileno()
+        chunks = []
+        while n > 0:
+            ready, _, _ = select.select([fd], [], [], poll_interval)
+            if not ready:
+                if token is not None:
+                    token.check()
+                continue
+            chunk = os.read(fd, n)
+            if len(chunk) == 0:
+                raise _WorkerCrashed()
+            chunks.append(chunk)
+            n -= len(chunk)
+        return b''.join(chunks)
+
+
+class JuliaPool:
+    """
+    Pool of Julia workers. Requests of concurrent callers are served by different workers, workers are started when all the running
+    ones are busy.
+    """
+    def __init__(self, max_workers=None, n_threads=None, poll_interval=0.2):
+        """
+        **Input:**
+
+        	max_workers (int): maximal number of workers. If None, the cores of the thread budget divided by the threads of a worker, default: None;
+
+        	n_threads (int): number of Julia threads of a worker. If None, the thread limit of the calling worker of executor or 1, default: None;
+
+        	poll_interval (float): time in seconds between checks of the cancellation token while a request is computed, default: 0.2.
+        """
+        if n_threads is None:
+            n_threads = current_threads() or 1
+        if max_workers is None:
+            max_workers = max(1, get_budget().n_cores // n_threads)
+        self.max_workers = max_workers
+        self.n_threads = n_threads
+        self.poll_interval = poll_interval
+        self._idle = []
+        self._n_workers = 0
+        self._condition = threading.Condition()
+        self._pid = os.getpid()
+
+    def call(self, method, cut, normalize=0):
+        """
+        Computes a correlation function or Euler density of a subsample.
+
+        **Input:**
+
+        	method (str): method of corfunction_xyz.jl ('s2', 'c2', 'l2', 'ss', 'sv', 'cl', 'ps', 'cc') or 'euler';
+
+        	cut (numpy.ndarray): 3D array representing a subsample;
+
+        	normalize (int): flag of normalization of correlation functions, default: 0.
+
+        **Output:**
+
+        	list of numpy.ndarray: a function in 'x', 'y' and 'z' directions for directional correlation functions, a histogram
+        	for 'cl' and 'ps', an array with the Euler density for 'euler'.
+        """
+        token = getattr(_current, 'token', None)
+        # a crashed worker is replaced, and the request is retried once on the new worker
+        for attempt in range(2):
+            worker = self._acquire()
+            try:
+                result = worker.call(method, cut, normalize, token, self.poll_interval)
+            except JuliaError:
+                self._release(worker)
+                raise
+            except _WorkerCrashed:
+                self._discard(worker)
+                continue
+            except BaseException:
+                # the response of an interrupted request cannot be skipped, so the worker is dropped
+                self._discard(worker)
+                raise
+            self._release(worker)
+            return result
+        raise RuntimeError("Error in julia run occured!")
+
+    def close(self):
+        """
+        Stop the idle workers.
+        """
+        with self._condition:
+            idle, self._idle = self._idle, []
+            self._n_workers -= len(idle)
+        for worker in idle:
+            worker.close()
+
+    def _acquire(self):
+        with self._condition:
+            while len(self._idle) == 0 and self._n_workers >= self.max_workers:
+                self._condition.wait()
+            if len(self._idle) > 0:
+                return self._idle.pop()
+            self._n_workers += 1
+        try:
+            return _JuliaWorker(self.n_threads)
+        except BaseException:
+            with self._condition:
+                self._n_workers -= 1
+                self._condition.notify()
+            raise
+
+    def _release(self, worker):
+        with self._condition:
+            self._idle.append(worker)
+            self._condition.notify()
+
+    def _discard(self, worker):
+        worker.kill()
+        with self._condition:
+            self._n_workers -= 1
+            self._condition.notify()
+
+
+def get_pool():
+    """
+    Julia pool of the process, created on first use. Processes forked from a process with a pool get their own pool.
+    """
+    global _pool
+    with _lock:
+        if _pool is None or _pool._pid != os.getpid():
+            _pool = JuliaPool()
+        return _pool
+
+
+def _close_pool():
+    if _pool is not None and _pool._pid == os.getpid():
+        _pool.close()
+
+
+atexit.register(_close_pool)
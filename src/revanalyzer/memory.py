@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+"""
+Memory-aware admission of subsample tasks. The peak memory of a task is estimated from the number of voxels in the subsample and
+the metric, and refined with the peak RSS observed in the workers. While a MemoryBudget is active, tasks are started only while
+the total estimated memory of the running tasks stays under the budget.
+"""
+import os
+import threading
+from . import threads
+
+# prior estimates (overhead in bytes, bytes per voxel) for the metric families
+_default_memory = {'Porosity': (0., 1.),
+                   'EulerDensityI': (3e8, 2.),
+                   'BasicCFMetric': (3e8, 16.),
+                   'BasicPDMetric': (1e8, 200.),
+                   'BasicPNMMetric': (5e7, 0.),
+                   'Permeability': (0., 16.),
+                   'PNMExtractor': (1e8, 150.)}
+_default_bytes = (1e8, 16.)
+_budget = None
+_children = threading.local()
+
+
+class MemoryModel:
+    """
+    Model of peak memory of subsample tasks: a linear function of the number of voxels with coefficients depending on the metric.
+    Prior coefficients are given for metric families and replaced by the least squares fit of the observed peaks, increased by
+    a safety margin.
+    """
+    def __init__(self, memory=None, margin=1.25):
+        """
+        **Input:**
+
+        	memory (dict(str, (float, float))): prior estimates, in which a key is a name of metric class (or of its base class)
+        	and a value is a tuple of task overhead and memory per voxel in bytes, default: None;
+
+        	margin (float): factor applied to the fitted estimates, default: 1.25.
+        """
+        self.memory = dict(_default_memory)
+        if memory is not None:
+            self.memory.update(memory)
+        self.margin = margin
+        self._stats = {}
+
+    def estimate(self, metric, n_voxels):
+        """
+        Estimated peak memory of a task.
+
+        **Input:**
+
+        	metric (subclass of BasicMetric or str): metric computed in the task or the name of the task kind;
+
+        	n_voxels (int): number of voxels in the subsample.
+
+        **Output:**
+
+        	memory (float): estimated peak memory of the task in bytes.
+        """
+        name = metric if isinstance(metric, str) else metric.__class__.__name__
+        stats = self._stats.get(name)
+        if stats is not None:
+            n, sx, sy, sxx, sxy, ymax = stats
+            det = n*sxx - sx*sx
+            if n > 1 and det > 0:
+                slope = max((n*sxy - sx*sy)/det, 0.)
+                intercept = max((sy - slope*sx)/n, 0.)
+                return self.margin*(intercept + slope*n_voxels)
+            # a single observed size gives no slope, the estimate is the largest observed peak scaled by the number of voxels
+            return self.margin*ymax*max(n_voxels/(sx/n), 1.)
+        overhead, rate = self._prior(metric)
+        return overhead + rate*n_voxels
+
+    def update(self, metric, n_voxels, peak):
+        """
+        Refine the estimates with the observed peak memory of a task.
+
+        **Input:**
+
+        	metric (subclass of BasicMetric or str): metric computed in the task or the name of the task kind;
+
+        	n_voxels (int): number of voxels in the subsample;
+
+        	peak (float): observed peak memory of the task in bytes.
+        """
+        name = metric if isinstance(metric, str) else metric.__class__.__name__
+        n, sx, sy, sxx, sxy, ymax = self._stats.get(name, (0, 0., 0., 0., 0., 0.))
+        x = float(n_voxels)
+        self._stats[name] = (n + 1, sx + x, sy + peak, sxx + x*x, sxy + x*peak, max(ymax, peak))
+
+    def _prior(self, metric):
+        if isinstance(metric, str):
+            return self.memory.get(metric, _default_bytes)
+        for cls in type(metric).__mro__:
+            if cls.__name__ in self.memory:
+                return self.memory[cls.__name__]
+        return _default_bytes
+
+
+class MemoryBudget:
+    """
+    Limit of the total estimated memory of the running subsample tasks. Parallel stages started while the budget is active admit
+    a task only if it fits into the budget together with the running tasks; a task exceeding the budget alone is run when no other
+    task is running.
+    """
+    def __init__(self, max_bytes=None, fraction=0.8):
+        """
+        **Input:**
+
+        	max_bytes (int): budget in bytes. If None, the fraction of the memory available at creation of the budget is used, default: None;
+
+        	fraction (float): fraction of available memory used if max_bytes is None, default: 0.8.
+        """
+        if max_bytes is None:
+            max_bytes = int(fraction*_available_memory())
+        self.max_bytes = max_bytes
+        self._previous = None
+
+    def start(self):
+        """
+        Activate the budget.
+        """
+        global _budget
+        self._previous = _budget
+        _budget = self
+
+    def stop(self):
+        """
+        Deactivate the budget.
+        """
+        global _budget
+        _budget = self._previous
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+
+def get_budget():
+    """
+    Active memory budget or None if tasks are not limited by memory.
+    """
+    return _budget
+
+
+def _available_memory():
+    try:
+        with open('/proc/meminfo') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1])*1024
+    except OSError:
+        pass
+    return os.sysconf('SC_PAGE_SIZE')*os.sysconf('SC_PHYS_PAGES')
+
+
+def _status(field):
+    # value of a field of /proc/self/status in bytes
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith(field + ':'):
+                return int(line.split()[1])*1024
+    return None
+
+
+def _measured_call(func, task):
+    # runs a task and returns its result with the increase of peak RSS of the worker process during the task plus the largest
+    # peak of external programs run by the task, or None if it cannot be measured: the counters are reset only in worker processes
+    # of executors, where tasks run one at a time in the main thread, and never in the process of the analysis
+    if not threads._worker_process or threading.current_thread() is not threading.main_thread():
+        return func(task), None
+    try:
+        rss = _status('VmRSS')
+        with open('/proc/self/clear_refs', 'w') as f:
+            # resets the peak RSS of the process to the current RSS
+            f.write('5')
+    except OSError:
+        return func(task), None
+    _children.peak = 0
+    try:
+        result = func(task)
+        peak = max(_status('VmHWM') - rss, 0) + _children.peak
+    finally:
+        _children.peak = None
+    return result, peak
+
+
+def _record_child(peak):
+    # called with the peak RSS of each external program waited by the task being measured
+    if getattr(_children, 'peak', None) is not None:
+        _children.peak = max(_children.peak, peak)
+
+
+_default_memory_model = MemoryModel()
@@ -5,6 +5,7 @@ from .basic_metric import BasicMetric
 from .porosity import Porosity
 from .permeability import Permeability
 from .euler_density_i import EulerDensityI
+from .minkowski import BasicMinkowskiMetric, SpecificSurface, IntegralMeanCurvature
 from .pnm import BasicPNMMetric, PoreNumber, ThroatNumber, EulerDensityII, MeanPoreRadius, MeanThroatRadius, MeanConnectivity, PoreRadius, ThroatRadius, Connectivity
 from .cf import L2, S2, C2, SS, SV, ChordLength, PoreSize
 from .pd import BasicPDMetric, PD0, PD1, PD2
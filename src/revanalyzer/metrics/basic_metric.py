@@ -3,12 +3,21 @@
 
 import numpy as np
 import os
+from ..stores import _find_store
+from ..generators import _slice
 
 
 class BasicMetric:
     """
     Base class of all metrics. (Don't use it directly but derive from it).
     """    
+    # heavy dependencies imported lazily by the metric, preloaded by worker processes
+    _worker_imports = ()
+    # metrics computing all the subsamples of an image in one pass implement generate_batch()
+    _batch_generation = False
+    # Minkowski functionals of the pore space used by the batch generation, MultiREVAnalyzer computes them in one pass for all the metrics
+    _functionals = ()
+
     def __init__(self, vectorizer, n_threads):
         """
         **Input:**
@@ -22,8 +31,36 @@ class BasicMetric:
         self.directional = False
         self.metric_type = None
         
+
+    def generate_batch(self, image, cuts, outputdir, gendatadir = None):
+        """
+        Generates the metric for many subsamples of an image. Metrics with _batch_generation = True compute all the subsamples at once,
+        by default the subsamples are generated one by one.
+        
+        **Input:**
+        
+        	image (numpy.ndarray): 3D array representing the image;
+        	
+        	cuts (list of tuples (str, bounds)): names of subsamples and their bounds ((x0, x1), (y0, y1), (z0, z1));
+        	
+        	outputdir (str): output folder;
+        	
+        	gendatadir (str): folder with generated data, default: None.
+        """
+        for cut_name, bounds in cuts:
+            self.generate(_slice(image, bounds), cut_name, outputdir, gendatadir)
+
+    def _params(self):
+        params = {'metric': self.__class__.__name__}
+        for key, value in vars(self).items():
+            # settings not changing the metric values do not invalidate generated data
+            if key.startswith('_') or key in ('vectorizer', 'n_threads', 'show_time', 'mmap'):
+                continue
+            if value is None or isinstance(value, (bool, int, float, str)):
+                params[key] = value
+        return params
        
-    def read(self, inputdir, step, cut_id):
+    def read(self, inputdir, step, cut_id, store=None):
         """
         Read the metric data generated for a specific subsample.
         
@@ -33,22 +70,23 @@ class BasicMetric:
         	
         	step (int): subsamples selection step;
         	
-        	cut_id (int: 0,..8): cut index.  
+        	cut_id (int: 0,..8): cut index;
+        	
+        	store (subclass of BasicStore): result store keeping the values. If None, the text files of subsample are read, and a container
+        	found in the folder is used only if they are missing, default: None.
         
         **Output:**
         
         	metric value (float or np.array(dtype='float')).
         """
+        if store is None and not _has_text_files(inputdir, "cut" + str(step) + "_" + str(cut_id)):
+            store = _find_store(inputdir)
         if self.directional:
             directions = ('_x', '_y', '_z')
-            cut_names = ["cut" + str(step) + "_" + str(cut_id) + direction + ".txt" for direction in directions]
+            cut_names = ["cut" + str(step) + "_" + str(cut_id) + direction for direction in directions]
             data = []
             for cut_name in cut_names:
-                if inputdir is not None:
-                    filein = os.path.join(inputdir, cut_name)
-                else:
-                    filein = cut_name
-                d = np.loadtxt(filein, delimiter=" ", dtype=float)
+                d = _load_values(store, inputdir, cut_name)
                 if self.metric_type == 'v':
                     data.append(d)
                 if self.metric_type == 's':
@@ -58,12 +96,24 @@ class BasicMetric:
                         data.append(d.item())
             return data
         else:
-            cut_name = "cut" + str(step) + "_" + str(cut_id) + ".txt"
-            if inputdir is not None:
-                filein = os.path.join(inputdir, cut_name)
-            else:
-                filein = cut_name
-            data = np.loadtxt(filein, delimiter=" ", dtype=float)
+            cut_name = "cut" + str(step) + "_" + str(cut_id)
+            data = _load_values(store, inputdir, cut_name)
             if self.metric_type == 's' and np.isnan(data):
                 data = np.array(0)
             return data
+
+
+def _has_text_files(inputdir, cut_name):
+    if inputdir is None:
+        inputdir = '.'
+    return os.path.isfile(os.path.join(inputdir, cut_name + ".txt")) or os.path.isfile(os.path.join(inputdir, cut_name + "_x.txt"))
+
+
+def _load_values(store, inputdir, cut_name):
+    if store is not None:
+        return store.get(inputdir, cut_name)
+    if inputdir is not None:
+        filein = os.path.join(inputdir, cut_name + ".txt")
+    else:
+        filein = cut_name + ".txt"
+    return np.loadtxt(filein, delimiter=" ", dtype=float)
@@ -2,21 +2,26 @@
 """Definition of CF-based metrics. For the definition of correlation functions (CF) see the documentation."""
 
 from .basic_metric import BasicMetric
-from ..generators import _write_array
+from ..generators import _write_array, _slice, correlation_functions, _batch_size
+from ..tracing import span
+from .. import cancellation
+from ..julia_pool import get_pool
+from ..memory import get_budget, _available_memory
 from ..vectorizers  import CFVectorizer, DirectVectorizer
 import numpy as np
-import matplotlib.pyplot as plt
 import os
 import time
 import imp
-import subprocess
 
 
 class BasicCFMetric(BasicMetric):
     """
     Base class of CF-based metrics. (Don't use it directly but derive from it).
     """ 
-    def __init__(self, vectorizer, n_threads, show_time, normalize):
+    # correlation function computed by the 'fft' backend, None if the metric is computed by julia only
+    _method = None
+
+    def __init__(self, vectorizer, n_threads, show_time, normalize, backend='julia'):
         """
         **Input:**
         
@@ -26,14 +31,22 @@ class BasicCFMetric(BasicMetric):
         	
         	show_time (bool): flag to monitor time cost for large images;
         	
-        	normalize (bool): flag to control normalization of CF. If True, CF are normalized to satisfy the condition CF(0) = 1. See the details in Karsanina et al. (2021). Compressing soil structural information into parameterized correlation functions. European Journal of Soil Science, 72(2), 561-577. 
+        	normalize (bool): flag to control normalization of CF. If True, CF are normalized to satisfy the condition CF(0) = 1. See the details in Karsanina et al. (2021). Compressing soil structural information into parameterized correlation functions. European Journal of Soil Science, 72(2), 561-577;
+        	
+        	backend (str): 'julia' runs corfunction_xyz.jl for each subsample, 'julia_pool' sends subsamples to long-lived Julia workers, 'fft' computes CF in the process, all the subsamples of a step in one batch, default: 'julia'.
         """        
         super().__init__(vectorizer, n_threads = n_threads)
+        if backend not in ('julia', 'julia_pool', 'fft'):
+            raise ValueError("Backend should be 'julia', 'julia_pool' or 'fft'.")
+        if backend == 'fft' and self._method is None:
+            raise ValueError("Backend 'fft' is not available for " + self.__class__.__name__ + ".")
         self.show_time = show_time
         if normalize == True:
             self.normalize = 1
         else:
             self.normalize = 0
+        self.backend = backend
+        self._batch_generation = backend == 'fft'
 
     def generate(self, cut, cut_name, outputdir, method, gendatadir = None):
         """
@@ -50,6 +63,19 @@ class BasicCFMetric(BasicMetric):
         	method (str): method for generation of cpecific CF. Different in differenent CF-based metrics.
         """          
         start_time = time.time()
+        if self.backend == 'fft':
+            self._write(correlation_functions(cut[None], method, self.normalize == 1, n_threads=self.n_threads)[0], cut_name, outputdir)
+            self._show_time(cut_name, start_time)
+            return cut_name + ".txt"
+        if self.backend == 'julia_pool':
+            with span('julia_pool', method=method, cut=cut_name, cut_size=cut.size):
+                values = get_pool().call(method, cut, self.normalize)
+            if method in ('cl', 'ps'):
+                np.savetxt(os.path.join(outputdir, cut_name + '.txt'), values[0])
+            else:
+                self._write(values, cut_name, outputdir)
+            self._show_time(cut_name, start_time)
+            return cut_name + ".txt"
         glob_path = os.getcwd()
         dimx = cut.shape[0]
         dimy = cut.shape[1]
@@ -60,14 +86,53 @@ class BasicCFMetric(BasicMetric):
         image_path = os.path.join(output_path, cut_name +'.raw')
         _write_array(cut, image_path)
         file_out = os.path.join(output_path, cut_name)
-        code = subprocess.call(['julia', jl_path, image_path, str(dimx), str(dimy), str(dimz), method, str(self.normalize), file_out])
+        with span('subprocess', command='julia corfunction_xyz.jl ' + method, cut=cut_name, cut_size=cut.size):
+            code = cancellation.call(['julia', jl_path, image_path, str(dimx), str(dimy), str(dimz), method, str(self.normalize), file_out])
         if (code != 0):
             raise RuntimeError("Error in julia run occured!")
         os.remove(image_path)           
+        self._show_time(cut_name, start_time)
+        return cut_name + ".txt"
+
+    def generate_batch(self, image, cuts, outputdir, gendatadir = None):
+        """
+        Generates CF metric for many subsamples at once, the subsamples of the same size are processed in batches fitting into
+        the active memory budget (or into the half of available memory if no budget is active).
+        
+        **Input:**
+        
+        	image (numpy.ndarray): 3D array representing the image;
+        	
+        	cuts (list of tuples (str, bounds)): names of subsamples and their bounds ((x0, x1), (y0, y1), (z0, z1));
+        	
+        	outputdir (str): output folder.
+        """
+        groups = {}
+        for cut_name, bounds in cuts:
+            groups.setdefault(tuple(b[1] - b[0] for b in bounds), []).append((cut_name, bounds))
+        budget = get_budget()
+        max_bytes = budget.max_bytes if budget is not None else _available_memory()/2
+        token = getattr(cancellation._current, 'token', None)
+        for shape, group in groups.items():
+            n = _batch_size(shape, self._method, max_bytes)
+            for i in range(0, len(group), n):
+                if token is not None:
+                    token.check()
+                start_time = time.time()
+                batch = np.stack([_slice(image, bounds) for cut_name, bounds in group[i:i+n]])
+                values = correlation_functions(batch, self._method, self.normalize == 1, n_threads=self.n_threads)
+                for (cut_name, bounds), v in zip(group[i:i+n], values):
+                    self._write(v, cut_name, outputdir)
+                self._show_time('batch of ' + str(len(batch)), start_time)
+
+    def _write(self, values, cut_name, outputdir):
+        for direction, v in zip(('_x', '_y', '_z'), values):
+            np.savetxt(os.path.join(outputdir, cut_name + direction + '.txt'), v)
+
+    def _show_time(self, cut_name, start_time):
         if self.show_time:
             print("cut ", cut_name, ", run time: ")
             print("--- %s seconds ---" % (time.time() - start_time))
-        return cut_name + ".txt"
 
     def show(self, inputdir, step, cut_id):
         """
@@ -93,6 +158,7 @@ class BasicCFMetric(BasicMetric):
         		
         		data[2] (list(dtype = float)): 'y' coordinate values for a plot, corresponding of CF generated in 'z' direction.
         """        
+        import matplotlib.pyplot as plt
         data = self.read(inputdir, step, cut_id)
         x = np.arange(len(data[0]))
         plt.rcParams.update({'font.size': 16})
@@ -128,7 +194,9 @@ class C2(BasicCFMetric):
     """
     Class describing metric C2. 
     """ 
-    def __init__(self,  vectorizer, n_threads = 1, show_time=False, normalize=True):
+    _method = 'c2'
+
+    def __init__(self,  vectorizer, n_threads = 1, show_time=False, normalize=True, backend='julia'):
         """
         **Input:**
         
@@ -138,11 +206,13 @@ class C2(BasicCFMetric):
         	
         	show_time (bool): flag to monitor time cost for large images, default: False;
         	
-        	normalize (bool): flag to control normalization of CF. If True, CF are normalized to satisfy the condition CF(0) = 1. See the details in Karsanina et al. (2021). Compressing soil structural information into parameterized correlation functions. European Journal of Soil Science, 72(2), 561-577. Default: True.
+        	normalize (bool): flag to control normalization of CF. If True, CF are normalized to satisfy the condition CF(0) = 1. See the details in Karsanina et al. (2021). Compressing soil structural information into parameterized correlation functions. European Journal of Soil Science, 72(2), 561-577. Default: True;
+        	
+        	backend (str): 'julia' runs corfunction_xyz.jl for each subsample, 'julia_pool' sends subsamples to long-lived Julia workers, 'fft' computes CF in the process, all the subsamples of a step in one batch, default: 'julia'.
         """ 
         if not isinstance(vectorizer, CFVectorizer):
             raise TypeError("Vectorizer should be an object of CFVectorizer class")
-        super().__init__(vectorizer, n_threads, show_time, normalize)
+        super().__init__(vectorizer, n_threads, show_time, normalize, backend)
         self.directional = True
         self.metric_type = 'v'
 
@@ -172,6 +242,7 @@ class C2(BasicCFMetric):
         
         	cut_id (int: 0,..8): cut index.
         """
+        import matplotlib.pyplot as plt
         x, vx, vy, vz = super().show(inputdir, step, cut_id)
         fig, ax = plt.subplots(figsize=(10, 8))
         title = self.__class__.__name__ + ", " + ", step = " + str(step) + ", id = " + str(cut_id)
@@ -233,6 +304,7 @@ class L2(BasicCFMetric):
         
         	cut_id (int: 0,..8): cut index.
         """
+        import matplotlib.pyplot as plt
         x, vx, vy, vz = super().show(inputdir, step, cut_id)
         fig, ax = plt.subplots(figsize=(10, 8))
         title = self.__class__.__name__ + ", " + "step = " + str(step) + ", id = " + str(cut_id)
@@ -250,7 +322,9 @@ class S2(BasicCFMetric):
     """
     Class describing metric S2. 
     """ 
-    def __init__(self,  vectorizer, n_threads = 1, show_time=False, normalize=True):
+    _method = 's2'
+
+    def __init__(self,  vectorizer, n_threads = 1, show_time=False, normalize=True, backend='julia'):
         """
         **Input:**
         
@@ -260,11 +334,13 @@ class S2(BasicCFMetric):
         	
         	show_time (bool): flag to monitor time cost for large images, default: False;
         	
-        	normalize (bool): flag to control normalization of CF. If True, CF are normalized to satisfy the condition CF(0) = 1. See the details in Karsanina et al. (2021). Compressing soil structural information into parameterized correlation functions. European Journal of Soil Science, 72(2), 561-577. Default: True.
+        	normalize (bool): flag to control normalization of CF. If True, CF are normalized to satisfy the condition CF(0) = 1. See the details in Karsanina et al. (2021). Compressing soil structural information into parameterized correlation functions. European Journal of Soil Science, 72(2), 561-577. Default: True;
+        	
+        	backend (str): 'julia' runs corfunction_xyz.jl for each subsample, 'julia_pool' sends subsamples to long-lived Julia workers, 'fft' computes CF in the process, all the subsamples of a step in one batch, default: 'julia'.
         """
         if not isinstance(vectorizer, CFVectorizer):
             raise TypeError("Vectorizer should be an object of CFVectorizer class")
-        super().__init__(vectorizer, n_threads, show_time, normalize)
+        super().__init__(vectorizer, n_threads, show_time, normalize, backend)
         self.directional = True
         self.metric_type = 'v'
 
@@ -294,6 +370,7 @@ class S2(BasicCFMetric):
         
         	cut_id (int: 0,..8): cut index.
         """
+        import matplotlib.pyplot as plt
         x, vx, vy, vz = super().show(inputdir, step, cut_id)
         fig, ax = plt.subplots(figsize=(10, 8))
         title = self.__class__.__name__ + ", " + "step = " + str(step) + ", id = " + str(cut_id)
@@ -311,7 +388,9 @@ class SS(BasicCFMetric):
     """
     Class describing metric SS. 
     """ 
-    def __init__(self,  vectorizer, n_threads = 1, show_time=False, normalize=True):
+    _method = 'ss'
+
+    def __init__(self,  vectorizer, n_threads = 1, show_time=False, normalize=True, backend='julia'):
         """
         **Input:**
         
@@ -321,11 +400,13 @@ class SS(BasicCFMetric):
         	
         	show_time (bool): flag to monitor time cost for large images, default: False;
         	
-        	normalize (bool): flag to control normalization of CF. If True, CF are normalized to satisfy the condition CF(0) = 1. See the details in Karsanina et al. (2021). Compressing soil structural information into parameterized correlation functions. European Journal of Soil Science, 72(2), 561-577. Default: True.
+        	normalize (bool): flag to control normalization of CF. If True, CF are normalized to satisfy the condition CF(0) = 1. See the details in Karsanina et al. (2021). Compressing soil structural information into parameterized correlation functions. European Journal of Soil Science, 72(2), 561-577. Default: True;
+        	
+        	backend (str): 'julia' runs corfunction_xyz.jl for each subsample, 'julia_pool' sends subsamples to long-lived Julia workers, 'fft' computes CF in the process, all the subsamples of a step in one batch, default: 'julia'.
         """
         if not isinstance(vectorizer, CFVectorizer):
             raise TypeError("Vectorizer should be an object of CFVectorizer class")
-        super().__init__(vectorizer, n_threads, show_time, normalize)
+        super().__init__(vectorizer, n_threads, show_time, normalize, backend)
         self.directional = True
         self.metric_type = 'v'
 
@@ -355,6 +436,7 @@ class SS(BasicCFMetric):
         
         	cut_id (int: 0,..8): cut index.
         """
+        import matplotlib.pyplot as plt
         x, vx, vy, vz = super().show(inputdir, step, cut_id)
         fig, ax = plt.subplots(figsize=(10, 8))
         title = self.__class__.__name__ + ", " + "step = " + str(step) + ", id = " + str(cut_id)
@@ -372,7 +454,9 @@ class SV(BasicCFMetric):
     """
     Class describing metric SV. 
     """  
-    def __init__(self,  vectorizer, n_threads = 1, show_time=False, normalize=True):
+    _method = 'sv'
+
+    def __init__(self,  vectorizer, n_threads = 1, show_time=False, normalize=True, backend='julia'):
         """
         **Input:**
         
@@ -382,11 +466,13 @@ class SV(BasicCFMetric):
         	
         	show_time (bool): flag to monitor time cost for large images, default: False;
         	
-        	normalize (bool): flag to control normalization of CF. If True, CF are normalized to satisfy the condition CF(0) = 1. See the details in Karsanina et al. (2021). Compressing soil structural information into parameterized correlation functions. European Journal of Soil Science, 72(2), 561-577. Default: True.
+        	normalize (bool): flag to control normalization of CF. If True, CF are normalized to satisfy the condition CF(0) = 1. See the details in Karsanina et al. (2021). Compressing soil structural information into parameterized correlation functions. European Journal of Soil Science, 72(2), 561-577. Default: True;
+        	
+        	backend (str): 'julia' runs corfunction_xyz.jl for each subsample, 'julia_pool' sends subsamples to long-lived Julia workers, 'fft' computes CF in the process, all the subsamples of a step in one batch, default: 'julia'.
         """ 
         if not isinstance(vectorizer, CFVectorizer):
             raise TypeError("Vectorizer should be an object of CFVectorizer class")
-        super().__init__(vectorizer, n_threads, show_time, normalize)
+        super().__init__(vectorizer, n_threads, show_time, normalize, backend)
         self.directional = True
         self.metric_type = 'v'
 
@@ -416,6 +502,7 @@ class SV(BasicCFMetric):
         
         	cut_id (int: 0,..8): cut index.
         """
+        import matplotlib.pyplot as plt
         x, vx, vy, vz = super().show(inputdir, step, cut_id)
         fig, ax = plt.subplots(figsize=(10, 8))
         title = self.__class__.__name__ + ", " + "step = " + str(step) + ", id = " + str(cut_id)
@@ -477,6 +564,7 @@ class ChordLength(BasicCFMetric):
         
         	cut_id (int: 0,..8): cut index.
         """
+        import matplotlib.pyplot as plt
         data = self.read(inputdir, step, cut_id)
         x = np.arange(len(data))
         plt.rcParams.update({'font.size': 16})
@@ -537,6 +625,7 @@ class PoreSize(BasicCFMetric):
         
         	cut_id (int: 0,..8): cut index.
         """
+        import matplotlib.pyplot as plt
         data = self.read(inputdir, step, cut_id)
         x = np.arange(len(data))
         plt.rcParams.update({'font.size': 16})
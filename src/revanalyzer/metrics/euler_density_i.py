@@ -4,27 +4,37 @@ Definition of Euler Density I metric. The Euler density here is calculated using
 """
 
 from .basic_metric import BasicMetric
-from ..generators import _write_array
+from ..generators import _write_array, EulerCharacteristic, _functionals_of
+from ..tracing import span
+from .. import cancellation
+from ..julia_pool import get_pool
 import os
 import time
 import imp
-import subprocess
 
 class EulerDensityI(BasicMetric):
     """
     Class describing Euler density I metric.
     """     
-    def __init__(self, n_threads = 1, show_time=False):
+    def __init__(self, n_threads = 1, show_time=False, backend='numpy'):
         """
         **Input:**
         
         n_threads (int): number of threads used for data generation, default: 1;
         
-        	show_time (bool): flag to monitor time cost for large images, default: False.
+        	show_time (bool): flag to monitor time cost for large images, default: False;
+        	
+        	backend (str): 'numpy' computes Euler densities in the process, all the subsamples of an image in one pass over it;
+        	'julia' runs EulerCharacteristic.jl for each subsample; 'julia_pool' sends subsamples to long-lived Julia workers, default: 'numpy'.
         """
         super().__init__(vectorizer=None, n_threads = n_threads)
+        if backend not in ('numpy', 'julia', 'julia_pool'):
+            raise ValueError("Backend should be 'numpy', 'julia' or 'julia_pool'.")
         self.metric_type = 's'
         self.show_time = show_time
+        self.backend = backend
+        self._batch_generation = backend == 'numpy'
+        self._functionals = ('euler',) if backend == 'numpy' else ()
 
     def generate(self, cut, cut_name, outputdir, gendatadir = None):
         """
@@ -39,6 +49,16 @@ class EulerDensityI(BasicMetric):
         	outputdir (str): output folder.
         """        
         start_time = time.time()
+        if self.backend == 'numpy':
+            self._write(EulerCharacteristic(cut, windows=[tuple((0, n) for n in cut.shape)]).density(), cut_name, outputdir)
+            self._show_time(cut_name, start_time)
+            return
+        if self.backend == 'julia_pool':
+            with span('julia_pool', method='euler', cut=cut_name, cut_size=cut.size):
+                values = get_pool().call('euler', cut)
+            self._write(values[0][0], cut_name, outputdir)
+            self._show_time(cut_name, start_time)
+            return
         glob_path = os.getcwd()
         dimx = cut.shape[0]
         dimy = cut.shape[1]
@@ -49,10 +69,38 @@ class EulerDensityI(BasicMetric):
         image_path = os.path.join(output_path, cut_name +'.raw')
         _write_array(cut, image_path)
         file_out = os.path.join(output_path, cut_name +'.txt')
-        code = subprocess.call(['julia', jl_path, image_path, str(dimx), str(dimy), str(dimz), file_out])
+        with span('subprocess', command='julia euler_density.jl', cut=cut_name, cut_size=cut.size):
+            code = cancellation.call(['julia', jl_path, image_path, str(dimx), str(dimy), str(dimz), file_out])
         if (code != 0):
             raise RuntimeError("Error in julia run occured!")
         os.remove(image_path)
+        self._show_time(cut_name, start_time)
+
+    def generate_batch(self, image, cuts, outputdir, gendatadir = None):
+        """
+        Generates Euler density for many subsamples at once from the Minkowski functionals of the image.
+        
+        **Input:**
+        
+        	image (numpy.ndarray): 3D array representing the image;
+        	
+        	cuts (list of tuples (str, bounds)): names of subsamples and their bounds ((x0, x1), (y0, y1), (z0, z1));
+        	
+        	outputdir (str): output folder.
+        """
+        if len(cuts) == 0:
+            return
+        start_time = time.time()
+        functionals = _functionals_of(image, self._functionals, [bounds for cut_name, bounds in cuts])
+        for cut_name, bounds in cuts:
+            self._write(functionals.density('euler', bounds), cut_name, outputdir)
+        self._show_time('batch of ' + str(len(cuts)), start_time)
+
+    def _write(self, density, cut_name, outputdir):
+        with open(os.path.join(outputdir, cut_name + '.txt'), 'w') as f:
+            f.write(str(float(density)))
+
+    def _show_time(self, cut_name, start_time):
         if self.show_time:
             print("cut ", cut_name, ", run time: ")
             print("--- %s seconds ---" % (time.time() - start_time))
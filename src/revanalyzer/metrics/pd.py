@@ -3,17 +3,18 @@
 
 from .basic_metric import BasicMetric
 import numpy as np
-import matplotlib.pyplot as plt
 import time
 import os
-import pyperspairdiamorse as pppdm
 from ..vectorizers import SimpleBinningVectorizer, PersistenceImageVectorizer, LandscapeVectorizer, SilhouetteVectorizer
+from ..tracing import span
 
 
 class BasicPDMetric(BasicMetric):
     """
     Base class of PD-based metrics. (Don't use it directly but derive from it).
     """ 
+    _worker_imports = ('pyperspairdiamorse',)
+
     def __init__(self, vectorizer, n_threads, show_time):
         """
         **Input:**
@@ -42,13 +43,16 @@ class BasicPDMetric(BasicMetric):
         	
         	outputdir (str): output folder;
         """ 
+        import pyperspairdiamorse as pppdm
         start_time = time.time()
         cut = cut.astype(bool)
-        pds = pppdm.extract(cut)
+        with span('pd_extract', cut=cut_name, cut_size=cut.size):
+            pds = pppdm.extract(cut)
         cut_name_out = cut_name + ".txt"
-        for i, elem in enumerate(outputdir):
-            fileout = os.path.join(elem, cut_name_out)
-            np.savetxt(fileout, pds[i])
+        with span('write', cut=cut_name):
+            for i, elem in enumerate(outputdir):
+                fileout = os.path.join(elem, cut_name_out)
+                np.savetxt(fileout, pds[i])
         if self.show_time:
             print("cut ", cut_name, ", run time: ")
             print("--- %s seconds ---" % (time.time() - start_time))        
@@ -228,6 +232,7 @@ class PD2(BasicPDMetric):
 
 
 def _show_pd(data, title):
+    import matplotlib.pyplot as plt
     b = [elem[0] for elem in data]
     d = [elem[1] for elem in data]
     plt.rcParams.update({'font.size': 16})
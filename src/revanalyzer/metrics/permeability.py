@@ -11,7 +11,7 @@ class Permeability(BasicMetric):
     """
     Class describing permeability metric.
     """
-    def __init__(self, direction='all', n_threads=1, resolution=1., show_time = False):
+    def __init__(self, direction='all', n_threads=1, resolution=1., show_time = False, mmap = False):
         """
         **Input:**
         
@@ -21,13 +21,16 @@ class Permeability(BasicMetric):
             
             resolution (float): resolution of studied sample (micrometers), default: 1;
             
-            show_time (bool): Added to monitor time cost for large images,  default: False. 
+            show_time (bool): Added to monitor time cost for large images,  default: False;
+            
+            mmap (bool): if True, pressure and velocity fields generated by FDMSS are opened as read-only memory maps and only the subsample region is read from disk, default: False.
         """
         super().__init__(vectorizer=None, n_threads = n_threads)
         self.metric_type = 's'
         self.direction = direction
         self.resolution = resolution
         self.show_time = show_time
+        self.mmap = mmap
         if direction == 'all':
             self.directional = True
             
@@ -56,8 +59,8 @@ class Permeability(BasicMetric):
         for direction in directions_list:
             pressure_name = os.path.join(gendatadir, direction + '_pressure')
             vel_name  = os.path.join(gendatadir, direction + '_vel' + direction)
-            pressure = _read_array(pressure_name, L, L, L, 'float32')
-            vel = _read_array(vel_name, L, L, L, 'float32')
+            pressure = _read_array(pressure_name, L, L, L, 'float32', self.mmap)
+            vel = _read_array(vel_name, L, L, L, 'float32', self.mmap)
             if self.directional:
                 cut_name_out = cut_name + "_" + direction + ".txt"
             else:
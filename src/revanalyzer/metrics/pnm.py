@@ -2,9 +2,7 @@
 """Definition of PNM-based metrics."""
 
 import numpy as np
-import matplotlib.pyplot as plt
 import os
-import pandas as pd
 from .basic_metric import BasicMetric
 from revanalyzer.vectorizers import HistVectorizer
 
@@ -13,6 +11,8 @@ class BasicPNMMetric(BasicMetric):
     """
     Base class of PNM-based metrics. (Don't use it directly but derive from it).
     """  
+    _worker_imports = ('pandas',)
+
     def __init__(self, vectorizer, n_threads, resolution, show_time):
         """
         **Input:**
@@ -45,6 +45,7 @@ class BasicPNMMetric(BasicMetric):
         
         	df (pandas.DataFrame): data frame with pnm statistics.
         """
+        import pandas as pd
         cut_name = os.path.join(gendatadir, cut_name + '.csv')
         df =  pd.read_csv(cut_name)
         return df
@@ -66,6 +67,7 @@ class BasicPNMMetric(BasicMetric):
             
             metric_name(str): name of metric.
         """
+        import matplotlib.pyplot as plt
         data = self.read(inputdir, step, cut_id)
         data = data/self.resolution 
         max_value = max(data)
@@ -4,12 +4,15 @@
 import numpy as np
 import os
 from .basic_metric import BasicMetric
+from ..generators import SummedAreaTable
 
 
 class Porosity(BasicMetric):
     """
     Class describing porosity metric.
     """
+    _batch_generation = True
+
     def __init__(self, n_threads = 1):
         super().__init__(vectorizer=None, n_threads = n_threads)
         self.metric_type = 's'
@@ -31,3 +34,25 @@ class Porosity(BasicMetric):
         fileout = os.path.join(outputdir, cut_name_out)
         with open(fileout, "w") as f:
             f.write(str(porosity))
+
+
+    def generate_batch(self, image, cuts, outputdir, gendatadir = None):
+        """
+        Generates porosity for many subsamples at once from the summed-area table of the image.
+        
+        **Input:**
+        
+        	image (numpy.ndarray): 3D array representing the image;
+        	
+        	cuts (list of tuples (str, bounds)): names of subsamples and their bounds ((x0, x1), (y0, y1), (z0, z1));
+        	
+        	outputdir (str): output folder.
+        """
+        if len(cuts) == 0:
+            return
+        table = SummedAreaTable(image)
+        fractions = table.fractions(np.array([bounds for cut_name, bounds in cuts]))
+        for (cut_name, bounds), fraction in zip(cuts, fractions):
+            fileout = os.path.join(outputdir, cut_name + ".txt")
+            with open(fileout, "w") as f:
+                f.write(str(float(1 - fraction)))
@@ -0,0 +1,234 @@
+# -*- coding: utf-8 -*-
+"""Module for REV analysis of several metrics performed over one image load and one pass over the subsamples.
+"""
+import time
+import numpy as np
+from .REV_analyzer import REVAnalyzer
+from .executors import BasicExecutor, make_executor
+from .tracing import span
+from .scheduler import Progress, run_tasks, _default_cost_model
+from .memory import _default_memory_model
+from .generators import _subcube_ids, _array_hash, _shared_functionals
+
+
+class MultiREVAnalyzer:
+    """
+    analysis of representativity of a given image for several scalar or vector metrics. The image is loaded once and each 
+    subsample is passed to all the metrics inside one task. Results for each metric are kept in a separate REVAnalyzer object.
+    """
+    def __init__(self, metrics, image, size, n_steps, sREV_max_step, datadir=None, outputdir='output', mmap=False, store=None, cache_size=2**28, pool=None, executor='process', resume=False, content_cache=None, cost_model=None, progress=False, memory_model=None):
+        """
+        **Input:**
+
+        	metrics (list(subclass of BasicMetric)): metrics to be analyzed;
+        
+        	image (str or numpy.ndarray): name of binary ('uint8') file or numpy.ndarray representing the image;
+            
+            size (tuple (int, int, int)): linear image sizes in x, y and z directions;
+                
+        	n_steps (int): number of subsamples selection steps;
+        
+        	sREV_max_step (int): maximal step for which sREV and stationarity analysis can be performed;
+        
+        	datadir (str): path to the folder containing image, default: None;
+        
+        	outputdir (str): path to the output folder containing generated data, default: 'output';
+        	
+        	mmap (bool): if True, an image given by file name is opened as a read-only memory map, default: False;
+        	
+        	store (subclass of BasicStore): result store used to keep the generated metric values, default: None;
+        	
+        	cache_size (int): maximal size in bytes of the in-memory LRU cache of metric values of each metric, default: 2**28;
+        	
+        	pool (multiprocessing.pool.Pool or subclass of BasicExecutor): worker pool used by all the parallel stages. If None, the executor is created 
+        	at the first parallel stage with the maximal number of threads over all the metrics, default: None;
+        	
+        	executor (str or subclass of BasicExecutor): execution backend of parallel stages: 'serial', 'thread', 'process' or 'distributed', 
+        	see REVAnalyzer. An executor object given here is used as is and is not shut down by close(), default: 'process';
+        	
+        	resume (bool): if True, generation skips subsamples recorded in the generation manifests as completed with the same parameters and unchanged output, default: False;
+        	
+        	content_cache (ContentCache): cross-run cache of metric values addressed by image content, subsample bounds and metric parameters, default: None;
+        	
+        	cost_model (CostModel): model estimating the cost of subsample tasks, used to dispatch the most expensive tasks first. If None, 
+        	the model shared by all analyzers in the process is used, default: None;
+        	
+        	progress (bool): if True, the number of completed tasks, the estimated remaining time and the peak memory of tasks are printed during generation, default: False;
+        	
+        	memory_model (MemoryModel): model estimating the peak memory of subsample tasks, see REVAnalyzer. If None, the model shared by all analyzers 
+        	in the process is used, default: None.
+        """
+        if len(metrics) == 0:
+            raise ValueError("At least one metric should be given.")
+        self.analyzers = [REVAnalyzer(metric, image, size, n_steps, sREV_max_step, datadir, outputdir, shared_memory=True, mmap=mmap, store=store, cache_size=cache_size, pool=pool, executor=executor, resume=resume, content_cache=content_cache, cost_model=cost_model, memory_model=memory_model) 
+                          for metric in metrics]
+        self.metrics = metrics
+        self.image = image
+        self.size = size
+        self.n_steps = n_steps
+        self.sREV_max_step = sREV_max_step
+        if pool is not None and not isinstance(pool, BasicExecutor):
+            pool = self.analyzers[0]._pool
+        if pool is None and isinstance(executor, BasicExecutor):
+            pool = executor
+        self.executor = executor
+        self._pool = pool
+        self._own_pool = pool is None
+        self.content_cache = content_cache
+        self.cost_model = cost_model if cost_model is not None else _default_cost_model
+        self.progress = progress
+        self.memory_model = memory_model if memory_model is not None else _default_memory_model
+
+    def __getitem__(self, i):
+        return self.analyzers[i]
+
+    def __len__(self):
+        return len(self.analyzers)
+
+    def generate(self):
+        """
+        Generator of values of all the metrics for all selected subsamples.
+        """
+        with span('generate', metric=', '.join(metric.__class__.__name__ for metric in self.metrics)):
+            self._generate()
+
+    def _generate(self):
+        analyzer0 = self.analyzers[0]
+        for analyzer in self.analyzers:
+            analyzer._cache.invalidate()
+        image = analyzer0._load_image()
+        image_key = analyzer0._image_id(image)
+        content_hash = None
+        if self.content_cache is not None:
+            content_hash = _array_hash(image) if isinstance(self.image, str) else image_key
+        pending = [set(analyzer._pending_ids(image, image_key, content_hash)) for analyzer in self.analyzers]
+        if any(len(ids) > 0 and not analyzer.metric._batch_generation for analyzer, ids in zip(self.analyzers, pending)):
+            # the pool is shared by the analyzers before PNM extraction uses it, and is not started if only batch metrics are computed
+            self._get_pool()
+        for analyzer, ids in zip(self.analyzers, pending):
+            if len(ids) > 0:
+                analyzer._prepare(image)
+        batch = [i for i, analyzer in enumerate(self.analyzers) if analyzer.metric._batch_generation and len(pending[i]) > 0]
+        windows = set(self.analyzers[i]._cut_bounds(l, idx) for i in batch for l, idx in pending[i])
+        with _shared_functionals(set(f for i in batch for f in self.metrics[i]._functionals), windows):
+            for i in batch:
+                # metrics computed in one pass over the image are not included into the tasks
+                ids = [elem for elem in _subcube_ids(self.n_steps, self.sREV_max_step) if elem in pending[i]]
+                for elem in self.analyzers[i]._generate_batch(image, ids):
+                    pass
+                pending[i] = set()
+        tasks = []
+        for elem in _subcube_ids(self.n_steps, self.sREV_max_step):
+            analyzer_ids = [i for i in range(len(self.analyzers)) if elem in pending[i]]
+            if len(analyzer_ids) > 0:
+                tasks.append((elem, analyzer_ids))
+        if len(tasks) > 0:
+            self._run_tasks(image, tasks)
+        for analyzer in self.analyzers:
+            analyzer._finish()
+
+    def _run_tasks(self, image, tasks):
+        analyzer0 = self.analyzers[0]
+        shm, image_ref = analyzer0._share_image(image)
+        for analyzer in self.analyzers:
+            analyzer._image_ref = image_ref
+        costs = [sum(self.cost_model.estimate(self.metrics[i], analyzer0._cut_voxels(elem[0])) for i in analyzer_ids) for elem, analyzer_ids in tasks]
+        # metrics of a task are computed one by one, so the task needs the memory of the largest of them
+        memory = [max(self.memory_model.estimate(self.metrics[i], analyzer0._cut_voxels(elem[0])) for i in analyzer_ids) for elem, analyzer_ids in tasks]
+        tasks = [(elem, analyzer_ids, analyzer0._task_cut(image, elem[0], elem[1])) for elem, analyzer_ids in tasks]
+        progress = Progress(', '.join(metric.__class__.__name__ for metric in self.metrics), costs, self.progress)
+        try:
+            for ((elem, analyzer_ids), timings), elapsed, peak in run_tasks(self._get_pool(), self._metrics_for_subsample, tasks, costs, analyzer0._n_workers(), progress, memory):
+                for i, elapsed in zip(analyzer_ids, timings):
+                    self.analyzers[i]._record_cut(elem[0], elem[1])
+                    self.cost_model.update(self.metrics[i], analyzer0._cut_voxels(elem[0]), elapsed)
+                # the peak of a task with several metrics cannot be attributed to one of them
+                if peak is not None and len(analyzer_ids) == 1:
+                    self.memory_model.update(self.metrics[analyzer_ids[0]], analyzer0._cut_voxels(elem[0]), peak)
+        finally:
+            for analyzer in self.analyzers:
+                analyzer._image_ref = None
+            if shm is not None:
+                shm.close()
+                shm.unlink()
+
+    def vectorize(self):
+        """
+        Vectorization of generated data for all vector metrics.
+        """
+        analyzers = [analyzer for analyzer in self.analyzers if analyzer.metric.metric_type == 'v']
+        if len(analyzers) > 0:
+            # the analyzers use the shared pool, which is not started by generate() if all the metrics are computed in batches
+            self._get_pool()
+        for analyzer in analyzers:
+            analyzer.vectorize()
+
+    def analyze(self, dREV_threshold, sREV_threshold):
+        """
+        Perform the analysis of representativity for all the metrics.
+        
+        **Input:**
+        
+        	dREV_threshold (float, <1): threshold to estimate dREV size;
+        	
+        	sREV_threshold (float, <1): threshold to estimate sREV size.
+        """
+        for analyzer in self.analyzers:
+            analyzer.analyze(dREV_threshold, sREV_threshold)
+
+    def show_results(self):
+        """
+        Visualization of REV analysis results for all the metrics.
+        """
+        for analyzer in self.analyzers:
+            analyzer.show_results()
+
+    def close(self):
+        """
+        Shut down the worker pool created by the analyzer. A pool given by the user is left running.
+        """
+        if self._own_pool and self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+        self._pool = None
+        for analyzer in self.analyzers:
+            analyzer._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_pool'] = None
+        state['executor'] = None
+        # tasks receive subsamples or a reference to the image, so the image itself is never sent to workers
+        if isinstance(self.image, np.ndarray):
+            state['image'] = None
+        return state
+
+    def _get_pool(self):
+        if self._pool is None:
+            modules = []
+            for analyzer in self.analyzers:
+                modules += [module for module in analyzer._worker_modules() if module not in modules]
+            n_threads = max(metric.n_threads for metric in self.metrics)
+            self._pool = make_executor(self.executor, n_threads, modules)
+            self._own_pool = True
+        for analyzer in self.analyzers:
+            analyzer._pool = self._pool
+            analyzer._own_pool = False
+        return self._pool
+
+    def _metrics_for_subsample(self, task):
+        l = task[0][0]
+        idx = task[0][1]
+        cut = self.analyzers[0]._resolve_cut(task[2], l, idx)
+        timings = []
+        for i in task[1]:
+            start_time = time.perf_counter()
+            self.analyzers[i]._generate_cut(cut, l, idx)
+            timings.append(time.perf_counter() - start_time)
+        return (task[0], task[1]), timings
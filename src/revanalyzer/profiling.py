@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+"""
+Profiling of the tasks executed in the worker processes. Each task runs under cProfile, the statistics are returned to the
+main process together with the task results and merged into one report.
+"""
+import cProfile
+import heapq
+import io
+import numbers
+import pstats
+
+_profiler = None
+
+
+class Profiler:
+    """
+    Collector of profiling statistics of tasks (generation of metric values for subsamples, PNM extraction, vectorization and
+    distances between subsamples). Tasks are profiled while the profiler is active.
+    """
+    def __init__(self, top_n=None):
+        """
+        **Input:**
+
+        	top_n (int): if given, only the statistics of top_n slowest tasks are kept in the report, default: None.
+        """
+        self.top_n = top_n
+        self.tasks = []
+        self._stats = None
+        self._slowest = []
+        self._count = 0
+        self._previous = None
+
+    def start(self):
+        """
+        Activate the profiler.
+        """
+        global _profiler
+        self._previous = _profiler
+        _profiler = self
+
+    def stop(self):
+        """
+        Deactivate the profiler.
+        """
+        global _profiler
+        _profiler = self._previous
+        self._previous = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def stats(self):
+        """
+        Merged statistics of the profiled tasks.
+
+        **Output:**
+
+        	pstats.Stats or None if no task was profiled.
+        """
+        if self.top_n is None:
+            return self._stats
+        result = None
+        for elapsed, count, label, stats in self._slowest:
+            result = _merge(result, stats)
+        return result
+
+    def print_stats(self, sort='cumulative', limit=30):
+        """
+        Print the merged statistics.
+
+        **Input:**
+
+        	sort (str): sort key of pstats.Stats.sort_stats, default: 'cumulative';
+
+        	limit (int): number of printed functions, default: 30.
+        """
+        stats = self.stats()
+        if stats is None:
+            print("No tasks were profiled.")
+            return
+        stats.sort_stats(sort).print_stats(limit)
+
+    def report(self, sort='cumulative', limit=30):
+        """
+        Merged statistics as text.
+
+        **Input:**
+
+        	sort (str): sort key of pstats.Stats.sort_stats, default: 'cumulative';
+
+        	limit (int): number of printed functions, default: 30.
+
+        **Output:**
+
+        	report (str).
+        """
+        stream = io.StringIO()
+        stats = self.stats()
+        if stats is not None:
+            stats.stream = stream
+            stats.sort_stats(sort).print_stats(limit)
+        return stream.getvalue()
+
+    def dump(self, filename):
+        """
+        Save the merged statistics in the format of pstats (can be opened by pstats, snakeviz, etc.).
+
+        **Input:**
+
+        	filename (str): name of output file.
+        """
+        stats = self.stats()
+        if stats is not None:
+            stats.dump_stats(filename)
+
+    def slowest(self, n=10):
+        """
+        The slowest profiled tasks.
+
+        **Input:**
+
+        	n (int): number of tasks, default: 10.
+
+        **Output:**
+
+        	list of tuples (task label, time in seconds).
+        """
+        return sorted(self.tasks, key=lambda x: x[1], reverse=True)[:n]
+
+    def _add(self, label, elapsed, stats):
+        self.tasks.append((label, elapsed))
+        self._count += 1
+        if self.top_n is None:
+            self._stats = _merge(self._stats, stats)
+        elif len(self._slowest) < self.top_n:
+            heapq.heappush(self._slowest, (elapsed, self._count, label, stats))
+        elif elapsed > self._slowest[0][0]:
+            heapq.heapreplace(self._slowest, (elapsed, self._count, label, stats))
+
+
+def is_enabled():
+    """
+    Check if tasks are profiled.
+    """
+    return _profiler is not None
+
+
+def _profiled_call(func, task, enabled):
+    # runs a task in a worker process, returns its result and raw profiling statistics
+    if not enabled:
+        return func(task), None
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # another profiler is active in a concurrent thread of the same process
+        return func(task), None
+    try:
+        result = func(task)
+    finally:
+        profiler.disable()
+    profiler.create_stats()
+    return result, profiler.stats
+
+
+def _add(func, task, elapsed, stats):
+    if _profiler is not None and stats is not None:
+        _profiler._add(_task_label(func, task), elapsed, stats)
+
+
+def _task_label(func, task):
+    name = getattr(func, '__name__', None) or getattr(getattr(func, 'func', None), '__name__', type(func).__name__)
+    if isinstance(task, tuple) and len(task) > 0 and not all(isinstance(elem, numbers.Integral) for elem in task):
+        task = task[0]
+    return name + str(task)
+
+
+class _RawStats:
+    # wrapper of raw statistics accepted by pstats.Stats
+    def __init__(self, stats):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+
+def _merge(result, stats):
+    if result is None:
+        return pstats.Stats(_RawStats(dict(stats)))
+    result.add(_RawStats(stats))
+    return result
@@ -0,0 +1,303 @@
+# -*- coding: utf-8 -*-
+"""
+Scheduling of subsample tasks over a worker pool: cost estimation, largest-first dispatch, memory-aware admission and progress report.
+"""
+import time
+from concurrent.futures import wait, FIRST_COMPLETED
+from functools import partial
+from . import tracing, profiling, memory
+
+# prior estimates (overhead in seconds, time per voxel in seconds) for the metric families
+_default_costs = {'Porosity': (0., 2e-9),
+                  'EulerDensityI': (0.5, 5e-8),
+                  'BasicCFMetric': (0.5, 2e-7),
+                  'BasicPDMetric': (0.5, 2e-6),
+                  'BasicPNMMetric': (0.01, 1e-9),
+                  'Permeability': (0., 5e-9),
+                  'PNMExtractor': (0.1, 1e-6)}
+_default_cost = (0.1, 1e-7)
+
+
+class CostModel:
+    """
+    Model of computational cost of subsample tasks. The cost of a task is estimated as a linear function of the number of voxels
+    in the subsample with coefficients depending on the metric. Prior coefficients are given for metric families and replaced
+    by the least squares fit of the timings observed in previous tasks.
+    """
+    def __init__(self, costs=None):
+        """
+        **Input:**
+
+        	costs (dict(str, (float, float))): prior estimates, in which a key is a name of metric class (or of its base class)
+        	and a value is a tuple of task overhead and time per voxel in seconds, default: None.
+        """
+        self.costs = dict(_default_costs)
+        if costs is not None:
+            self.costs.update(costs)
+        self._stats = {}
+
+    def estimate(self, metric, n_voxels):
+        """
+        Estimated cost of a task.
+
+        **Input:**
+
+        	metric (subclass of BasicMetric or str): metric computed in the task or the name of the task kind;
+
+        	n_voxels (int): number of voxels in the subsample.
+
+        **Output:**
+
+        	cost (float): estimated time of the task in seconds.
+        """
+        name = _cost_name(metric)
+        stats = self._stats.get(name)
+        if stats is not None:
+            n, sx, sy, sxx, sxy = stats
+            det = n*sxx - sx*sx
+            if n > 1 and det > 0:
+                slope = max((n*sxy - sx*sy)/det, 0.)
+                intercept = max((sy - slope*sx)/n, 0.)
+                return intercept + slope*n_voxels
+            return sy/sx*n_voxels
+        overhead, rate = self._prior(metric)
+        return overhead + rate*n_voxels
+
+    def update(self, metric, n_voxels, elapsed):
+        """
+        Refine the estimates with the observed time of a task.
+
+        **Input:**
+
+        	metric (subclass of BasicMetric or str): metric computed in the task or the name of the task kind;
+
+        	n_voxels (int): number of voxels in the subsample;
+
+        	elapsed (float): observed time of the task in seconds.
+        """
+        name = _cost_name(metric)
+        n, sx, sy, sxx, sxy = self._stats.get(name, (0, 0., 0., 0., 0.))
+        x = float(n_voxels)
+        self._stats[name] = (n + 1, sx + x, sy + elapsed, sxx + x*x, sxy + x*elapsed)
+
+    def _prior(self, metric):
+        if isinstance(metric, str):
+            return self.costs.get(metric, _default_cost)
+        for cls in type(metric).__mro__:
+            if cls.__name__ in self.costs:
+                return self.costs[cls.__name__]
+        return _default_cost
+
+
+class Progress:
+    """
+    Report of task completion with the estimation of remaining time.
+    """
+    def __init__(self, label, costs, show=True):
+        """
+        **Input:**
+
+        	label (str): name of the stage;
+
+        	costs (list(float)): estimated costs of all the tasks of the stage;
+
+        	show (bool): if True, the report is printed after each completed task, default: True.
+        """
+        self.label = label
+        self.n_tasks = len(costs)
+        self.total_cost = sum(costs)
+        self.show = show
+        self.n_done = 0
+        self.done_cost = 0.
+        self.start_time = time.time()
+        self.peaks = []
+
+    def update(self, cost, peak=None):
+        """
+        Register a completed task.
+
+        **Input:**
+
+        	cost (float): estimated cost of the task;
+
+        	peak (float): observed peak memory of the task in bytes, default: None.
+        """
+        self.n_done += 1
+        self.done_cost += cost
+        if peak is not None:
+            self.peaks.append(peak)
+        if self.show:
+            end = '\n' if self.n_done == self.n_tasks else ''
+            line = '\r' + self.label + ': ' + str(self.n_done) + '/' + str(self.n_tasks) + ' tasks, elapsed %.1f s, ETA %.1f s' % (self.elapsed(), self.eta())
+            if self.peaks:
+                line += ', peak task memory %.0f MB' % (self.peak_memory()/2**20)
+            print(line, end=end, flush=True)
+
+    def elapsed(self):
+        """
+        Time from the start of the stage in seconds.
+        """
+        return time.time() - self.start_time
+
+    def peak_memory(self):
+        """
+        Maximal observed peak memory of the completed tasks in bytes, or None if it was not measured.
+        """
+        return max(self.peaks) if self.peaks else None
+
+    def eta(self):
+        """
+        Estimated time to the end of the stage in seconds.
+        """
+        if self.n_done == self.n_tasks:
+            return 0.
+        if self.done_cost <= 0:
+            return float('nan')
+        return self.elapsed()*(self.total_cost - self.done_cost)/self.done_cost
+
+
+def run_tasks(pool, func, tasks, costs, n_workers, progress=None, memory_estimates=None):
+    """
+    Apply a function to the tasks in the worker pool, dispatching the most expensive tasks first. Tasks with the cost exceeding the
+    fair share of a worker are sent one by one, cheaper tasks are grouped into chunks of comparable cost. If a MemoryBudget is active
+    and memory estimates are given, tasks are sent one by one and only while their total estimated memory fits into the budget.
+
+    **Input:**
+
+    	pool (multiprocessing.pool.Pool or subclass of BasicExecutor): worker pool;
+
+    	func (function): function applied to each task;
+
+    	tasks (list): tasks;
+
+    	costs (list(float)): estimated costs of the tasks;
+
+    	n_workers (int): number of worker processes;
+
+    	progress (Progress): progress report updated after each completed task, default: None;
+
+    	memory_estimates (list(float)): estimated peak memory of the tasks in bytes, default: None.
+
+    **Output:**
+
+    	iterator over tuples (result of func, observed time of the task in seconds, observed peak memory of the task in bytes or None
+    	if it was not measured) in order of completion.
+    """
+    tasks = list(tasks)
+    run_chunk = partial(_run_chunk, func, tracing.is_enabled(), profiling.is_enabled())
+    budget = memory.get_budget()
+    if budget is not None and memory_estimates is not None and hasattr(pool, 'submit'):
+        completed = _run_admitted(pool, run_chunk, tasks, costs, n_workers, list(memory_estimates), budget.max_bytes)
+    else:
+        chunks = _chunks(costs, n_workers)
+        data = [[(i, tasks[i]) for i in chunk] for chunk in chunks]
+        completed = pool.imap_unordered(run_chunk, data, chunksize=1)
+    for results in completed:
+        for i, result, elapsed, spans, stats, peak in results:
+            tracing._add(spans)
+            profiling._add(func, tasks[i], elapsed, stats)
+            if progress is not None:
+                progress.update(costs[i], peak)
+            yield result, elapsed, peak
+
+
+def map_tasks(pool, func, tasks):
+    """
+    Version of pool.map collecting the spans and profiling statistics of tasks if tracing or profiling is enabled.
+
+    **Input:**
+
+    	pool (multiprocessing.pool.Pool or subclass of BasicExecutor): worker pool;
+
+    	func (function): function applied to each task;
+
+    	tasks (list): tasks.
+
+    **Output:**
+
+    	list of results of func in order of tasks.
+    """
+    trace = tracing.is_enabled()
+    profile = profiling.is_enabled()
+    if not (trace or profile):
+        return pool.map(func, tasks)
+    tasks = list(tasks)
+    results = []
+    for task, (i, result, elapsed, spans, stats, peak) in zip(tasks, pool.map(partial(_run_task, func, trace, profile), enumerate(tasks))):
+        tracing._add(spans)
+        profiling._add(func, task, elapsed, stats)
+        results.append(result)
+    return results
+
+
+def _cost_name(metric):
+    if isinstance(metric, str):
+        return metric
+    return metric.__class__.__name__
+
+
+def _chunks(costs, n_workers):
+    order = sorted(range(len(costs)), key=lambda i: costs[i], reverse=True)
+    threshold = sum(costs)/(4*max(n_workers, 1))
+    chunks = []
+    current = []
+    current_cost = 0.
+    for i in order:
+        if costs[i] >= threshold:
+            chunks.append([i])
+            continue
+        current.append(i)
+        current_cost += costs[i]
+        if current_cost >= threshold:
+            chunks.append(current)
+            current = []
+            current_cost = 0.
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _run_admitted(pool, run_chunk, tasks, costs, n_workers, estimates, max_bytes):
+    # tasks are started in order of decreasing cost, a task not fitting into the budget is passed over by smaller ones; estimates of
+    # the waiting tasks are scaled by the largest ratio of observed to estimated peak memory of the completed tasks
+    pending = sorted(range(len(tasks)), key=lambda i: costs[i], reverse=True)
+    running = {}
+    used = 0.
+    scale = None
+    while pending or running:
+        for i in list(pending):
+            if len(running) >= n_workers:
+                break
+            estimate = estimates[i]*(scale if scale is not None else 1.)
+            if running and used + estimate > max_bytes:
+                continue
+            pending.remove(i)
+            running[pool.submit(run_chunk, [(i, tasks[i])])] = (i, estimate)
+            used += estimate
+        done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+        for future in done:
+            i, estimate = running.pop(future)
+            used -= estimate
+            results = future.result()
+            peak = results[0][5]
+            if peak is not None and estimates[i] > 0:
+                scale = max(scale or 0., peak/estimates[i])
+            yield results
+
+
+def _run_chunk(func, trace, profile, chunk):
+    return [_run_task(func, trace, profile, elem) for elem in chunk]
+
+
+def _run_task(func, trace, profile, elem):
+    i, task = elem
+    start = time.time()
+    start_time = time.perf_counter()
+    ((result, stats), spans), peak = memory._measured_call(partial(tracing._traced_call, partial(profiling._profiled_call, func, enabled=profile), enabled=trace), task)
+    elapsed = time.perf_counter() - start_time
+    if trace:
+        spans.append(tracing._record('task', start, elapsed, peak_rss=peak))
+    return i, result, elapsed, spans, stats, peak
+
+
+_default_cost_model = CostModel()
@@ -0,0 +1,376 @@
+# -*- coding: utf-8 -*-
+"""
+Local REV analysis service. Jobs (image, metric specification, number of steps and thresholds) are accepted over HTTP, queued and
+run by REVAnalyzer in the long-running process, so the executor, its worker processes and the imported libraries stay warm between
+jobs. Identical jobs in progress are deduplicated and the results of completed jobs are served from the result cache.
+
+    python -m revanalyzer.service --port 8765 --outputdir rev_service --workers 8
+
+Job specification (JSON):
+
+    {"image": "/data/sample.raw", "size": [300, 300, 300], "n_steps": 6, "sREV_max_step": 4,
+     "metric": {"name": "PoreRadius", "params": {"resolution": 1.0}, "vectorizer": {"name": "HistVectorizer", "params": {}}},
+     "dREV_threshold": 0.2, "sREV_threshold": 0.2, "stationarity_threshold": 0.2}
+
+API: POST /jobs submits a job, GET /jobs/<id>?wait=<seconds> returns its status and result, GET /jobs lists the jobs,
+GET /health returns the state of the service.
+"""
+import argparse
+import hashlib
+import json
+import os
+import queue
+import threading
+import numpy as np
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+from .REV_analyzer import REVAnalyzer
+from . import metrics, vectorizers
+from .executors import make_executor
+from .stores import ContentCache
+
+_result_attrs = ['dREV_size_1', 'dREV_size_2', 'sREV_size_1', 'sREV_size_2']
+
+
+class REVService:
+    """
+    Queue of REV analysis jobs run in the calling process.
+    """
+    def __init__(self, outputdir='rev_service', executor='process', n_workers=None, max_jobs=1, max_queued=100, content_cache=True):
+        """
+        **Input:**
+
+        	outputdir (str): folder of generated data and of the result cache, default: 'rev_service';
+
+        	executor (str or subclass of BasicExecutor): executor shared by all the jobs, see REVAnalyzer, default: 'process';
+
+        	n_workers (int): number of workers of the executor. If None, the number of CPUs is used, default: None;
+
+        	max_jobs (int): number of jobs run concurrently. All of them share the workers of the executor, default: 1;
+
+        	max_queued (int): maximal number of jobs waiting in the queue. Jobs submitted to the full queue are rejected, default: 100;
+
+        	content_cache (bool or ContentCache): cache of metric values of subsamples shared by the jobs. If True, the cache is
+        	kept in outputdir, default: True.
+        """
+        self.outputdir = os.path.abspath(outputdir)
+        self.executor = executor
+        self.n_workers = n_workers if n_workers is not None else os.cpu_count()
+        self.max_jobs = max_jobs
+        self.max_queued = max_queued
+        if content_cache is True:
+            content_cache = ContentCache(os.path.join(self.outputdir, 'content_cache'))
+        self.content_cache = content_cache or None
+        self._resultsdir = os.path.join(self.outputdir, 'results')
+        os.makedirs(self._resultsdir, exist_ok=True)
+        self._jobs = {}
+        self._data_locks = {}
+        self._lock = threading.Lock()
+        self._queue = queue.Queue(max_queued)
+        self._pool = None
+        self._threads = []
+        self._server = None
+
+    def start(self):
+        """
+        Create the executor and start the threads running the jobs. Called by serve() and by the first submit().
+        """
+        if self._pool is None:
+            self._pool = make_executor(self.executor, self.n_workers)
+        while len(self._threads) < self.max_jobs:
+            thread = threading.Thread(target=self._run_jobs, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, spec):
+        """
+        Submit a job. A job identical to a job in progress is not queued again, a job identical to a completed one is answered from
+        the result cache.
+
+        **Input:**
+
+        	spec (dict): job specification, see the module description.
+
+        **Output:**
+
+        	dict with the job id, status ('queued', 'running', 'done' or 'failed') and, for completed jobs, the result.
+        """
+        spec = _normalize(spec)
+        job_id = _job_id(spec)
+        self.start()
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None and job.status != 'failed':
+                return job.info()
+            result = self._cached_result(job_id)
+            job = _Job(job_id, spec)
+            if result is not None:
+                job.finish('done', result=result)
+            else:
+                try:
+                    self._queue.put_nowait(job)
+                except queue.Full:
+                    raise RuntimeError("Job queue is full.")
+            self._jobs[job_id] = job
+            return job.info()
+
+    def status(self, job_id, wait=None):
+        """
+        Status of a job.
+
+        **Input:**
+
+        	job_id (str): job id returned by submit();
+
+        	wait (float): maximal time in seconds to wait for completion of the job. If None, the status is returned at once, default: None.
+
+        **Output:**
+
+        	dict with the job id, status and, for completed jobs, the result or the error message.
+        """
+        job = self._jobs.get(job_id)
+        if job is None:
+            result = self._cached_result(job_id)
+            if result is None:
+                raise KeyError(job_id)
+            return {'id': job_id, 'status': 'done', 'result': result}
+        if wait is not None:
+            job.done.wait(wait)
+        return job.info()
+
+    def jobs(self):
+        """
+        Status of all the jobs submitted since the start of the service, without results.
+        """
+        return [{'id': job.id, 'status': job.status} for job in list(self._jobs.values())]
+
+    def health(self):
+        """
+        State of the service: numbers of queued and running jobs and of the workers.
+        """
+        statuses = [job.status for job in list(self._jobs.values())]
+        return {'queued': statuses.count('queued'), 'running': statuses.count('running'), 'max_jobs': self.max_jobs,
+                'workers': self._pool.n_workers if self._pool is not None else self.n_workers}
+
+    def serve(self, host='127.0.0.1', port=8765):
+        """
+        Start the service and serve the HTTP API until shutdown() is called.
+
+        **Input:**
+
+        	host (str): host name or address to listen on, default: '127.0.0.1';
+
+        	port (int): port to listen on, default: 8765.
+        """
+        self.start()
+        self._server = ThreadingHTTPServer((host, port), _Handler)
+        self._server.service = self
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+
+    def shutdown(self):
+        """
+        Stop serving HTTP requests, wait for the running jobs and shut down the executor.
+        """
+        if self._server is not None:
+            self._server.shutdown()
+        for thread in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        if self._pool is not None and self._pool is not self.executor:
+            self._pool.close()
+            self._pool.join()
+        self._pool = None
+
+    def _run_jobs(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            job.status = 'running'
+            try:
+                result = self._run_job(job.spec)
+            except Exception as e:
+                job.finish('failed', error=repr(e))
+                continue
+            with open(os.path.join(self._resultsdir, job.id + '.json'), 'w') as f:
+                json.dump(result, f, indent=4)
+            job.finish('done', result=result)
+
+    def _run_job(self, spec):
+        metric = _make_metric(spec['metric'])
+        datadir, image = os.path.split(spec['image'])
+        # jobs differing in thresholds only share the generated data, so they are run one by one
+        outputdir = os.path.join(self.outputdir, 'data', _data_key(spec))
+        with self._lock:
+            lock = self._data_locks.setdefault(outputdir, threading.Lock())
+        with lock, REVAnalyzer(metric, image, tuple(spec['size']), spec['n_steps'], spec['sREV_max_step'], datadir=datadir,
+                               outputdir=outputdir, executor=self._pool, content_cache=self.content_cache) as analyzer:
+            analyzer.generate()
+            if metric.metric_type == 'v':
+                analyzer.vectorize()
+            analyzer.analyze(spec['dREV_threshold'], spec['sREV_threshold'])
+            result = {attr: _to_json(getattr(analyzer, attr)) for attr in _result_attrs}
+            result['sizes'] = _to_json(analyzer.geom_mean_cut_sizes)
+            if spec.get('stationarity_threshold') is not None and metric.metric_type == 'v':
+                result['is_stationary'] = bool(analyzer.analyze_stationarity(spec['stationarity_threshold']))
+        return result
+
+    def _cached_result(self, job_id):
+        path = os.path.join(self._resultsdir, job_id + '.json')
+        if not os.path.isfile(path):
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+
+class _Job:
+    def __init__(self, job_id, spec):
+        self.id = job_id
+        self.spec = spec
+        self.status = 'queued'
+        self.result = None
+        self.error = None
+        self.done = threading.Event()
+
+    def finish(self, status, result=None, error=None):
+        self.result = result
+        self.error = error
+        self.status = status
+        self.done.set()
+
+    def info(self):
+        info = {'id': self.id, 'status': self.status}
+        if self.result is not None:
+            info['result'] = self.result
+        if self.error is not None:
+            info['error'] = self.error
+        return info
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        url = urlparse(self.path)
+        parts = [part for part in url.path.split('/') if part]
+        service = self.server.service
+        if parts == ['health']:
+            return self._reply(200, service.health())
+        if parts == ['jobs']:
+            return self._reply(200, service.jobs())
+        if len(parts) == 2 and parts[0] == 'jobs':
+            wait = parse_qs(url.query).get('wait')
+            try:
+                return self._reply(200, service.status(parts[1], float(wait[0]) if wait else None))
+            except KeyError:
+                return self._reply(404, {'error': 'unknown job'})
+        self._reply(404, {'error': 'unknown path'})
+
+    def do_POST(self):
+        if urlparse(self.path).path.rstrip('/') != '/jobs':
+            return self._reply(404, {'error': 'unknown path'})
+        try:
+            spec = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+            info = self.server.service.submit(spec)
+        except RuntimeError as e:
+            return self._reply(503, {'error': str(e)})
+        except (ValueError, TypeError, KeyError) as e:
+            return self._reply(400, {'error': str(e)})
+        self._reply(200 if info['status'] == 'done' else 202, info)
+
+    def _reply(self, code, body):
+        data = json.dumps(body).encode()
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _normalize(spec):
+    # checks the specification and replaces the image path by the absolute one
+    for key in ['image', 'size', 'n_steps', 'sREV_max_step', 'metric', 'dREV_threshold', 'sREV_threshold']:
+        if key not in spec:
+            raise KeyError("Job specification should contain '" + key + "'.")
+    spec = dict(spec)
+    spec['image'] = os.path.abspath(os.path.join(spec.get('datadir') or '', spec['image']))
+    spec.pop('datadir', None)
+    if not os.path.isfile(spec['image']):
+        raise ValueError("Image file " + spec['image'] + " does not exist.")
+    _make_metric(spec['metric'])
+    return spec
+
+
+def _make_metric(spec):
+    metric_class = getattr(metrics, spec['name'], None)
+    if metric_class is None or not isinstance(metric_class, type) or not issubclass(metric_class, metrics.BasicMetric):
+        raise ValueError("Unknown metric " + str(spec['name']) + ".")
+    params = dict(spec.get('params', {}))
+    if spec.get('vectorizer') is not None:
+        vectorizer_class = getattr(vectorizers, spec['vectorizer']['name'], None)
+        if vectorizer_class is None or not isinstance(vectorizer_class, type) or not issubclass(vectorizer_class, vectorizers.BasicVectorizer):
+            raise ValueError("Unknown vectorizer " + str(spec['vectorizer']['name']) + ".")
+        params['vectorizer'] = vectorizer_class(**spec['vectorizer'].get('params', {}))
+    return metric_class(**params)
+
+
+def _image_id(path):
+    st = os.stat(path)
+    return [path, st.st_size, st.st_mtime_ns]
+
+
+def _data_key(spec):
+    data = {key: spec[key] for key in ['image', 'size', 'n_steps', 'sREV_max_step', 'metric']}
+    data['image'] = _image_id(spec['image'])
+    return _hash(data)
+
+
+def _job_id(spec):
+    data = dict(spec)
+    data['image'] = _image_id(spec['image'])
+    return _hash(data)
+
+
+def _hash(data):
+    return hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()[:32]
+
+
+def _to_json(value):
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, (list, tuple)):
+        return [_to_json(elem) for elem in value]
+    if isinstance(value, dict):
+        return {str(key): _to_json(elem) for key, elem in value.items()}
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def _main(argv=None):
+    parser = argparse.ArgumentParser(description='Local REV analysis service.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--outputdir', default='rev_service')
+    parser.add_argument('--executor', default='process')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--jobs', type=int, default=1, help='number of jobs run concurrently')
+    parser.add_argument('--max-queued', type=int, default=100)
+    args = parser.parse_args(argv)
+    service = REVService(args.outputdir, args.executor, args.workers, args.jobs, args.max_queued)
+    try:
+        service.serve(args.host, args.port)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.shutdown()
+
+
+if __name__ == '__main__':
+    _main()
@@ -0,0 +1,9 @@
+# -*- coding: utf-8 -*-
+"""Result stores keeping metric values of all subsamples in one binary container."""
+
+from .basic_store import BasicStore, _find_store, _remove_stores
+from .npz_store import NPZStore
+from .hdf5_store import HDF5Store
+from .value_cache import ValueCache
+from .manifest import Manifest, _files_checksum, _files_stamp, _output_checksum
+from .content_cache import ContentCache
@@ -0,0 +1,218 @@
+# -*- coding: utf-8 -*-
+"""Definition of basic result store"""
+
+import numpy as np
+import os
+import glob
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from ..tracing import span
+
+_store_classes = []
+# decoded containers of the process, the least recently used ones are dropped above the limit of their total size in bytes
+_opened = OrderedDict()
+_opened_nbytes = 0
+_opened_max_bytes = 2**28
+_opened_lock = threading.Lock()
+
+
+class BasicStore(ABC):
+    """
+    Base class for result stores. (Don't use it directly but derive from it).
+    
+    Metrics generate one text file per subsample. A store moves these files of an output folder into one container file as soon as
+    the subsample is completed, and the container is then used by BasicMetric.read instead of the text files.
+    """
+    filename = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if cls.filename is not None:
+            _store_classes.append(cls)
+
+    def __init__(self, dtype='float64'):
+        """
+        **Input:**
+        
+        	dtype (str): 'float32' or 'float64', data type used to keep metric values, default: 'float64'.
+        """
+        if not (dtype == 'float32' or dtype == 'float64'):
+            raise ValueError("Data type should be 'float32' or 'float64'.")
+        self.dtype = dtype
+
+    def path(self, outputdir):
+        """
+        Path to the container file in a given folder.
+        
+        **Input:**
+        
+        	outputdir (str): folder with generated metric data.
+        """
+        if outputdir is None:
+            outputdir = '.'
+        return os.path.join(outputdir, self.filename)
+
+    def read_all(self, inputdir):
+        """
+        Read all the values kept in the container.
+        
+        **Input:**
+        
+        	inputdir (str): folder with generated metric data.
+        
+        **Output:**
+        
+        	dict(str, np.array): values, the key is the name of subsample file without extension, e.g. 'cut2_5' or 'cut2_5_x'.
+        """
+        path = self.path(inputdir)
+        if not os.path.isfile(path):
+            return {}
+        st = os.stat(path)
+        version = (st.st_mtime_ns, st.st_ino)
+        values = _get_opened(path, version)
+        if values is None:
+            values = self._load(path)
+            _put_opened(path, version, values)
+        return values
+
+    def get(self, inputdir, name):
+        """
+        Read the values of one subsample.
+        
+        **Input:**
+        
+        	inputdir (str): folder with generated metric data;
+        	
+        	name (str): name of subsample file without extension.
+        """
+        values = self.read_all(inputdir)
+        if name not in values:
+            raise KeyError("No data for " + name + " in " + self.path(inputdir))
+        return values[name]
+
+    def write(self, outputdir, values):
+        """
+        Add values to the container. The container is replaced atomically.
+        
+        **Input:**
+        
+        	outputdir (str): folder with generated metric data;
+        	
+        	values (dict(str, np.array)): values to be added.
+        """
+        data = dict(self.read_all(outputdir))
+        for key, value in values.items():
+            data[key] = np.asarray(value, dtype=self.dtype)
+        self._replace(outputdir, data)
+
+    def remove(self, outputdir, names):
+        """
+        Remove the values of subsamples from the container. The container is replaced atomically.
+        
+        **Input:**
+        
+        	outputdir (str): folder with generated metric data;
+        	
+        	names (list of str): names of subsamples, e.g. 'cut2_5', their directional values are removed too.
+        """
+        data = self.read_all(outputdir)
+        names = set(names)
+        kept = {key: value for key, value in data.items() if not (key in names or key[:-2] in names)}
+        if len(kept) < len(data):
+            self._replace(outputdir, kept)
+
+    def _replace(self, outputdir, data):
+        path = self.path(outputdir)
+        tmp_path = os.path.join(os.path.dirname(path), '.' + self.filename + '.' + str(os.getpid()) + '.tmp')
+        try:
+            with span('write', path=path, n_values=len(data)):
+                self._save(tmp_path, data)
+                os.replace(tmp_path, path)
+        finally:
+            if os.path.isfile(tmp_path):
+                os.remove(tmp_path)
+        _forget_opened(path)
+
+    def pack(self, outputdir, cut_name=None):
+        """
+        Move the values from the text files of subsamples into the container.
+        
+        **Input:**
+        
+        	outputdir (str): folder with generated metric data;
+        	
+        	cut_name (str): name of subsample, e.g. 'cut2_5', whose files are moved with its directional values. If None, the files 
+        	of all the subsamples are moved, default: None.
+        """
+        if outputdir is None:
+            outputdir = '.'
+        if cut_name is None:
+            filenames = glob.glob(os.path.join(outputdir, 'cut*.txt'))
+        else:
+            filenames = glob.glob(os.path.join(outputdir, cut_name + '.txt')) + glob.glob(os.path.join(outputdir, cut_name + '_?.txt'))
+        if not filenames:
+            return
+        values = {}
+        for filename in filenames:
+            name = os.path.splitext(os.path.basename(filename))[0]
+            values[name] = np.loadtxt(filename, delimiter=" ", dtype=float, ndmin=0)
+        self.write(outputdir, values)
+        for filename in filenames:
+            os.remove(filename)
+
+    @abstractmethod
+    def _load(self, path):
+        pass
+
+    @abstractmethod
+    def _save(self, path, values):
+        pass
+
+
+def _get_opened(path, version):
+    with _opened_lock:
+        if path in _opened and _opened[path][0] == version:
+            _opened.move_to_end(path)
+            return _opened[path][1]
+    return None
+
+
+def _put_opened(path, version, values):
+    global _opened_nbytes
+    nbytes = sum(np.asarray(value).nbytes for value in values.values())
+    with _opened_lock:
+        if path in _opened:
+            _opened_nbytes -= _opened.pop(path)[2]
+        if nbytes > _opened_max_bytes:
+            return
+        _opened[path] = (version, values, nbytes)
+        _opened_nbytes += nbytes
+        while _opened_nbytes > _opened_max_bytes:
+            _opened_nbytes -= _opened.popitem(last=False)[1][2]
+
+
+def _forget_opened(path):
+    global _opened_nbytes
+    with _opened_lock:
+        if path in _opened:
+            _opened_nbytes -= _opened.pop(path)[2]
+
+
+def _remove_stores(outputdir, keep=None):
+    # removes the containers in a folder except the one of a given store
+    for cls in _store_classes:
+        if keep is not None and cls.filename == keep.filename:
+            continue
+        path = cls().path(outputdir)
+        if os.path.isfile(path):
+            os.remove(path)
+        _forget_opened(path)
+
+
+def _find_store(inputdir):
+    for cls in _store_classes:
+        store = cls()
+        if os.path.isfile(store.path(inputdir)):
+            return store
+    return None
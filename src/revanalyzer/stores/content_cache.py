@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""Definition of content-addressed cache of subsample metric values shared between runs."""
+
+import numpy as np
+import os
+import json
+import hashlib
+import glob
+
+
+class ContentCache:
+    """
+    Cross-run cache of metric values of subsamples. A cache entry is addressed by the hash of image content, the absolute bounds of 
+    subsample in the image and the metric parameters, so the values are reused for identical images with different names and for 
+    subsamples which geometry is not changed when the number of steps is changed. The total size of cache folder is bounded; 
+    least recently used entries are evicted first. The size of folder is tracked in memory and the folder is scanned only when the limit 
+    is exceeded or after a number of writes, which accounts for the entries written by other processes.
+    """
+    # number of writes after which the folder is scanned
+    _scan_interval = 64
+    # fraction of the size limit kept after eviction
+    _low_watermark = 0.9
+
+    def __init__(self, cachedir, max_bytes=2**30):
+        """
+        **Input:**
+        
+        	cachedir (str): path to the cache folder;
+        	
+        	max_bytes (int): maximal total size of cache files in bytes, default: 2**30.
+        """
+        self.cachedir = cachedir
+        self.max_bytes = max_bytes
+        os.makedirs(cachedir, exist_ok=True)
+        self._nbytes = None
+        self._n_puts = 0
+
+    def key(self, image_hash, bounds, params):
+        """
+        Address of cache entry.
+        
+        **Input:**
+        
+        	image_hash (str): hash of image content;
+        	
+        	bounds (tuple): absolute bounds of subsample ((x0, x1), (y0, y1), (z0, z1));
+        	
+        	params (dict): metric parameters.
+        
+        **Output:**
+        
+        	key (str).
+        """
+        data = json.dumps([image_hash, [list(b) for b in bounds], params], sort_keys=True)
+        return hashlib.blake2b(data.encode(), digest_size=20).hexdigest()
+
+    def get(self, key):
+        """
+        Get the cached values.
+        
+        **Input:**
+        
+        	key (str): address of cache entry.
+        
+        **Output:**
+        
+        	dict(str, np.array) or None if the entry is not found.
+        """
+        path = self._path(key)
+        try:
+            with np.load(path) as f:
+                values = {name: f[name] for name in f.files}
+        except (OSError, ValueError):
+            return None
+        os.utime(path)
+        return values
+
+    def put(self, key, values):
+        """
+        Put the values to the cache and evict old entries if the size limit is exceeded.
+        
+        **Input:**
+        
+        	key (str): address of cache entry;
+        	
+        	values (dict(str, np.array)): values to be cached.
+        """
+        path = self._path(key)
+        tmp_path = path + '.' + str(os.getpid()) + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, **values)
+        try:
+            old_size = os.stat(path).st_size
+        except FileNotFoundError:
+            old_size = 0
+        os.replace(tmp_path, path)
+        self._n_puts += 1
+        if self._nbytes is not None:
+            self._nbytes += os.stat(path).st_size - old_size
+        if self._nbytes is None or self._nbytes > self.max_bytes or self._n_puts >= self._scan_interval:
+            self._evict()
+
+    def clear(self):
+        """
+        Remove all cache entries.
+        """
+        for path in glob.glob(os.path.join(self.cachedir, '*.npz')):
+            os.remove(path)
+        self._nbytes = 0
+
+    def _path(self, key):
+        return os.path.join(self.cachedir, key + '.npz')
+
+    def _evict(self):
+        entries = []
+        for path in glob.glob(os.path.join(self.cachedir, '*.npz')):
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+        total = sum(entry[1] for entry in entries)
+        entries.sort()
+        if total <= self.max_bytes:
+            target = total
+        else:
+            # entries are evicted below the limit, so the following writes do not scan the folder again at once
+            target = self._low_watermark*self.max_bytes
+        for mtime, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+        self._nbytes = total
+        self._n_puts = 0
@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+"""Definition of HDF5 result store. Requires h5py package."""
+
+from .basic_store import BasicStore
+
+
+class HDF5Store(BasicStore):
+    """
+    Class describing result store based on HDF5 file.
+    """
+    filename = 'values.h5'
+
+    def __init__(self, dtype='float64'):
+        """
+        **Input:**
+        
+        	dtype (str): 'float32' or 'float64', data type used to keep metric values, default: 'float64'.
+        """
+        super().__init__(dtype)
+
+    def _load(self, path):
+        import h5py
+        with h5py.File(path, 'r') as f:
+            return {key: f[key][()] for key in f.keys()}
+
+    def _save(self, path, values):
+        import h5py
+        with h5py.File(path, 'w') as f:
+            for key, value in values.items():
+                f.create_dataset(key, data=value)
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""Definition of generation manifest, used to resume interrupted data generation."""
+
+import json
+import os
+import hashlib
+import glob
+from .basic_store import _find_store
+
+
+class Manifest:
+    """
+    Record of completed subsamples. Each entry keeps the parameters used to generate the data of a subsample and the checksum of 
+    the generated output. An entry is valid only if both of them are unchanged.
+    """
+    def __init__(self, path):
+        """
+        **Input:**
+        
+        	path (str): path to the manifest file.
+        """
+        self.path = path
+        self.entries = {}
+        if os.path.isfile(path):
+            try:
+                with open(path) as f:
+                    self.entries = json.load(f)
+            except (ValueError, OSError):
+                self.entries = {}
+
+    def is_done(self, name, params, checksum):
+        """
+        Check if a subsample is generated with given parameters and its output is not changed.
+        
+        **Input:**
+        
+        	name (str): name of subsample;
+        	
+        	params (dict): generation parameters;
+        	
+        	checksum (str or None): checksum of the current output, None if the output is missing.
+        """
+        entry = self.entries.get(name)
+        if entry is None or checksum is None:
+            return False
+        return entry['params'] == _normalize(params) and entry['checksum'] == checksum
+
+    def record(self, name, params, checksum):
+        """
+        Record a completed subsample and save the manifest.
+        
+        **Input:**
+        
+        	name (str): name of subsample;
+        	
+        	params (dict): generation parameters;
+        	
+        	checksum (str): checksum of the output.
+        """
+        self.entries[name] = {'params': _normalize(params), 'checksum': checksum}
+        self.save()
+
+    def discard(self, name):
+        """
+        Remove the entry of a subsample.
+        
+        **Input:**
+        
+        	name (str): name of subsample.
+        """
+        self.entries.pop(name, None)
+
+    def save(self):
+        """
+        Save the manifest. The file is replaced atomically.
+        """
+        tmp_path = self.path + '.' + str(os.getpid()) + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.entries, f, indent=1)
+        os.replace(tmp_path, self.path)
+
+
+def _normalize(params):
+    return json.loads(json.dumps(params))
+
+
+def _files_checksum(paths):
+    paths = sorted(paths)
+    if len(paths) == 0 or not all(os.path.isfile(path) for path in paths):
+        return None
+    h = hashlib.blake2b(digest_size=16)
+    for path in paths:
+        h.update(os.path.basename(path).encode())
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(2**24), b''):
+                h.update(chunk)
+    return h.hexdigest()
+
+
+def _files_stamp(paths):
+    # sizes and modification times of files, used instead of the checksum for large outputs of external solvers
+    if len(paths) == 0 or not all(os.path.isfile(path) for path in paths):
+        return None
+    stamps = []
+    for path in sorted(paths):
+        st = os.stat(path)
+        stamps.append(os.path.basename(path) + ':' + str(st.st_size) + ':' + str(st.st_mtime_ns))
+    return ';'.join(stamps)
+
+
+def _output_checksum(outputdirs, cut_name):
+    h = hashlib.blake2b(digest_size=16)
+    found = False
+    for outputdir in outputdirs:
+        paths = glob.glob(os.path.join(outputdir, cut_name + '.txt')) + glob.glob(os.path.join(outputdir, cut_name + '_?.txt'))
+        if len(paths) > 0:
+            h.update(_files_checksum(paths).encode())
+            found = True
+            continue
+        store = _find_store(outputdir)
+        if store is None:
+            continue
+        values = store.read_all(outputdir)
+        for name in sorted(values.keys()):
+            if name == cut_name or name.startswith(cut_name + '_'):
+                h.update(name.encode())
+                h.update(values[name].tobytes())
+                found = True
+    if not found:
+        return None
+    return h.hexdigest()
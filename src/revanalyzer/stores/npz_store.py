@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+"""Definition of NPZ result store"""
+
+import numpy as np
+from .basic_store import BasicStore
+
+
+class NPZStore(BasicStore):
+    """
+    Class describing result store based on numpy .npz file.
+    """
+    filename = 'values.npz'
+
+    def __init__(self, dtype='float64', compressed=False):
+        """
+        **Input:**
+        
+        	dtype (str): 'float32' or 'float64', data type used to keep metric values, default: 'float64';
+        	
+        	compressed (bool): if True, the container is compressed, default: False.
+        """
+        super().__init__(dtype)
+        self.compressed = compressed
+
+    def _load(self, path):
+        with np.load(path) as f:
+            return {key: f[key] for key in f.files}
+
+    def _save(self, path, values):
+        with open(path, 'wb') as f:
+            if self.compressed:
+                np.savez_compressed(f, **values)
+            else:
+                np.savez(f, **values)
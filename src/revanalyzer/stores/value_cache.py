@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""Definition of in-process cache of metric values."""
+
+import numpy as np
+import threading
+from collections import OrderedDict
+
+
+class ValueCache:
+    """
+    Bounded LRU cache of decoded metric values. The size of the cache is measured in bytes of the kept arrays.
+    """
+    def __init__(self, max_bytes=2**28):
+        """
+        **Input:**
+        
+        	max_bytes (int): maximal total size of cached values in bytes, default: 2**28. If 0, values are not cached.
+        """
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.generation = 0
+        self._values = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Get the cached value.
+        
+        **Input:**
+        
+        	key (tuple): (metric name, step, cut_id, output folder).
+        
+        **Output:**
+        
+        	(bool, value) - a tuple, in which the first element shows if the key is found and the second one is the value or None.
+        """
+        with self._lock:
+            if key in self._values:
+                self._values.move_to_end(key)
+                self.hits += 1
+                return True, self._values[key][0]
+            self.misses += 1
+            return False, None
+
+    def put(self, key, value):
+        """
+        Put the value to the cache, evicting the least recently used values if needed.
+        
+        **Input:**
+        
+        	key (tuple): (metric name, step, cut_id, output folder);
+        	
+        	value (float, np.array or list(np.array)): metric value.
+        """
+        size = _nbytes(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._values:
+                self.nbytes -= self._values.pop(key)[1]
+            self._values[key] = (value, size)
+            self.nbytes += size
+            while self.nbytes > self.max_bytes:
+                self.nbytes -= self._values.popitem(last=False)[1][1]
+
+    def invalidate(self, outputdir=None):
+        """
+        Remove cached values.
+        
+        **Input:**
+        
+        	outputdir (str): if not None, only values read from this folder are removed, default: None.
+        """
+        with self._lock:
+            self.generation += 1
+            for key in list(self._values.keys()):
+                if outputdir is None or key[3] == outputdir:
+                    self.nbytes -= self._values.pop(key)[1]
+
+    def info(self):
+        """
+        Cache statistics.
+        
+        **Output:**
+        
+        	dict with numbers of hits and misses, number of cached values and their total size in bytes.
+        """
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'values': len(self._values),
+                    'nbytes': self.nbytes, 'max_bytes': self.max_bytes}
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_values'] = OrderedDict()
+        state['nbytes'] = 0
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+
+def _nbytes(value):
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (list, tuple)):
+        return sum(_nbytes(elem) for elem in value)
+    return np.asarray(value).nbytes
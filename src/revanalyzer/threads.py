@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+"""
+Thread budget of nested parallelism. The cores of the host are split between the workers of an executor (outer parallelism) and the
+threads of the libraries used by each task (inner parallelism): BLAS and OpenMP threads of numpy and other compiled libraries,
+threads of Julia subprocesses and of FDMSS, so that n workers with m inner threads each do not use more than the available cores.
+Worker processes can be pinned to disjoint CPU sets.
+"""
+import os
+import threading
+from contextlib import contextmanager
+
+_thread_vars = ['OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS', 'BLIS_NUM_THREADS', 'VECLIB_MAXIMUM_THREADS',
+                'NUMEXPR_NUM_THREADS', 'NUMBA_NUM_THREADS', 'JULIA_NUM_THREADS']
+_budget = None
+_worker_threads = None
+_worker_process = False
+_local = threading.local()
+
+
+class ThreadBudget:
+    """
+    Split of the cores between workers and inner threads. Executors created while the budget is active size the inner threads
+    of their workers by it.
+    """
+    def __init__(self, n_cores=None, pin=False):
+        """
+        **Input:**
+
+        	n_cores (int): number of cores used by the analysis. If None, all the cores available to the process are used, default: None;
+
+        	pin (bool): if True, worker processes are pinned to disjoint sets of cores (Linux only), default: False.
+        """
+        if hasattr(os, 'sched_getaffinity'):
+            cpus = sorted(os.sched_getaffinity(0))
+        else:
+            cpus = list(range(os.cpu_count()))
+        self.cpus = cpus if n_cores is None else cpus[:n_cores]
+        self.n_cores = n_cores if n_cores is not None else len(self.cpus)
+        self.pin = pin and hasattr(os, 'sched_setaffinity')
+        self._previous = None
+
+    def inner_threads(self, n_workers):
+        """
+        Number of library threads of each task when n_workers tasks run at once.
+
+        **Input:**
+
+        	n_workers (int): number of workers.
+
+        **Output:**
+
+        	number of threads (int, >= 1).
+        """
+        return max(1, self.n_cores // max(n_workers, 1))
+
+    def cpu_sets(self, n_workers):
+        """
+        Disjoint sets of cores of the workers. If there are more workers than available cores, the sets are reused.
+
+        **Input:**
+
+        	n_workers (int): number of workers.
+
+        **Output:**
+
+        	list of n_workers lists of CPU ids.
+        """
+        n = min(self.inner_threads(n_workers), len(self.cpus))
+        return [sorted(set(self.cpus[(i*n + j) % len(self.cpus)] for j in range(n))) for i in range(n_workers)]
+
+    def start(self):
+        """
+        Activate the budget.
+        """
+        global _budget
+        self._previous = _budget
+        _budget = self
+
+    def stop(self):
+        """
+        Deactivate the budget.
+        """
+        global _budget
+        _budget = self._previous
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+
+def get_budget():
+    """
+    Active thread budget. If no budget is activated, the budget of all the available cores is returned.
+    """
+    global _budget
+    if _budget is None:
+        _budget = ThreadBudget()
+    return _budget
+
+
+@contextmanager
+def _thread_limit(n_threads):
+    # limit of the threads of external programs started by the calling thread
+    previous = getattr(_local, 'n_threads', None)
+    _local.n_threads = n_threads
+    try:
+        yield
+    finally:
+        _local.n_threads = previous
+
+
+def current_threads():
+    """
+    Limit of library threads in the calling thread, or None if the threads are not limited.
+    """
+    n_threads = getattr(_local, 'n_threads', None)
+    return n_threads if n_threads is not None else _worker_threads
+
+
+def _subprocess_env():
+    # environment of external programs, None means the environment of the process
+    n_threads = current_threads()
+    if n_threads is None:
+        return None
+    env = dict(os.environ)
+    for var in _thread_vars:
+        env[var] = str(n_threads)
+    return env
+
+
+def _init_worker(n_threads, cpus=None):
+    # called at start of a worker process, before the modules of tasks are imported
+    global _worker_threads, _worker_process
+    _worker_threads = n_threads
+    _worker_process = True
+    for var in _thread_vars:
+        os.environ[var] = str(n_threads)
+    if cpus:
+        os.sched_setaffinity(0, cpus)
+    try:
+        from threadpoolctl import threadpool_limits
+    except ImportError:
+        return
+    # libraries loaded before the start of worker (forked workers) do not read the environment again
+    threadpool_limits(n_threads)
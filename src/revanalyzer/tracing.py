@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+"""
+Tracing of the pipeline stages: spans of image load, cut extraction, metric computation, subprocess runs, file writes,
+vectorization and analysis, recorded both in the main process and in the worker processes.
+"""
+import time
+import os
+import json
+import multiprocessing
+import threading
+from contextlib import contextmanager
+
+_tracer = None
+_enabled = False
+_task = threading.local()
+
+
+class Tracer:
+    """
+    Collector of spans. Spans are recorded while the tracer is active, spans of the worker processes are returned
+    to the main process together with the results of tasks.
+    """
+    def __init__(self):
+        self.spans = []
+        self._previous = None
+
+    def start(self):
+        """
+        Activate the tracer.
+        """
+        global _tracer, _enabled
+        self._previous = (_tracer, _enabled)
+        _tracer = self
+        _enabled = True
+
+    def stop(self):
+        """
+        Deactivate the tracer.
+        """
+        global _tracer, _enabled
+        if self._previous is not None:
+            _tracer, _enabled = self._previous
+            self._previous = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def clear(self):
+        """
+        Remove all the recorded spans.
+        """
+        self.spans = []
+
+    def table(self):
+        """
+        Recorded spans as a table.
+
+        **Output:**
+
+        	pandas.DataFrame with columns 'name', 'start' (seconds from the first span), 'duration' (seconds), 'pid', 'worker'
+        	and the columns of span attributes (e.g. 'cut', 'cut_size', 'metric').
+        """
+        import pandas as pd
+        rows = []
+        t0 = min((s['start'] for s in self.spans), default=0.)
+        for s in self.spans:
+            row = {'name': s['name'], 'start': s['start'] - t0, 'duration': s['duration'], 'pid': s['pid'], 'worker': s['worker']}
+            row.update(s['attrs'])
+            rows.append(row)
+        return pd.DataFrame(rows, columns=None if rows else ['name', 'start', 'duration', 'pid', 'worker'])
+
+    def summary(self):
+        """
+        Total, mean and maximal durations of spans grouped by name.
+
+        **Output:**
+
+        	pandas.DataFrame indexed by span name.
+        """
+        table = self.table()
+        return table.groupby('name')['duration'].agg(['count', 'sum', 'mean', 'max']).sort_values('sum', ascending=False)
+
+    def to_chrome_trace(self, filename):
+        """
+        Export the spans in Chrome trace format (JSON), which can be opened in chrome://tracing or Perfetto.
+
+        **Input:**
+
+        	filename (str): name of output file.
+        """
+        t0 = min((s['start'] for s in self.spans), default=0.)
+        events = []
+        for s in self.spans:
+            events.append({'name': s['name'], 'cat': 'revanalyzer', 'ph': 'X', 'ts': (s['start'] - t0)*1e6, 'dur': s['duration']*1e6,
+                           'pid': s['pid'], 'tid': s['pid'], 'args': dict(s['attrs'], worker=s['worker'])})
+        with open(filename, 'w') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f, default=str)
+
+
+@contextmanager
+def span(name, **attrs):
+    """
+    Context manager recording the execution of its body as a span of the active tracer. If tracing is not enabled, nothing is recorded.
+
+    **Input:**
+
+    	name (str): name of the span;
+
+    	attrs: attributes of the span.
+    """
+    buffer = getattr(_task, 'buffer', None)
+    if not _enabled and buffer is None:
+        yield
+        return
+    start = time.time()
+    try:
+        yield
+    finally:
+        record = _record(name, start, time.time() - start, **attrs)
+        if buffer is not None:
+            buffer.append(record)
+        elif _tracer is not None:
+            _tracer.spans.append(record)
+
+
+def is_enabled():
+    """
+    Check if spans are recorded in the current process.
+    """
+    return _enabled
+
+
+def _record(name, start, duration, **attrs):
+    record = {'name': name, 'start': start, 'duration': duration, 'pid': os.getpid(),
+              'worker': multiprocessing.current_process().name, 'attrs': attrs}
+    if threading.current_thread() is not threading.main_thread():
+        record['worker'] += '/' + threading.current_thread().name
+    return record
+
+
+def _traced_call(func, task, enabled):
+    # runs a task in a worker process or thread and returns its result with the spans recorded during the task
+    if not enabled:
+        return func(task), []
+    previous = getattr(_task, 'buffer', None)
+    _task.buffer = []
+    try:
+        result = func(task)
+    finally:
+        spans = _task.buffer
+        _task.buffer = previous
+    return result, spans
+
+
+def _add(spans):
+    if _tracer is not None:
+        _tracer.spans.extend(spans)
@@ -7,6 +7,9 @@ class BasicVectorizer:
     """
     Base class for vectorizers. (Don't use it directly but derive from it).
     """
+    # heavy dependencies imported lazily by the vectorizer, preloaded by worker processes
+    _worker_imports = ()
+
     def __init__(self, norm):
         """
         **Input:**
@@ -4,7 +4,6 @@ Definition of Landscape vectorizer, used in PD vectorization. A persistence land
 """
 
 import numpy as np
-from gudhi.representations.vector_methods import Landscape
 from .basic_vectorizer import BasicVectorizer
 
 
@@ -12,6 +11,8 @@ class LandscapeVectorizer(BasicVectorizer):
     """
     Class describing persistence landscape vectorizer.
     """      
+    _worker_imports = ('gudhi.representations',)
+
     def __init__(self, resolution, num_landcapes=1, norm=2):
         """
         **Input:**
@@ -40,6 +41,7 @@ class LandscapeVectorizer(BasicVectorizer):
         
         	(list(dtype = float), list(dtype = float), float): a tuple, in which the first two elements are vectorized metric values for a given pair of subsamples, the third one is the normalized distance between these vectors and the last one is the cosine similarity for them. 
         """ 
+        from gudhi.representations.vector_methods import Landscape
         L1 = Landscape(self.num_landscapes, self.resolution)
         L1.fit([v1])
         range1 = L1.sample_range
@@ -4,7 +4,6 @@ Definition of Persistence Image vectorizer, used in PD vectorization. A persiste
 """
 
 import numpy as np
-from gudhi.representations.vector_methods import PersistenceImage
 from .basic_vectorizer import BasicVectorizer
 
 
@@ -12,6 +11,8 @@ class PersistenceImageVectorizer(BasicVectorizer):
     """
     Class describing persistence image vectorizer.
     """      
+    _worker_imports = ('gudhi.representations',)
+
     def __init__(self, resolution, bandwidth=1., norm=2):
         """
         **Input:**
@@ -40,6 +41,7 @@ class PersistenceImageVectorizer(BasicVectorizer):
         
         	(list(dtype = float), list(dtype = float), float): a tuple, in which the first two elements are vectorized metric values for a given pair of subsamples, the third one is the normalized distance between these vectors and the last one is the cosine similarity for them. 
         """    
+        from gudhi.representations.vector_methods import PersistenceImage
         n1 = len(v1)
         n2 = len(v2)
         C1 = PersistenceImage(bandwidth=self.bandwidth, weight=lambda x: np.arctan(0.5*(x[1] - x[0])),
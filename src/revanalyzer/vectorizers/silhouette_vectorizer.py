@@ -4,7 +4,6 @@ Definition of Silhouette vectorizer, used in PD vectorization. A persistence sil
 """
 
 import numpy as np
-from gudhi.representations.vector_methods import Silhouette
 from .basic_vectorizer import BasicVectorizer
 
 
@@ -12,6 +11,8 @@ class SilhouetteVectorizer(BasicVectorizer):
     """
     Class describing persistence silhouette vectorizer.
     """   
+    _worker_imports = ('gudhi.representations',)
+
     def __init__(self, resolution, n=1, norm=2):
         """
         **Input:**
@@ -40,6 +41,7 @@ class SilhouetteVectorizer(BasicVectorizer):
         
         	(list(dtype = float), list(dtype = float), float): a tuple, in which the first two elements are vectorized metric values for a given pair of subsamples, the third one is the normalized distance between these vectors and the last one is the cosine similarity for them. 
         """ 
+        from gudhi.representations.vector_methods import Silhouette
         S1 = Silhouette(weight=lambda x: (
             x[1] - x[0])**self.n, resolution=self.resolution)
         S1.fit([v1])